@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark get_items_by_keys: VALUES join vs the previous OR-chain of (kind AND key) predicates.
+
+Seeds a throwaway user with keyed items, then times both query shapes at 1, 10, 100
+and 1,000 requested keys and prints median/p95 latency per size.
+
+Run with: source .env && uv run python benchmarks/bench_get_items_by_keys.py [--items 5000] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import and_, delete, or_, select, text
+
+from src.memory import crud
+from src.memory.db import Entry, EntryTombstone, HistoryRollup, SessionLocal
+
+KINDS = ('goal', 'plan', 'knowledge', 'preference', 'log')
+SIZES = (1, 10, 100, 1000)
+
+
+def legacy_get_items_by_keys(session, user_id: str, keys: list[tuple[str, str]]) -> list[dict]:
+    """The OR-chain query get_items_by_keys used before the VALUES join."""
+    or_conditions = [and_(Entry.kind == kind, Entry.key == key) for kind, key in keys]
+    stmt = select(Entry).where(and_(Entry.user_id == user_id, or_(*or_conditions)))
+    return [crud._serialize(e) for e in session.execute(stmt).scalars().all()]
+
+
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=5000, help='keyed items to seed')
+    parser.add_argument('--repeat', type=int, default=20, help='timed runs per size')
+    args = parser.parse_args()
+
+    user_id = f'bench-{uuid.uuid4()}'
+    all_keys = [(KINDS[i % len(KINDS)], f'item-{i:06d}') for i in range(args.items)]
+
+    with SessionLocal() as session:
+        try:
+            crud.bulk_upsert_items(
+                session, user_id,
+                items=[{'kind': kind, 'key': key, 'content': f'Content for {key}. ' * 20} for kind, key in all_keys],
+            )
+            # Give the planner real statistics for the freshly seeded rows
+            session.execute(text('ANALYZE entries'))
+
+            print(f"{'keys':>6} | {'or-chain p50':>12} {'p95':>8} | {'values p50':>10} {'p95':>8} | speedup")
+            for size in SIZES:
+                # Ask for a spread of keys, ~10% of which don't exist
+                step = max(1, args.items // size)
+                keys = [all_keys[i] if n % 10 else ('goal', f'missing-{n}') for n, i in enumerate(range(0, args.items, step))][:size]
+
+                legacy = timed(lambda: legacy_get_items_by_keys(session, user_id, keys), args.repeat)
+                current = timed(lambda: crud.get_items_by_keys(session, user_id, keys=keys), args.repeat)
+
+                legacy_p50, current_p50 = statistics.median(legacy), statistics.median(current)
+                print(
+                    f"{size:>6} | {legacy_p50:>10.2f}ms {statistics.quantiles(legacy, n=20)[-1]:>6.2f}ms"
+                    f" | {current_p50:>8.2f}ms {statistics.quantiles(current, n=20)[-1]:>6.2f}ms"
+                    f" | {legacy_p50 / current_p50:>5.1f}x"
+                )
+        finally:
+            session.rollback()
+            crud.lock_change_feed(session, [user_id])
+            for model in (Entry, HistoryRollup, EntryTombstone):
+                session.execute(delete(model).where(model.user_id == user_id))
+            session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Measure HTTP serving throughput as the number of server worker processes grows.
+
+Seeds --athletes users with deterministic histories (see datagen.py), then for each
+--workers count starts the server in stateless HTTP mode on one port and drives it
+for --duration seconds from --clients load processes. Every request is a tools/call
+as a random athlete, authenticated with that athlete's HS256 token: mostly overview
+and log listing, one in ten an upsert. Prints requests per second, latency
+percentiles and the speedup over the first worker count. Server and load share the
+machine, so scaling only shows with more cores than the largest worker count.
+
+Run with: source .env && uv run python benchmarks/bench_http_workers.py [--workers 1 2 4] [--athletes 1000] [--duration 15]
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import delete, text
+
+from datagen import seed_users
+from src.memory import crud
+from src.memory.db import Entry, EntryTombstone, HistoryRollup, SessionLocal
+
+ROOT = Path(__file__).parent.parent
+SECRET = 'bench-http-workers-secret-0123456789'
+
+
+def make_token(user_id: str) -> str:
+    """HS256 JWT naming user_id, signed with the secret the benchmarked server verifies."""
+    def b64(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+    signing_input = b64(b'{"alg":"HS256","typ":"JWT"}') + '.' + b64(json.dumps(
+        {'sub': user_id, 'exp': int(time.time()) + 24 * 3600}
+    ).encode())
+    signature = hmac.new(SECRET.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f'{signing_input}.{b64(signature)}'
+
+
+def next_call(rng: random.Random) -> tuple[str, dict]:
+    roll = rng.random()
+    if roll < 0.1:
+        return 'upsert', {'kind': 'log', 'key': f'bench-{rng.randrange(30):02d}', 'content': 'Easy 5k Z2, 28 min.'}
+    if roll < 0.4:
+        return 'get', {'kind': 'log', 'limit': 10}
+    return 'overview', {'context': rng.choice([None, 'planning', 'upcoming', 'history'])}
+
+
+def load(port: int, tokens: list[str], duration: float, seed: int) -> tuple[list[float], int]:
+    """Issue requests back to back over one keep-alive connection; return latencies and errors."""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        name, arguments = next_call(rng)
+        body = json.dumps({
+            'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+            'params': {'name': name, 'arguments': arguments},
+        })
+        started = time.perf_counter()
+        try:
+            conn.request('POST', '/mcp', body, {
+                'Authorization': f'Bearer {rng.choice(tokens)}',
+                'Content-Type': 'application/json',
+                'Accept': 'application/json, text/event-stream',
+            })
+            response = conn.getresponse()
+            payload = response.read()
+            if response.status != 200 or b'"isError":true' in payload:
+                errors += 1
+                continue
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            continue
+        latencies.append(time.perf_counter() - started)
+    conn.close()
+    return latencies, errors
+
+
+def start_server(workers: int) -> tuple[subprocess.Popen, int]:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    env = dict(os.environ, FITNESS_JWT_SECRET=SECRET, LOGFIRE_SEND_TO_LOGFIRE='false')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'src.mcp_server', '--transport', 'http', '--port', str(port), '--workers', str(workers)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None or time.monotonic() > deadline:
+                stop_server(process)
+                raise RuntimeError(f'server with {workers} workers did not start')
+            time.sleep(0.2)
+
+
+def stop_server(process: subprocess.Popen) -> None:
+    # The whole group: workers still starting up may outlive their parent otherwise
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def run(workers: int, tokens: list[str], clients: int, duration: float, warmup: float) -> dict:
+    process, port = start_server(workers)
+    try:
+        with multiprocessing.Pool(clients) as pool:
+            # Fills every worker's connection pool and overview cache
+            pool.starmap(load, [(port, tokens, warmup, seed) for seed in range(clients)])
+            started = time.perf_counter()
+            outcomes = pool.starmap(load, [(port, tokens, duration, 1000 + seed) for seed in range(clients)])
+            elapsed = time.perf_counter() - started
+    finally:
+        stop_server(process)
+    latencies = sorted(l for samples, _ in outcomes for l in samples)
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        'workers': workers,
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in outcomes),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='worker counts to compare')
+    parser.add_argument('--athletes', type=int, default=1000, help='distinct users seeded and called as')
+    parser.add_argument('--entries', type=int, default=50, help='entries seeded per athlete')
+    parser.add_argument('--clients', type=int, help='load processes (default 4 per largest worker count)')
+    parser.add_argument('--duration', type=float, default=15.0, help='measured seconds per worker count')
+    parser.add_argument('--warmup', type=float, default=3.0, help='unmeasured seconds per worker count')
+    parser.add_argument('--seed', type=int, default=42, help='data generator seed')
+    args = parser.parse_args()
+    clients = args.clients or 4 * max(args.workers)
+
+    run_id = uuid.uuid4().hex[:8]
+    user_ids = [f'bench-http-{run_id}-{i}' for i in range(args.athletes)]
+    tokens = [make_token(user_id) for user_id in user_ids]
+    with SessionLocal() as session:
+        try:
+            started = time.perf_counter()
+            seed_users(session, user_ids, args.entries, seed=args.seed)
+            session.execute(text('ANALYZE entries'))
+            session.commit()
+            print(f"Seeded {args.athletes} x {args.entries} entries in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+            results = []
+            print(f"\n{'workers':>7} {'req/s':>9} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}  ({clients} clients, {os.cpu_count()} cores)")
+            for workers in args.workers:
+                r = run(workers, tokens, clients, args.duration, args.warmup)
+                results.append(r)
+                speedup = r['rps'] / results[0]['rps']
+                print(f"{workers:>7} {r['rps']:>9.1f} {speedup:>7.2f}x {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>7}")
+        finally:
+            session.rollback()
+            crud.lock_change_feed(session, user_ids)
+            for model in (Entry, HistoryRollup, EntryTombstone):
+                session.execute(delete(model).where(model.user_id.in_(user_ids)))
+            session.commit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-call statement overhead: building and compiling SQL, and parsing it on the server.
+
+For the hot crud calls, compares (1) the Python-side cost of building the statement
+tree the way crud used to on every call and deriving its cache key, against reusing
+the statement crud now builds once; (2) a full compile, paid whenever the compiled
+cache misses; and (3) the whole call over a connection that never prepares
+(prepare_threshold=None, as through a transaction pooler) against one that prepares
+on first use, which skips the server's parse and plan.
+
+Run with: source .env && uv run python benchmarks/bench_statement_overhead.py [--items 500] [--repeat 200]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import String, and_, bindparam, create_engine, delete, func, select, text
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from src.memory import crud
+from src.memory.db import DATABASE_URL, Entry, EntryTombstone, HistoryRollup, SessionLocal, engine, engine_options
+
+
+def legacy_upsert(user_id: str, n: int):
+    """The statement upsert_item built on every call before _UPSERT_ITEM."""
+    content = f'Session {n}.'
+    return crud._insert_on_conflict(Entry).values(
+        user_id=user_id, kind='plan', key=f'item-{n}', content=content, status='active',
+    ).on_conflict_do_update(
+        index_elements=[Entry.user_id, Entry.kind, Entry.key],
+        set_={"content": content, "status": 'active', "updated_at": func.now()},
+    ).returning(Entry)
+
+
+def legacy_items_by_keys(user_id: str, keys: list[tuple[str, str]]):
+    """The statement get_items_by_keys built on every call before _ITEMS_BY_KEYS."""
+    requested = func.unnest(
+        bindparam('kinds', [kind for kind, _ in keys], type_=ARRAY(String)),
+        bindparam('keys', [key for _, key in keys], type_=ARRAY(String)),
+    ).table_valued('kind', 'key', with_ordinality='ord').render_derived(name='requested')
+    return (
+        select(Entry, requested.c.ord)
+        .join(requested, and_(Entry.kind == requested.c.kind, Entry.key == requested.c.key))
+        .where(Entry.user_id == user_id)
+    )
+
+
+def legacy_events_page(user_id: str, start: datetime, limit: int):
+    """The statement list_events_page built on every call before _page_stmt."""
+    sort_at = Entry.occurred_at
+    conditions = [Entry.user_id == user_id, Entry.key.is_(None), Entry.occurred_at.isnot(None),
+                  Entry.kind == 'log', Entry.occurred_at >= start]
+    page_ids = (
+        select(Entry.id, sort_at.label('sort_at'))
+        .where(and_(*conditions))
+        .order_by(sort_at.desc(), Entry.id.desc())
+        .limit(limit + 1)
+        .subquery('page')
+    )
+    return (
+        select(Entry, page_ids.c.sort_at)
+        .join(page_ids, Entry.id == page_ids.c.id)
+        .order_by(page_ids.c.sort_at.desc(), page_ids.c.id.desc())
+    )
+
+
+def timed_us(fn, repeat: int) -> float:
+    """Median microseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=500, help='keyed items and log events to seed')
+    parser.add_argument('--repeat', type=int, default=200, help='timed runs per measurement')
+    args = parser.parse_args()
+
+    user_id = f'bench-{uuid.uuid4()}'
+    keys = [('plan', f'item-{i}') for i in range(0, args.items, max(1, args.items // 10))]
+    start = datetime.now() - timedelta(days=30)
+    # Same database; one engine never prepares, the other prepares on first use
+    options = engine_options(DATABASE_URL)
+    unprepared = create_engine(DATABASE_URL, **dict(options, connect_args=dict(options['connect_args'], prepare_threshold=None)))
+    prepared = create_engine(DATABASE_URL, **dict(options, connect_args=dict(options['connect_args'], prepare_threshold=0)))
+
+    cases = {
+        'upsert_item': (
+            lambda: legacy_upsert(user_id, 0),
+            crud._UPSERT_ITEM,
+            lambda session: crud.upsert_item(session, user_id, kind='plan', key='item-0', content='Session 0.'),
+        ),
+        'get_items_by_keys[10]': (
+            lambda: legacy_items_by_keys(user_id, keys),
+            crud._ITEMS_BY_KEYS,
+            lambda session: crud.get_items_by_keys(session, user_id, keys=keys),
+        ),
+        'list_events_page': (
+            lambda: legacy_events_page(user_id, start, 20),
+            crud._page_stmt('events', frozenset({'user_id', 'kind', 'start', 'limit'}), False),
+            lambda session: crud.list_events_page(session, user_id, kind='log', start=start, limit=20),
+        ),
+    }
+
+    with SessionLocal() as session:
+        try:
+            crud.bulk_upsert_items(session, user_id, items=[
+                {'kind': 'plan', 'key': f'item-{i}', 'content': f'Plan {i}. ' * 20} for i in range(args.items)
+            ] + [{'kind': 'log', 'key': '', 'content': f'Easy run {i}.'} for i in range(args.items)])
+            session.execute(text('ANALYZE entries'))
+            session.commit()
+
+            print(f"{'case':<22} | {'build+key old':>13} {'cached':>8} | {'compile':>9} | {'call unprepared':>15} {'prepared':>9}")
+            for name, (legacy, cached, call) in cases.items():
+                build_old = timed_us(lambda: legacy()._generate_cache_key(), args.repeat)
+                build_new = timed_us(lambda: cached._generate_cache_key(), args.repeat)
+                compile_us = timed_us(lambda: legacy().compile(dialect=engine.dialect), args.repeat)
+                calls = {}
+                for label, bind in (('unprepared', unprepared), ('prepared', prepared)):
+                    with SessionLocal(bind=bind) as timed_session:
+                        call(timed_session)  # warm-up: connect, compile, prepare
+                        calls[label] = timed_us(lambda: call(timed_session), args.repeat) / 1000
+                print(
+                    f"{name:<22} | {build_old:>11.1f}us {build_new:>6.1f}us | {compile_us:>7.1f}us"
+                    f" | {calls['unprepared']:>13.3f}ms {calls['prepared']:>7.3f}ms"
+                )
+        finally:
+            session.rollback()
+            crud.lock_change_feed(session, [user_id])
+            for model in (Entry, HistoryRollup, EntryTombstone):
+                session.execute(delete(model).where(model.user_id == user_id))
+            session.commit()
+            unprepared.dispose()
+            prepared.dispose()
+
+
+if __name__ == '__main__':
+    main()
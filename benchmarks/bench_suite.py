@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Benchmark every crud function and MCP tool against synthetic histories of several sizes.
+
+For each size, seeds --users users with deterministic data (see datagen.py), runs
+ANALYZE, then times each case --repeat times after one warm-up call. One extra,
+untimed call per case counts the statements, the rows and bytes Postgres returned
+(SQLite cursors don't expose these), and the size of the serialized result handed
+back to the caller (export_entries reads through a server-side cursor whose fetches
+the counter can't see, so only its result side is reported). Results are written as
+JSON (default benchmarks/results/<git sha>.json); pass --compare with an earlier
+results file to print p50 ratios against it.
+
+Run with: source .env && uv run python benchmarks/bench_suite.py [--sizes 1000 10000] [--users 3] [--repeat 30]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# The server installs auto-tracing, which must happen before crud is imported
+import src.mcp_server as server
+
+import logfire
+from fastmcp import Client
+from sqlalchemy import delete, event, text
+
+from datagen import generate_entries, seed_users
+from src.memory import crud
+from src.memory.async_db import async_engine
+from src.memory.cache import overview_cache
+from src.memory.db import Entry, EntryTombstone, HistoryRollup, SessionLocal, engine
+
+# Keep span output from the server's console exporter out of the report
+logfire.configure(send_to_logfire=False, console=False)
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+class TransferCounter:
+    """Count statements, result rows and result bytes seen by an engine's cursors."""
+
+    def __init__(self, *engines):
+        self.engines = engines
+        self.statements = self.rows = self.bytes = 0
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements += 1
+        # Async engines hand the listener an adapter around the psycopg cursor
+        result = getattr(cursor, 'pgresult', None) or getattr(getattr(cursor, '_cursor', None), 'pgresult', None)
+        if result is None or not result.nfields:
+            return
+        self.rows += result.ntuples
+        for r in range(result.ntuples):
+            self.bytes += sum(len(result.get_value(r, c) or b'') for c in range(result.nfields))
+
+    def __enter__(self):
+        for e in self.engines:
+            event.listen(e, 'after_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        for e in self.engines:
+            event.remove(e, 'after_cursor_execute', self._record)
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {'p50_ms': round(cuts[49], 3), 'p95_ms': round(cuts[94], 3), 'p99_ms': round(cuts[98], 3)}
+
+
+def payload_size(result) -> tuple[int, int]:
+    """(rows, bytes) of what a case handed back to its caller."""
+    if hasattr(result, 'content'):  # MCP CallToolResult
+        text_parts = [getattr(part, 'text', '') for part in result.content]
+        return len(text_parts), sum(len(t.encode()) for t in text_parts)
+    if isinstance(result, dict) and 'items' in result:
+        rows = len(result['items'])
+    elif isinstance(result, list):
+        rows = len(result)
+    else:
+        rows = 0 if result is None else 1
+    return rows, len(json.dumps(result, default=str).encode())
+
+
+def crud_cases(session, user_id: str, size: int, seed: int, repeat: int) -> dict:
+    """Zero-argument callables for every crud function, with fixtures seeded up front."""
+    records = list(generate_entries(seed, 0, size))
+    goals = [(r['kind'], r['key']) for r in records if r['kind'] == 'goal'] or [('goal', 'missing')]
+    keyed = [(r['kind'], r['key']) for r in records if r.get('key')][:20]
+    pool = max(repeat + 2, 2)
+
+    doomed_items = iter([
+        crud.upsert_item(session, user_id, kind='note', key=f'bench-delete-{uuid.uuid4()}', content='x')['key']
+        for _ in range(pool)
+    ])
+    doomed_events = iter([crud.log_event(session, user_id, kind='note', content='x')['id'] for _ in range(pool)])
+    event_id = crud.log_event(session, user_id, kind='note', content='bench update target')['id']
+    counter = itertools.count()
+    page_two = crud.list_events_page(session, user_id, kind='log', limit=50)['next_cursor']
+
+    def overview(context=None):
+        overview_cache.clear()
+        return crud.get_overview(session, user_id, context=context)
+
+    return {
+        'get_overview': overview,
+        'get_overview[planning]': lambda: overview('planning'),
+        'get_overview[history]': lambda: overview('history'),
+        'get_overview[cached]': lambda: crud.get_overview(session, user_id),
+        'get_item': lambda: crud.get_item(session, user_id, kind=goals[0][0], key=goals[0][1]),
+        'get_items_by_keys[20]': lambda: crud.get_items_by_keys(session, user_id, keys=keyed),
+        'list_items[goal]': lambda: crud.list_items(session, user_id, kind='goal'),
+        'list_items_page[plan]': lambda: crud.list_items_page(session, user_id, kind='plan', limit=50),
+        'list_events[log]': lambda: crud.list_events(session, user_id, kind='log'),
+        'list_events_page[log,page2]': lambda: crud.list_events_page(session, user_id, kind='log', limit=50, cursor=page_two),
+        'search_entries': lambda: crud.search_entries(session, user_id, query='squat depth'),
+        'search_entries_page[recency]': lambda: crud.search_entries_page(
+            session, user_id, query='knee recovery', recency_half_life_days=30),
+        'export_entries': lambda: list(crud.export_entries(session, user_id)),
+        'upsert_item': lambda: crud.upsert_item(
+            session, user_id, kind=goals[0][0], key=goals[0][1], content=f'Updated goal {next(counter)}'),
+        'bulk_upsert_items[20]': lambda: crud.bulk_upsert_items(session, user_id, items=[
+            {'kind': 'plan', 'key': f'bench-bulk-{i}', 'content': f'Bulk plan {i} {next(counter)}'} for i in range(20)
+        ]),
+        'log_event': lambda: crud.log_event(session, user_id, kind='metric', content='weight 80kg'),
+        'update_event': lambda: crud.update_event(session, user_id, event_id=event_id, content=f'Edited {next(counter)}'),
+        'delete_event': lambda: crud.delete_event(session, user_id, event_id=next(doomed_events)),
+        'delete_item': lambda: crud.delete_item(session, user_id, kind='note', key=next(doomed_items)),
+        'archive_items[no match]': lambda: crud.archive_items(session, user_id, kind='plan', key_prefix='none-'),
+    }
+
+
+def tool_cases(client: Client, size: int, seed: int) -> dict:
+    """Coroutine factories calling each MCP tool in-process through a FastMCP client."""
+    records = list(generate_entries(seed, 0, size))
+    keyed = [{'kind': r['kind'], 'key': r['key']} for r in records if r.get('key')][:20]
+    counter = itertools.count()
+
+    async def overview(context=None):
+        overview_cache.clear()
+        return await client.call_tool('overview', {'context': context})
+
+    return {
+        'tool:overview': overview,
+        'tool:overview[planning]': lambda: overview('planning'),
+        'tool:get[items 20]': lambda: client.call_tool('get', {'items': keyed}),
+        'tool:get[log page]': lambda: client.call_tool('get', {'kind': 'log', 'limit': 50}),
+        'tool:get[goal]': lambda: client.call_tool('get', {'kind': 'goal'}),
+        'tool:upsert': lambda: client.call_tool(
+            'upsert', {'kind': 'goal', 'key': 'bench-tool-goal', 'content': f'Tool goal {next(counter)}'}),
+        'tool:bulk_upsert[20]': lambda: client.call_tool('bulk_upsert', {'items': [
+            {'kind': 'plan', 'key': f'bench-tool-{i}', 'content': f'Tool plan {i} {next(counter)}'} for i in range(20)
+        ]}),
+        'tool:archive[no match]': lambda: client.call_tool('archive', {'kind': 'plan', 'key_prefix': 'none-'}),
+    }
+
+
+def run_sync(name: str, fn, repeat: int) -> dict:
+    fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    with TransferCounter(engine) as counted:
+        result = fn()
+    return summarize(name, samples, counted, result)
+
+
+async def run_async(name: str, fn, repeat: int) -> dict:
+    await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    with TransferCounter(async_engine.sync_engine) as counted:
+        result = await fn()
+    return summarize(name, samples, counted, result)
+
+
+def summarize(name: str, samples: list[float], counted: TransferCounter, result) -> dict:
+    result_rows, result_bytes = payload_size(result)
+    return {
+        'case': name,
+        **percentiles(samples),
+        'statements': counted.statements,
+        'db_rows': counted.rows,
+        'db_bytes': counted.bytes,
+        'result_rows': result_rows,
+        'result_bytes': result_bytes,
+    }
+
+
+async def run_tools(user_id: str, size: int, seed: int, repeat: int) -> list[dict]:
+    os.environ['FITNESS_USER_ID'] = user_id
+    async with Client(server.mcp) as client:
+        return [await run_async(name, fn, repeat) for name, fn in tool_cases(client, size, seed).items()]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def print_table(size: int, results: list[dict], baseline: dict) -> None:
+    print(f"\n== {size} entries/user ==")
+    print(f"{'case':<32} {'p50':>9} {'p95':>9} {'p99':>9} {'stmts':>5} {'db rows':>8} {'db KB':>9} {'out KB':>9}  vs base")
+    for r in results:
+        base = baseline.get((size, r['case']))
+        ratio = f"{r['p50_ms'] / base:>6.2f}x" if base else ''
+        print(
+            f"{r['case']:<32} {r['p50_ms']:>7.2f}ms {r['p95_ms']:>7.2f}ms {r['p99_ms']:>7.2f}ms"
+            f" {r['statements']:>5} {r['db_rows']:>8} {r['db_bytes'] / 1024:>9.1f} {r['result_bytes'] / 1024:>9.1f}  {ratio}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000], help='entries per user')
+    parser.add_argument('--users', type=int, default=3, help='users seeded per size (the first is benchmarked)')
+    parser.add_argument('--repeat', type=int, default=30, help='timed runs per case')
+    parser.add_argument('--seed', type=int, default=42, help='data generator seed')
+    parser.add_argument('--output', type=Path, help='results file (default benchmarks/results/<git sha>.json)')
+    parser.add_argument('--compare', type=Path, help='earlier results file to compare p50 against')
+    parser.add_argument('--no-tools', action='store_true', help='skip the MCP tool cases')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        previous = json.loads(args.compare.read_text())
+        baseline = {(r['size'], r['case']): r['p50_ms'] for r in previous['results']}
+
+    commit = git_commit()
+    run_id = uuid.uuid4().hex[:8]
+    results = []
+    with SessionLocal() as session:
+        session.connection()
+        database = f"{engine.dialect.name} {'.'.join(map(str, engine.dialect.server_version_info))}"
+        for size in args.sizes:
+            user_ids = [f'bench-suite-{run_id}-{size}-{i}' for i in range(args.users)]
+            try:
+                started = time.perf_counter()
+                seed_users(session, user_ids, size, seed=args.seed)
+                session.execute(text('ANALYZE entries'))
+                session.commit()
+                print(f"Seeded {args.users} x {size} entries in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+                size_results = [run_sync(name, fn, args.repeat) for name, fn in crud_cases(session, user_ids[0], size, args.seed, args.repeat).items()]
+                if not args.no_tools:
+                    size_results += asyncio.run(run_tools(user_ids[0], size, args.seed, args.repeat))
+                for r in size_results:
+                    r['size'] = size
+                print_table(size, size_results, baseline)
+                results.extend(size_results)
+            finally:
+                session.rollback()
+                crud.lock_change_feed(session, user_ids)
+                for model in (Entry, HistoryRollup, EntryTombstone):
+                    session.execute(delete(model).where(model.user_id.in_(user_ids)))
+                session.commit()
+
+    output = args.output or RESULTS_DIR / f'{commit}.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        'meta': {
+            'commit': commit,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'database': database,
+            'users': args.users,
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'results': results,
+    }, indent=2))
+    print(f"\nWrote {output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
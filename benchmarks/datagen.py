@@ -0,0 +1,71 @@
+"""
+Deterministic synthetic training history for benchmarks.
+
+generate_entries() yields the same records for the same (seed, user_index, count):
+a few goals, weekly plans, and a long tail of logs, metrics and notes with content
+sizes in the range real users produce. Keyed kinds (goal, plan) become items;
+log/metric/note become events spread back in time from a fixed date.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+from sqlalchemy.orm import Session
+
+from src.memory.bulk_import import import_entries
+
+# Share of entries per kind, and (min, max) content length in characters
+KIND_MIX = {
+    'goal': (0.02, (120, 400)),
+    'plan': (0.10, (600, 2500)),
+    'log': (0.50, (300, 1500)),
+    'metric': (0.25, (30, 120)),
+    'note': (0.13, (80, 600)),
+}
+
+# History ends here so runs are reproducible regardless of when they happen
+END_DATE = datetime(2025, 10, 1, 7, 0, tzinfo=timezone.utc)
+
+VOCABULARY = (
+    'squat bench deadlift press row pullup lunge hinge carry sprint tempo zone2 '
+    'interval threshold mobility recovery sleep protein knee shoulder hip ankle '
+    'warmup cooldown sets reps rpe load volume deload progression technique bar '
+    'path depth lockout bodyweight resting heart rate hrv soreness fatigue easy '
+    'hard felt strong heavy light smooth paused week block program goal plan'
+).split()
+
+
+def _content(rng: random.Random, kind: str, index: int, length_range: tuple[int, int]) -> str:
+    target = rng.randint(*length_range)
+    words = [kind, str(index)]
+    size = len(kind) + len(str(index)) + 1
+    while size < target:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        size += len(word) + 1
+    return ' '.join(words)
+
+
+def generate_entries(seed: int, user_index: int, count: int) -> Iterator[dict[str, Any]]:
+    """Yield `count` import records for one user, identical across runs for the same arguments."""
+    rng = random.Random(f'{seed}:{user_index}')
+    kinds = list(KIND_MIX)
+    weights = [share for share, _ in KIND_MIX.values()]
+    for index in range(count):
+        kind = rng.choices(kinds, weights)[0]
+        content = _content(rng, kind, index, KIND_MIX[kind][1])
+        if kind == 'goal':
+            yield {'kind': kind, 'key': f'goal-{index:06d}', 'content': content}
+        elif kind == 'plan':
+            yield {'kind': kind, 'key': f'plan-{index:06d}', 'content': content}
+        else:
+            # Roughly three events a day, newest last
+            occurred_at = END_DATE - timedelta(hours=8 * (count - index) + rng.randint(0, 7))
+            yield {'kind': kind, 'content': content, 'occurred_at': occurred_at}
+
+
+def seed_users(session: Session, user_ids: list[str], count: int, *, seed: int = 42) -> None:
+    """Import `count` generated entries for each user."""
+    for user_index, user_id in enumerate(user_ids):
+        import_entries(session, user_id, generate_entries(seed, user_index, count))
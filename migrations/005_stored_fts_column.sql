@@ -0,0 +1,18 @@
+-- Migration 005: Stored full-text search column
+-- search_entries used to recompute to_tsvector(...) per row and only hit idx_entries_fts
+-- when its expression matched the index exactly. Store the vector once per write
+-- in a generated column and index that instead.
+
+BEGIN;
+
+ALTER TABLE entries ADD COLUMN IF NOT EXISTS fts TSVECTOR
+    GENERATED ALWAYS AS (to_tsvector('english', coalesce(key, '') || ' ' || content)) STORED;
+
+-- Replace the expression index with a GIN index on the stored column
+DROP INDEX IF EXISTS idx_entries_fts;
+CREATE INDEX idx_entries_fts ON entries USING GIN (fts);
+
+COMMIT;
+
+-- Verification (should show a Bitmap Index Scan on idx_entries_fts)
+-- EXPLAIN SELECT id FROM entries WHERE fts @@ plainto_tsquery('english', 'knee');
@@ -0,0 +1,31 @@
+-- Migration 006: Partial indexes for the keyed-item / event split
+-- Items (key IS NOT NULL) and events (key IS NULL) share one table, and every list
+-- query filters on that split. These partial indexes match the list orderings so a
+-- page is picked by an index-only scan and only its rows are read from the heap.
+--
+-- status is a bound parameter in crud queries, so it can't be proven against a
+-- partial-index predicate; it is INCLUDEd instead so status filters run in the index.
+-- content is never INCLUDEd: it can exceed the btree tuple size limit.
+
+BEGIN;
+
+-- list_items: newest change first per (user, kind)
+CREATE INDEX IF NOT EXISTS idx_entries_items_recent
+    ON entries (user_id, kind, (coalesce(updated_at, created_at)) DESC, id DESC)
+    INCLUDE (status, updated_at, created_at)
+    WHERE key IS NOT NULL;
+
+-- list_events: newest occurrence first per (user, kind)
+CREATE INDEX IF NOT EXISTS idx_entries_events_recent
+    ON entries (user_id, kind, occurred_at DESC, id DESC)
+    WHERE key IS NULL;
+
+COMMIT;
+
+ANALYZE entries;
+
+-- Verification (should show an Index Only Scan on each index)
+-- EXPLAIN SELECT id FROM entries WHERE user_id = '1' AND kind = 'goal' AND key IS NOT NULL
+--     AND status = 'active' ORDER BY coalesce(updated_at, created_at) DESC, id DESC LIMIT 20;
+-- EXPLAIN SELECT id FROM entries WHERE user_id = '1' AND kind = 'log' AND key IS NULL
+--     ORDER BY occurred_at DESC, id DESC LIMIT 20;
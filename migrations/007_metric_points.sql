@@ -0,0 +1,26 @@
+-- Migration 007: Numeric time series parsed from metric events
+-- log_event/bulk upserts/imports parse metric text ('Weight: 71kg') into
+-- (metric_name, value, unit) rows here, so trend questions are one range scan of
+-- idx_metric_points_user_metric_time instead of re-reading every metric string.
+-- Rows cascade away with their entry.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS metric_points (
+    entry_id UUID NOT NULL REFERENCES entries(id) ON DELETE CASCADE,
+    metric_name VARCHAR(100) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    value DOUBLE PRECISION NOT NULL,
+    unit VARCHAR(20),
+    occurred_at TIMESTAMPTZ NOT NULL,
+    PRIMARY KEY (entry_id, metric_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_metric_points_user_metric_time
+    ON metric_points (user_id, metric_name, occurred_at)
+    INCLUDE (value, unit);
+
+COMMIT;
+
+-- Existing metric entries are parsed into the table by:
+--   uv run python scripts/backfill_metric_points.py
@@ -0,0 +1,23 @@
+-- Migration 008: Weekly and monthly history rollups
+-- overview(context='history') used to return up to 500 raw logs and metrics.
+-- These rows summarize each user's ISO weeks and calendar months instead (log
+-- count, session types from log keys, metric count/min/max/avg), recomputed by
+-- crud for the periods a log or metric write touches.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS history_rollups (
+    user_id VARCHAR(255) NOT NULL,
+    period VARCHAR(10) NOT NULL CHECK (period IN ('week', 'month')),
+    period_start DATE NOT NULL,
+    sessions INTEGER NOT NULL DEFAULT 0,
+    session_types JSONB NOT NULL DEFAULT '{}',
+    metrics JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (user_id, period, period_start)
+);
+
+COMMIT;
+
+-- Rollups for existing history are computed by:
+--   uv run python scripts/rebuild_history_rollups.py
@@ -0,0 +1,23 @@
+-- Migration 009: Stored overview previews
+-- get_overview fetched the full content of every program, knowledge and log entry
+-- and then kept the first truncate_words words. Generate a word count and, for
+-- content longer than 200 words, the first 200 words once per write, so overviews
+-- truncating to 200 words or fewer select the preview instead of the content.
+-- Adding stored generated columns rewrites the entries table.
+
+BEGIN;
+
+ALTER TABLE entries ADD COLUMN IF NOT EXISTS word_count INTEGER
+    GENERATED ALWAYS AS (cardinality(array_remove(regexp_split_to_array(content, '\s+'), ''))) STORED;
+
+ALTER TABLE entries ADD COLUMN IF NOT EXISTS preview TEXT
+    GENERATED ALWAYS AS (
+        CASE WHEN cardinality(array_remove(regexp_split_to_array(content, '\s+'), '')) > 200
+        THEN substring(content from '^\s*(\S+(?:\s+\S+){0,199})') END
+    ) STORED;
+
+COMMIT;
+
+-- Verification (long entries: preview_words = 200)
+-- SELECT word_count, cardinality(regexp_split_to_array(btrim(preview), '\s+')) AS preview_words
+-- FROM entries WHERE preview IS NOT NULL LIMIT 5;
@@ -0,0 +1,63 @@
+-- Migration 010: Change feed for incremental sync
+-- Every insert and update of an entry takes the next value of entries_change_seq,
+-- and every delete leaves a tombstone with one, so crud.list_changes can return
+-- everything written after a client's watermark from idx_entries_user_change_seq
+-- and idx_entry_tombstones_user_change_seq instead of the whole snapshot.
+
+BEGIN;
+
+CREATE SEQUENCE IF NOT EXISTS entries_change_seq AS BIGINT;
+
+ALTER TABLE entries ADD COLUMN IF NOT EXISTS change_seq BIGINT;
+
+-- Number existing rows in the order they were last written
+UPDATE entries e SET change_seq = ordered.seq
+FROM (
+    SELECT id, row_number() OVER (ORDER BY coalesce(updated_at, created_at), id) AS seq
+    FROM entries
+) ordered
+WHERE e.id = ordered.id AND e.change_seq IS NULL;
+
+SELECT setval('entries_change_seq', (SELECT coalesce(max(change_seq), 0) + 1 FROM entries), false);
+
+ALTER TABLE entries ALTER COLUMN change_seq SET DEFAULT nextval('entries_change_seq');
+
+CREATE INDEX IF NOT EXISTS idx_entries_user_change_seq ON entries (user_id, change_seq);
+
+CREATE TABLE IF NOT EXISTS entry_tombstones (
+    entry_id UUID PRIMARY KEY,
+    user_id VARCHAR(255) NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    key VARCHAR(255),
+    change_seq BIGINT NOT NULL,
+    deleted_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_entry_tombstones_user_change_seq ON entry_tombstones (user_id, change_seq);
+
+-- Updates (including ON CONFLICT DO UPDATE) move the row to the head of the feed
+CREATE OR REPLACE FUNCTION entries_bump_change_seq() RETURNS trigger AS $$
+BEGIN
+    NEW.change_seq := nextval('entries_change_seq');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS entries_change_seq ON entries;
+CREATE TRIGGER entries_change_seq BEFORE UPDATE ON entries
+    FOR EACH ROW EXECUTE FUNCTION entries_bump_change_seq();
+
+CREATE OR REPLACE FUNCTION entries_record_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO entry_tombstones (entry_id, user_id, kind, key, change_seq)
+    VALUES (OLD.id, OLD.user_id, OLD.kind, OLD.key, nextval('entries_change_seq'))
+    ON CONFLICT (entry_id) DO NOTHING;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS entries_tombstone ON entries;
+CREATE TRIGGER entries_tombstone AFTER DELETE ON entries
+    FOR EACH ROW EXECUTE FUNCTION entries_record_tombstone();
+
+COMMIT;
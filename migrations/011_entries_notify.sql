@@ -0,0 +1,48 @@
+-- Migration 011: NOTIFY on entry changes for cross-process cache invalidation
+-- Each server process caches overviews in memory and only sees its own writes.
+-- After every statement that changes entries, notify channel entries_changed once
+-- per (user_id, kind) it touched with {"user_id", "kind", "key"} (key is null when
+-- several keys changed), so other processes' listeners (src/memory/notify.py)
+-- can drop what they cached. Notifications are delivered on commit only.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION entries_notify_change() RETURNS trigger AS $$
+DECLARE
+    change RECORD;
+BEGIN
+    FOR change IN
+        SELECT user_id, kind,
+               CASE WHEN count(DISTINCT key) = 1 AND count(key) = count(*) THEN min(key) END AS key
+        FROM changed_rows
+        GROUP BY user_id, kind
+    LOOP
+        PERFORM pg_notify(
+            'entries_changed',
+            json_build_object('user_id', change.user_id, 'kind', change.kind, 'key', change.key)::text
+        );
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow one event per trigger, hence three triggers
+DROP TRIGGER IF EXISTS entries_notify_insert ON entries;
+CREATE TRIGGER entries_notify_insert AFTER INSERT ON entries
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION entries_notify_change();
+
+DROP TRIGGER IF EXISTS entries_notify_update ON entries;
+CREATE TRIGGER entries_notify_update AFTER UPDATE ON entries
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION entries_notify_change();
+
+DROP TRIGGER IF EXISTS entries_notify_delete ON entries;
+CREATE TRIGGER entries_notify_delete AFTER DELETE ON entries
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION entries_notify_change();
+
+COMMIT;
+
+-- Verification: in one psql session run LISTEN entries_changed; then write an entry
+-- from another and the next command in the first prints the notification.
@@ -0,0 +1,42 @@
+-- Migration 012: Change feed numbered in commit order per user
+-- nextval() hands out change_seq when a statement runs, not when its transaction
+-- commits. With two writers for one user, A could take 100 and still be open when
+-- B took 101 and committed; a client syncing then got next_token 101 and never saw
+-- row 100 once A committed. Every change_seq assignment now first takes a
+-- transaction-scoped advisory lock on the user, so a second writer for the same
+-- user waits for the first to commit or roll back before numbering its rows, and
+-- each user's change_seq order is commit order. Writers for different users don't
+-- wait on each other (barring a hash collision, which only serializes them).
+
+BEGIN;
+
+-- 2010: this migration's lock namespace, keeping the keys apart from other advisory locks
+CREATE OR REPLACE FUNCTION entries_next_change_seq(owner VARCHAR) RETURNS BIGINT AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(2010, hashtext(owner));
+    RETURN nextval('entries_change_seq');
+END;
+$$ LANGUAGE plpgsql;
+
+-- Inserts too: the column default runs before any lock could be taken
+CREATE OR REPLACE FUNCTION entries_bump_change_seq() RETURNS trigger AS $$
+BEGIN
+    NEW.change_seq := entries_next_change_seq(NEW.user_id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS entries_change_seq ON entries;
+CREATE TRIGGER entries_change_seq BEFORE INSERT OR UPDATE ON entries
+    FOR EACH ROW EXECUTE FUNCTION entries_bump_change_seq();
+
+CREATE OR REPLACE FUNCTION entries_record_tombstone() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO entry_tombstones (entry_id, user_id, kind, key, change_seq)
+    VALUES (OLD.id, OLD.user_id, OLD.kind, OLD.key, entries_next_change_seq(OLD.user_id))
+    ON CONFLICT (entry_id) DO NOTHING;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,40 @@
+-- Migration 013: Change feed locks taken up front, and tombstone retention
+-- 012 takes a user's change feed lock from the row trigger, i.e. in whatever order
+-- a statement reaches its rows. Two statements writing rows of several users (a
+-- cleanup deleting test users, say) could each hold one user's lock and wait for
+-- the other's. Worse, an UPDATE locks its row before the trigger asks for the user
+-- lock, so it could wait on a writer of the same user that already holds the user
+-- lock and then wants that row. The app's UPDATE and DELETE statements now call
+-- entries_lock_change_feed in a constant condition, evaluated before any row
+-- qualifies, so the user lock comes before any row lock (inserts already took it
+-- first). Statements that touch several users call it beforehand with all of them:
+-- the locks are taken once, in one global order. Either way the trigger's own
+-- calls then find the lock already held.
+-- The trigger keeps locking for writes made outside the app.
+--
+-- Tombstones were kept forever. scripts/prune_tombstones.py deletes old ones and
+-- records per user the newest change_seq it removed; list_changes answers a token
+-- from before that horizon with a fresh snapshot (reset) instead of silently
+-- leaving out the deletes it can no longer report.
+
+BEGIN;
+
+-- Same lock keys as entries_next_change_seq (012), ordered by key: hash collisions
+-- share a lock, so the key, not the user id, has to be what is sorted
+CREATE OR REPLACE FUNCTION entries_lock_change_feed(owners VARCHAR[]) RETURNS BOOLEAN AS $$
+DECLARE
+    lock_key INTEGER;
+BEGIN
+    FOR lock_key IN SELECT DISTINCT hashtext(owner) FROM unnest(owners) AS owner ORDER BY 1 LOOP
+        PERFORM pg_advisory_xact_lock(2010, lock_key);
+    END LOOP;
+    RETURN TRUE;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TABLE IF NOT EXISTS change_feed_horizons (
+    user_id VARCHAR(255) PRIMARY KEY,
+    change_seq BIGINT NOT NULL  -- newest pruned tombstone
+);
+
+COMMIT;
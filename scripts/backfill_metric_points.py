@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Parse existing metric entries into the metric_points time series.
+
+New metric events are parsed as they are written; run this once after applying
+migrations/007_metric_points.sql, or again after changing the parser. Each
+entry's readings are replaced, so it is safe to re-run.
+
+Run with: source .env && uv run python scripts/backfill_metric_points.py [--user-id 1]
+"""
+
+import argparse
+import os
+import sys
+
+# Database connection - check env first
+DATABASE_URL = os.getenv('DATABASE_URL')
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable not set")
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.memory.crud import rebuild_metric_points
+from src.memory.db import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--user-id', help='Only backfill this user (default: everyone)')
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        written = rebuild_metric_points(session, args.user_id)
+    print(f"Stored {written} metric readings")
+
+
+if __name__ == "__main__":
+    main()
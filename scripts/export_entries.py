@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Export a user's full history as NDJSON (one entry per line, oldest first).
+
+Entries stream from a server-side cursor in batches, so memory stays flat no
+matter how many rows the user has.
+
+Run with: source .env && uv run python scripts/export_entries.py [--kind log] [--output export.ndjson]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+# Database connection - check env first
+DATABASE_URL = os.getenv('DATABASE_URL')
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable not set")
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.memory.crud import export_entries
+from src.memory.db import SessionLocal
+
+USER_ID = os.getenv('FITNESS_USER_ID', '1')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--user-id', default=USER_ID, help='User to export (default: FITNESS_USER_ID)')
+    parser.add_argument('--kind', help='Only export entries of this kind')
+    parser.add_argument('--output', help='Write to this file instead of stdout')
+    parser.add_argument('--batch-size', type=int, default=1000, help='Rows fetched per round trip')
+    args = parser.parse_args()
+
+    out = open(args.output, 'w') if args.output else sys.stdout
+    count = 0
+    try:
+        with SessionLocal() as session:
+            for entry in export_entries(session, args.user_id, kind=args.kind, batch_size=args.batch_size):
+                out.write(json.dumps(entry) + '\n')
+                count += 1
+    finally:
+        if args.output:
+            out.close()
+    print(f"Exported {count} entries", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Bulk import historical entries from a CSV or NDJSON file.
+
+Each record has kind and content, plus optional key, status and occurred_at.
+Records with a key upsert items (the last occurrence of a key wins); records
+without one are logged as events at their occurred_at. Rows stream through
+COPY into a staging table and merge into entries in a single transaction.
+
+Run with: source .env && uv run python scripts/import_entries.py history.csv [--format ndjson]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Database connection - check env first
+DATABASE_URL = os.getenv('DATABASE_URL')
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable not set")
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.memory.bulk_import import import_entries, read_records
+from src.memory.db import SessionLocal
+
+USER_ID = os.getenv('FITNESS_USER_ID', '1')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('path', help='CSV (with header row) or NDJSON file')
+    parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension')
+    parser.add_argument('--user-id', default=USER_ID, help='User to import into (default: FITNESS_USER_ID)')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    with SessionLocal() as session:
+        result = import_entries(session, args.user_id, read_records(args.path, args.format))
+    elapsed = time.perf_counter() - started
+    print(
+        f"Imported into {args.user_id} in {elapsed:.2f}s: "
+        f"{result['created']} created, {result['updated']} updated, {result['events']} events"
+    )
+
+
+if __name__ == "__main__":
+    main()
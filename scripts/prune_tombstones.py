@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Delete change feed tombstones older than the retention window.
+
+Every deleted entry leaves a tombstone so changes() can report the delete.
+Clients syncing within the window lose nothing; a client whose token predates
+the pruned tombstones gets a full snapshot (reset) on its next call. Run it
+periodically (e.g. nightly from cron) after applying
+migrations/013_change_feed_locks_and_retention.sql; it is safe to re-run.
+
+Run with: source .env && uv run python scripts/prune_tombstones.py [--days 90] [--user-id 1]
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+# Database connection - check env first
+DATABASE_URL = os.getenv('DATABASE_URL')
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable not set")
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.memory.crud import prune_tombstones
+from src.memory.db import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--days', type=int, default=90, help='Keep tombstones this many days (default: 90)')
+    parser.add_argument('--user-id', help='Only prune this user (default: everyone)')
+    args = parser.parse_args()
+
+    older_than = datetime.now(timezone.utc) - timedelta(days=args.days)
+    with SessionLocal() as session:
+        pruned = prune_tombstones(session, older_than, args.user_id)
+    print(f"Deleted {pruned} tombstones older than {older_than:%Y-%m-%d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Recompute the weekly and monthly history rollups from logs and metric readings.
+
+Writes keep the rollups they touch current; run this once after applying
+migrations/008_history_rollups.sql (and after backfill_metric_points.py), or
+periodically (e.g. nightly from cron) to repair rows changed outside the app.
+Each user's rollups are replaced, so it is safe to re-run.
+
+Run with: source .env && uv run python scripts/rebuild_history_rollups.py [--user-id 1]
+"""
+
+import argparse
+import os
+import sys
+
+# Database connection - check env first
+DATABASE_URL = os.getenv('DATABASE_URL')
+if not DATABASE_URL:
+    raise ValueError("DATABASE_URL environment variable not set")
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.memory.crud import rebuild_history_rollups
+from src.memory.db import SessionLocal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--user-id', help='Only rebuild this user (default: everyone)')
+    args = parser.parse_args()
+
+    with SessionLocal() as session:
+        written = rebuild_history_rollups(session, args.user_id)
+    print(f"Stored {written} history rollups")
+
+
+if __name__ == "__main__":
+    main()
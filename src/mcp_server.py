@@ -1,13 +1,17 @@
 """
-Simplified Fitness MCP Server - 4 Core Tools
+Simplified Fitness MCP Server - 4 Core Tools (+ bulk_upsert for batches)
 
 Following Claude Code's philosophy: minimal tool surface, maximum flexibility.
 Everything goes in content as natural text. Only 2 status values (active/archived).
 """
 
 from fastmcp import FastMCP
+from fastmcp.server.auth.providers.jwt import JWTVerifier
+from fastmcp.server.dependencies import get_access_token, get_http_request
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
 from typing import Optional, Any, Dict, List
-from contextlib import contextmanager
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 import os
 import sys
@@ -37,17 +41,88 @@ logfire.configure(
 
 # Enable SQLAlchemy auto-instrumentation
 logfire.install_auto_tracing(
-    modules=['src.memory.crud', 'src.memory.db'],
+    modules=['src.memory.crud', 'src.memory.db', 'src.memory.async_crud', 'src.memory.async_db'],
     min_duration=0.01
 )
 
 # Instrument SQLAlchemy
 logfire.instrument_sqlalchemy()
 
-from src.memory import crud
-from src.memory.db import SessionLocal, engine
+from src.memory import async_crud
+from src.memory.async_db import AsyncSessionLocal, async_engine, async_read_engines, async_read_session
+from src.memory.notify import start_change_listener
+from src.memory.crud import overview_cache_stats
+from src.memory.pool import pool_stats
 
-mcp = FastMCP("Fitness Memory Server (Simplified)")
+
+@asynccontextmanager
+async def database_resources():
+    """Warm up the async connection pool and start listening for other processes' writes.
+
+    Everything is released again on exit.
+    """
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            logfire.info('database connection pool initialized')
+    except Exception as e:
+        logfire.error('failed to initialize database pool', error=str(e))
+        raise
+    listener = start_change_listener()
+    try:
+        yield
+    finally:
+        if listener is not None:
+            listener.stop()
+        for engine in (async_engine, *async_read_engines):
+            await engine.dispose()
+
+
+# Set by create_http_app, whose app holds database_resources for its whole lifetime
+_app_owns_resources = False
+
+
+@asynccontextmanager
+async def lifespan(server: FastMCP):
+    """Hold database_resources while the server runs over stdio.
+
+    Stateless HTTP enters the server lifespan for every request on fastmcp 2.12,
+    which would restart the listener, pause the cache and dispose the engines each
+    time; there the Starlette app from create_http_app holds them instead.
+    """
+    if _app_owns_resources:
+        yield
+        return
+    async with database_resources():
+        yield
+
+
+# Verified token claim naming the athlete when serving HTTP
+USER_CLAIM = os.getenv('FITNESS_USER_CLAIM', 'sub')
+
+
+def _build_auth() -> Optional[JWTVerifier]:
+    """Bearer-token verification for HTTP serving, or None when none is configured.
+
+    FITNESS_JWT_SECRET (HS256 shared secret), FITNESS_JWT_PUBLIC_KEY (PEM) or
+    FITNESS_JWT_JWKS_URI selects the key; FITNESS_JWT_ISSUER, FITNESS_JWT_AUDIENCE
+    and FITNESS_JWT_ALGORITHM tighten verification. Stdio never sees a token.
+    """
+    secret = os.getenv('FITNESS_JWT_SECRET')
+    public_key = secret or os.getenv('FITNESS_JWT_PUBLIC_KEY')
+    jwks_uri = os.getenv('FITNESS_JWT_JWKS_URI')
+    if not public_key and not jwks_uri:
+        return None
+    return JWTVerifier(
+        public_key=public_key,
+        jwks_uri=None if public_key else jwks_uri,
+        issuer=os.getenv('FITNESS_JWT_ISSUER'),
+        audience=os.getenv('FITNESS_JWT_AUDIENCE'),
+        algorithm=os.getenv('FITNESS_JWT_ALGORITHM') or ('HS256' if secret else None),
+    )
+
+
+mcp = FastMCP("Fitness Memory Server (Simplified)", lifespan=lifespan, auth=_build_auth())
 
 # Load fitness coach instructions as a resource
 INSTRUCTIONS_PATH = Path(__file__).parent.parent / "FITNESS_COACH_INSTRUCTIONS_CONSOLIDATED.md"
@@ -55,25 +130,35 @@ INSTRUCTIONS_CONTENT = None
 if INSTRUCTIONS_PATH.exists():
     INSTRUCTIONS_CONTENT = INSTRUCTIONS_PATH.read_text()
 
-# Warm up the connection pool at startup
-try:
-    with engine.connect() as conn:
-        conn.execute(text("SELECT 1"))
-        logfire.info('database connection pool initialized')
-except Exception as e:
-    logfire.error('failed to initialize database pool', error=str(e))
-    raise
-
-@contextmanager
-def get_session():
-    """Context manager for database sessions"""
-    session = SessionLocal()
-    try:
+@asynccontextmanager
+async def get_session(read_for: Optional[str] = None):
+    """Async context manager for database sessions.
+
+    Pass read_for=user_id for read-only work, which may then go to a read replica.
+    """
+    async with (async_read_session(read_for) if read_for else AsyncSessionLocal()) as session:
         yield session
-    finally:
-        session.close()
+
+def _in_http_request() -> bool:
+    try:
+        get_http_request()
+    except RuntimeError:
+        return False
+    return True
+
 
 def _get_user_id() -> str:
+    """The athlete this call acts for.
+
+    Over HTTP with auth configured, the verified bearer token's USER_CLAIM, so one
+    process serves every athlete; otherwise (stdio) FITNESS_USER_ID, one per process.
+    """
+    if mcp.auth is not None and _in_http_request():
+        token = get_access_token()
+        user_id = token.claims.get(USER_CLAIM) if token is not None else None
+        if not user_id:
+            raise PermissionError(f"A bearer token with a '{USER_CLAIM}' claim is required")
+        return str(user_id)
     user_id = os.getenv('FITNESS_USER_ID') or os.getenv('DEFAULT_USER_ID')
     if not user_id:
         raise ValueError("FITNESS_USER_ID (or DEFAULT_USER_ID) must be set in environment")
@@ -85,7 +170,7 @@ def _get_user_id() -> str:
 # ====================
 
 @mcp.tool
-def upsert(
+async def upsert(
     kind: str,
     key: str,
     content: str,
@@ -151,10 +236,10 @@ def upsert(
     """
     user_id = _get_user_id()
 
-    with get_session() as session:
+    async with get_session() as session:
         # If no key provided (for metrics/notes), use log_event
         if not key:
-            return crud.log_event(
+            return await async_crud.log_event(
                 session,
                 user_id,
                 kind=kind,
@@ -162,7 +247,7 @@ def upsert(
                 occurred_at=None,
             )
         else:
-            return crud.upsert_item(
+            return await async_crud.upsert_item(
                 session,
                 user_id,
                 kind=kind,
@@ -173,9 +258,52 @@ def upsert(
             )
 
 
+@mcp.tool
+async def bulk_upsert(items: List[Dict[str, str]]) -> dict:
+    """Create or update many entries in one call (e.g. a generated week of plans, a block of logs).
+
+    Same rules as upsert, applied per record, all saved together in one transaction:
+    - Records with a key create or update that item (same key = update)
+    - Records with key '' create new timestamped events (metrics, notes)
+
+    Args:
+        items: List of {'kind': ..., 'key': ..., 'content': ..., 'status': ...} records
+               (status optional: 'active' default or 'archived')
+
+    Returns:
+        Dict with created/updated counts and per-record outcomes in input order
+
+    Examples:
+        # Save a week of plans
+        bulk_upsert(items=[
+            {'kind': 'plan', 'key': '2025-10-27-upper', 'content': 'Bench 4x8, rows 4x10.'},
+            {'kind': 'plan', 'key': '2025-10-28-run', 'content': 'Easy 5k Z2.'},
+            {'kind': 'plan', 'key': '2025-10-29-lower', 'content': 'Squat 5x5, RDL 3x8.'}
+        ])
+    """
+    user_id = _get_user_id()
+
+    async with get_session() as session:
+        rows = await async_crud.bulk_upsert_items(session, user_id, items=items)
+
+    results = []
+    for row in rows:
+        result = {'kind': row['kind'], 'outcome': row['outcome']}
+        if row['key'] is not None:
+            result['key'] = row['key']
+        else:
+            result['id'] = row['id']
+        results.append(result)
+
+    return {
+        'created': sum(1 for row in rows if row['outcome'] == 'created'),
+        'updated': sum(1 for row in rows if row['outcome'] == 'updated'),
+        'results': results,
+    }
+
 
 @mcp.tool
-def overview(truncate_words: int = 200, context: Optional[str] = None) -> dict:
+async def overview(truncate_words: int = 200, context: Optional[str] = None, max_tokens: Optional[int] = None) -> dict:
     """Get context-aware overview of data with truncated content.
 
     Returns relevant active items based on context, truncates verbose content for efficient scanning.
@@ -187,8 +315,13 @@ def overview(truncate_words: int = 200, context: Optional[str] = None) -> dict:
                 - 'planning': Goals, program, week, plan (recent 5), preferences, knowledge, logs (recent 10)
                 - 'upcoming': Goals, week, plan (recent 5), logs (recent 7)
                 - 'knowledge': Goals, program, preferences, knowledge
-                - 'history': Goals, all logs, all metrics (for progress review)
+                - 'history': Goals, logs and metrics (recent 20), plus a compact 'history' of
+                  weekly (last 12) and monthly rollups: session counts and types, metric min/max/avg
                 - None: All data (default)
+        max_tokens: Optional size budget for the whole response. Sections fill by priority
+                   (goals, strategies, week, plans, logs, metrics, ... knowledge last) and the
+                   sections that are normally truncated are cut harder to fit; 'budget' reports the
+                   words used and any truncated or elided entries.
 
     Returns:
         Organized dict with current_date, goals, program, week, recent_plans, knowledge (truncated), etc.
@@ -206,14 +339,19 @@ def overview(truncate_words: int = 200, context: Optional[str] = None) -> dict:
         # Review entire training history and progress
         overview(context='history')
 
+        # Keep the response under ~2000 tokens however much data exists
+        overview(max_tokens=2000)
+
     Workflow:
         1. Call overview() with appropriate context to scan what exists
         2. Use get() to fetch full details for relevant items
         3. Or use search() to find specific content
     """
     user_id = _get_user_id()
-    with get_session() as session:
-        result = crud.get_overview(session, user_id, truncate_words=truncate_words, context=context)
+    async with get_session(read_for=user_id) as session:
+        result = await async_crud.get_overview(
+            session, user_id, truncate_words=truncate_words, context=context, max_tokens=max_tokens
+        )
         today = date.today()
         result['current_date'] = today.isoformat()
         result['current_day'] = today.strftime('%A')
@@ -221,27 +359,44 @@ def overview(truncate_words: int = 200, context: Optional[str] = None) -> dict:
 
 
 @mcp.tool
-def get(
+async def get(
     items: Optional[List[Dict[str, str]]] = None,
     kind: Optional[str] = None,
     status: Optional[str] = None,
     start: Optional[str] = None,
     end: Optional[str] = None,
     limit: int = 100,
-) -> list[dict]:
+    cursor: Optional[str] = None,
+    metric: Optional[str] = None,
+    bucket: Optional[str] = None,
+) -> list[dict] | dict:
     """Get full details for specific items or filtered list.
 
-    Two modes:
+    Three modes:
     1. Fetch specific items by keys: get(items=[{'kind': 'goal', 'key': 'bench-225'}])
+       Returns a list of items.
     2. Filter and list: get(kind='log', start='2025-01-01', limit=10)
+       Returns {'items': [...], 'next_cursor': ...}, newest first. Pass next_cursor
+       back as cursor to fetch the next page; it is None on the last page.
+    3. Metric trend: get(metric='weight', start='2025-01-01', bucket='week')
+       Numbers parsed from metric entries ('Weight: 71kg'): count, min, max, avg,
+       first, last, change and unit over the range, plus a 'series' of per-bucket
+       averages when bucket is given. Far smaller than listing the metric entries.
+       All in the unit of the last reading (kg/lbs, km/mi etc. are converted);
+       'excluded' counts readings in units that don't convert to it.
 
     Args:
-        items: List of {'kind': ..., 'key': ...} to fetch specific items
+        items: List of {'kind': ..., 'key': ...} to fetch specific items.
+               Results follow the request order; items that don't exist come back as
+               {'kind': ..., 'key': ..., 'missing': True}
         kind: Filter by kind (for list mode)
         status: Filter by status (for list mode)
         start: ISO date start filter (for events)
         end: ISO date end filter (for events)
-        limit: Max results (default 100)
+        limit: Max results per page (default 100)
+        cursor: next_cursor from a previous list-mode call
+        metric: Metric name for trend mode, as written in metric entries (e.g. 'weight', 'resting HR')
+        bucket: Trend mode series resolution: 'day', 'week' or 'month'
 
     Examples:
         # Get specific items seen in overview
@@ -255,46 +410,67 @@ def get(
 
         # Get all active goals
         get(kind='goal', status='active')
+
+        # Page through all workout history
+        page = get(kind='log', limit=50)
+        page = get(kind='log', limit=50, cursor=page['next_cursor'])
+
+        # Bodyweight trend this year, week by week
+        get(metric='weight', start='2025-01-01', bucket='week')
     """
     user_id = _get_user_id()
 
-    with get_session() as session:
-        if items:
+    async with get_session(read_for=user_id) as session:
+        if metric:
+            # Mode 3: Metric trend from the parsed time series
+            start_dt = datetime.fromisoformat(start) if start else None
+            end_dt = datetime.fromisoformat(end) if end else None
+            result = await async_crud.metric_range(session, user_id, metric=metric, start=start_dt, end=end_dt)
+            if bucket:
+                result['series'] = await async_crud.metric_series(
+                    session, user_id, metric=metric, bucket=bucket, start=start_dt, end=end_dt
+                )
+            return result
+        elif items:
             # Mode 1: Fetch specific items by keys
             keys = [(item['kind'], item['key']) for item in items]
-            return crud.get_items_by_keys(session, user_id, keys=keys)
+            return await async_crud.get_items_by_keys(session, user_id, keys=keys)
         else:
             # Mode 2: Filter and list
             if kind in ['log', 'metric', 'note']:
                 # Events - use list_events
                 start_dt = datetime.fromisoformat(start) if start else None
                 end_dt = datetime.fromisoformat(end) if end else None
-                return crud.list_events(
+                return await async_crud.list_events_page(
                     session, user_id,
                     kind=kind,
                     start=start_dt,
                     end=end_dt,
-                    limit=limit
+                    limit=limit,
+                    cursor=cursor
                 )
             elif kind:
                 # Items - use list_items
-                return crud.list_items(
+                return await async_crud.list_items_page(
                     session, user_id,
                     kind=kind,
                     status=status,
-                    limit=limit
+                    limit=limit,
+                    cursor=cursor
                 )
             else:
                 # No filters - return empty
-                return []
+                return {"items": [], "next_cursor": None}
 
 
 @mcp.tool
-def archive(
+async def archive(
     kind: Optional[str] = None,
     key: Optional[str] = None,
     event_id: Optional[str] = None,
     status: Optional[str] = 'active',
+    key_prefix: Optional[str] = None,
+    before: Optional[str] = None,
 ) -> dict:
     """Archive items or events (soft delete by setting status='archived').
 
@@ -302,12 +478,15 @@ def archive(
     1. Archive specific item: archive(kind='goal', key='old-goal')
     2. Archive event: archive(event_id='abc123...')
     3. Bulk archive: archive(kind='preference', status='active')
+    4. Filtered bulk archive: archive(kind='plan', key_prefix='2025-09-') or archive(kind='plan', before='2025-10-01')
 
     Args:
         kind: Kind of items to archive
         key: Specific item key to archive
         event_id: Specific event ID to archive
         status: Current status filter for bulk archive (default 'active')
+        key_prefix: Bulk archive only items whose key starts with this prefix
+        before: ISO date - bulk archive only items last updated before this date
 
     Returns:
         Dict with archived_count and details
@@ -319,54 +498,39 @@ def archive(
         # Archive all active preferences
         archive(kind='preference')
 
+        # Archive last month's plans
+        archive(kind='plan', key_prefix='2025-09-')
+
         # Archive specific workout event
         archive(event_id='abc-123-def')
     """
     user_id = _get_user_id()
 
-    with get_session() as session:
+    async with get_session() as session:
         if event_id:
             # Delete specific event (events don't support archiving currently)
-            success = crud.delete_event(session, user_id, event_id=event_id)
+            success = await async_crud.delete_event(session, user_id, event_id=event_id)
             return {
                 'archived_count': 1 if success else 0,
                 'event_id': event_id
             }
         elif kind and key:
             # Archive specific item
-            crud.upsert_item(
-                session, user_id,
-                kind=kind,
-                key=key,
-                content='',  # Will be ignored in update
-                status='archived'
-            )
+            archived_keys = await async_crud.archive_items(session, user_id, kind=kind, key=key)
             return {
-                'archived_count': 1,
+                'archived_count': len(archived_keys),
                 'kind': kind,
                 'key': key
             }
         elif kind:
-            # Bulk archive
-            items = crud.list_items(
+            # Bulk archive (one UPDATE for every matching item)
+            archived_keys = await async_crud.archive_items(
                 session, user_id,
                 kind=kind,
                 status=status,
-                limit=1000
+                key_prefix=key_prefix,
+                before=datetime.fromisoformat(before) if before else None,
             )
-
-            archived_keys = []
-            for item in items:
-                if item.get('key'):
-                    crud.upsert_item(
-                        session, user_id,
-                        kind=kind,
-                        key=item['key'],
-                        content=item['content'],
-                        status='archived'
-                    )
-                    archived_keys.append(item['key'])
-
             return {
                 'archived_count': len(archived_keys),
                 'archived_keys': archived_keys,
@@ -376,6 +540,35 @@ def archive(
             return {'archived_count': 0, 'error': 'Must specify kind+key, event_id, or kind for bulk'}
 
 
+@mcp.tool
+async def changes(since: Optional[str] = None, limit: int = 500) -> dict:
+    """Get only what changed since an earlier call, for keeping a local copy in sync.
+
+    Every write and delete is recorded in order. Pass the next_token from the
+    previous call as since; without since everything is returned, oldest change first.
+    Deletes are kept for a retention window: an older since gets everything again with
+    reset true, and the local copy should be cleared before applying it.
+
+    Args:
+        since: next_token from a previous changes() call (omit for a full snapshot)
+        limit: Max changes per call (default 500); call again while has_more is true
+
+    Returns:
+        {'changed': [entries created or updated], 'deleted': [{'id', 'kind', 'key'}],
+         'next_token': str, 'has_more': bool, 'reset': bool}
+
+    Examples:
+        # First sync: everything
+        changes()
+
+        # Later: just the delta
+        changes(since='WzEyMzQsMF0')
+    """
+    user_id = _get_user_id()
+    async with get_session(read_for=user_id) as session:
+        return await async_crud.list_changes(session, user_id, since=since, limit=limit)
+
+
 # ====================
 # ====================
 # MCP RESOURCES
@@ -398,13 +591,108 @@ async def get_coach_instructions():
     else:
         return "Fitness coach instructions not found. Please ensure FITNESS_COACH_INSTRUCTIONS_CONSOLIDATED.md exists in the project root."
 
+# HTTP ROUTES
+# ====================
+
+async def _export_lines(user_id: str, kind: Optional[str]):
+    async with get_session(read_for=user_id) as session:
+        async for entry in async_crud.export_entries(session, user_id, kind=kind):
+            yield json.dumps(entry) + "\n"
+
+
+@mcp.custom_route("/export", methods=["GET"])
+async def export(request: Request) -> StreamingResponse:
+    """Stream the user's full history as NDJSON, oldest first.
+
+    Served when the server runs over HTTP; optional ?kind= limits the export to one
+    kind. Rows stream from a server-side cursor, so memory stays flat for any history
+    size. Over stdio, use scripts/export_entries.py instead.
+    """
+    # Custom routes sit outside the MCP endpoint's auth check
+    try:
+        user_id = _get_user_id()
+    except PermissionError as e:
+        return JSONResponse({'error': str(e)}, status_code=401)
+    except ValueError as e:
+        # No auth and no FITNESS_USER_ID: the server's configuration, not the caller, is at fault
+        return JSONResponse({'error': str(e)}, status_code=503)
+    kind = request.query_params.get('kind') or None
+    return StreamingResponse(_export_lines(user_id, kind), media_type="application/x-ndjson")
+
+
+@mcp.custom_route("/stats", methods=["GET"])
+async def stats(request: Request) -> JSONResponse:
+    """Connection pool and overview cache counters of the worker that answers.
+
+    Per pool: size and max_overflow as configured, connections in use, idle and in
+    overflow right now, and checkout count, timeouts and wait times since the pool
+    was created. Persistent waits mean DATABASE_POOL_SIZE/DATABASE_MAX_OVERFLOW are
+    too small for the load. The same numbers go to logfire as db.pool.* metrics.
+    """
+    try:
+        _get_user_id()
+    except PermissionError as e:
+        return JSONResponse({'error': str(e)}, status_code=401)
+    except ValueError as e:
+        return JSONResponse({'error': str(e)}, status_code=503)
+    return JSONResponse({'pools': pool_stats(), 'overview_cache': overview_cache_stats()})
+
 # RUN SERVER
 # ====================
 
+def create_http_app():
+    """ASGI app for HTTP serving, built once per worker process.
+
+    Stateless streamable HTTP keeps no MCP session between requests, so any worker
+    can answer any request and workers scale behind one port without sticky routing.
+    The database resources live as long as the app (see lifespan).
+    """
+    global _app_owns_resources
+    _app_owns_resources = True
+    app = mcp.http_app(stateless_http=True, json_response=True)
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def app_lifespan(app):
+        async with database_resources(), mcp_lifespan(app):
+            yield
+
+    app.router.lifespan_context = app_lifespan
+    return app
+
+
 def main():
-    """Entry point for the server"""
-    import asyncio
-    asyncio.run(mcp.run())
+    """Entry point for the server.
+
+    Serves stdio by default. --transport http (or FITNESS_TRANSPORT=http) serves
+    streamable HTTP on --host/--port at /mcp with --workers processes.
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description="Fitness MCP server")
+    parser.add_argument('--transport', choices=['stdio', 'http'], default=os.getenv('FITNESS_TRANSPORT', 'stdio'))
+    parser.add_argument('--host', default=os.getenv('HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '8000')))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '1')),
+                        help='HTTP worker processes sharing the port')
+    args = parser.parse_args()
+
+    if args.transport == 'stdio':
+        import asyncio
+        asyncio.run(mcp.run_async())
+        return
+
+    if mcp.auth is None:
+        logfire.warn('serving HTTP without auth: every request acts for FITNESS_USER_ID')
+    import uvicorn
+    # By module name as loaded here: workers re-run __main__ and must not import this file twice
+    uvicorn.run(
+        f'{__name__}:create_http_app',
+        factory=True,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        log_level='warning',
+    )
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
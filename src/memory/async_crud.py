@@ -0,0 +1,127 @@
+"""Async counterparts of the crud operations.
+
+Each function runs the matching sync implementation in crud.py through
+AsyncSession.run_sync: SQLAlchemy drives it on a greenlet over the async psycopg
+connection, so database I/O awaits on the event loop instead of blocking a worker
+thread, and the query logic lives in one place. export_entries is the exception:
+a generator cannot cross run_sync, so it streams crud's export statement directly.
+"""
+
+from typing import Any, AsyncIterator, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+
+
+async def upsert_item(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.upsert_item."""
+    return await session.run_sync(crud.upsert_item, user_id, **kwargs)
+
+
+async def bulk_upsert_items(session: AsyncSession, user_id: str, **kwargs: Any) -> list[dict]:
+    """See crud.bulk_upsert_items."""
+    return await session.run_sync(crud.bulk_upsert_items, user_id, **kwargs)
+
+
+async def get_item(session: AsyncSession, user_id: str, **kwargs: Any) -> Optional[dict]:
+    """See crud.get_item."""
+    return await session.run_sync(crud.get_item, user_id, **kwargs)
+
+
+async def get_items_by_keys(session: AsyncSession, user_id: str, **kwargs: Any) -> list[dict]:
+    """See crud.get_items_by_keys."""
+    return await session.run_sync(crud.get_items_by_keys, user_id, **kwargs)
+
+
+async def delete_item(session: AsyncSession, user_id: str, **kwargs: Any) -> bool:
+    """See crud.delete_item."""
+    return await session.run_sync(crud.delete_item, user_id, **kwargs)
+
+
+async def archive_items(session: AsyncSession, user_id: str, **kwargs: Any) -> list[str]:
+    """See crud.archive_items."""
+    return await session.run_sync(crud.archive_items, user_id, **kwargs)
+
+
+async def list_items(session: AsyncSession, user_id: str, **kwargs: Any) -> list[dict]:
+    """See crud.list_items."""
+    return await session.run_sync(crud.list_items, user_id, **kwargs)
+
+
+async def list_items_page(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.list_items_page."""
+    return await session.run_sync(crud.list_items_page, user_id, **kwargs)
+
+
+async def log_event(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.log_event."""
+    return await session.run_sync(crud.log_event, user_id, **kwargs)
+
+
+async def list_events(session: AsyncSession, user_id: str, **kwargs: Any) -> list[dict]:
+    """See crud.list_events."""
+    return await session.run_sync(crud.list_events, user_id, **kwargs)
+
+
+async def list_events_page(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.list_events_page."""
+    return await session.run_sync(crud.list_events_page, user_id, **kwargs)
+
+
+async def update_event(session: AsyncSession, user_id: str, **kwargs: Any) -> Optional[dict]:
+    """See crud.update_event."""
+    return await session.run_sync(crud.update_event, user_id, **kwargs)
+
+
+async def delete_event(session: AsyncSession, user_id: str, **kwargs: Any) -> bool:
+    """See crud.delete_event."""
+    return await session.run_sync(crud.delete_event, user_id, **kwargs)
+
+
+async def search_entries(session: AsyncSession, user_id: str, **kwargs: Any) -> list[dict]:
+    """See crud.search_entries."""
+    return await session.run_sync(crud.search_entries, user_id, **kwargs)
+
+
+async def search_entries_page(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.search_entries_page."""
+    return await session.run_sync(crud.search_entries_page, user_id, **kwargs)
+
+
+async def export_entries(
+    session: AsyncSession,
+    user_id: str,
+    *,
+    kind: Optional[str] = None,
+    batch_size: int = crud._EXPORT_BATCH_SIZE,
+) -> AsyncIterator[dict]:
+    """See crud.export_entries; streams with AsyncSession.stream instead of run_sync."""
+    result = await session.stream(crud.export_statement(user_id, kind=kind), execution_options={"yield_per": batch_size})
+    async for row in result:
+        yield crud._serialize(row)
+
+
+async def list_changes(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.list_changes."""
+    return await session.run_sync(crud.list_changes, user_id, **kwargs)
+
+
+async def latest_metric(session: AsyncSession, user_id: str, **kwargs: Any) -> Optional[dict]:
+    """See crud.latest_metric."""
+    return await session.run_sync(crud.latest_metric, user_id, **kwargs)
+
+
+async def metric_range(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.metric_range."""
+    return await session.run_sync(crud.metric_range, user_id, **kwargs)
+
+
+async def metric_series(session: AsyncSession, user_id: str, **kwargs: Any) -> list[dict]:
+    """See crud.metric_series."""
+    return await session.run_sync(crud.metric_series, user_id, **kwargs)
+
+
+async def get_overview(session: AsyncSession, user_id: str, **kwargs: Any) -> dict:
+    """See crud.get_overview."""
+    return await session.run_sync(crud.get_overview, user_id, **kwargs)
@@ -0,0 +1,45 @@
+"""Async engine and session factory (SQLAlchemy asyncio extension over psycopg async).
+
+Shares the URL and pool settings of db.py; psycopg v3 serves both the sync and the
+async dialect, so the same postgresql+psycopg:// URL works here. The SQLite backend
+goes through aiosqlite against the same database file. DATABASE_READ_URL replicas
+get async engines of their own for async_read_session. On Postgres their pools are
+the asyncio flavour of db.py's instrumented pool, reported by pool.pool_stats().
+"""
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from .db import DATABASE_READ_URLS, DATABASE_URL, ENGINE_OPTIONS, IS_SQLITE, choose_replica, engine_options, set_sqlite_pragmas
+from .pool import InstrumentedAsyncPool, register
+
+
+def async_engine_options(url: str, *, read_only: bool = False) -> dict:
+    """engine_options() with the asyncio pool: async engines refuse a threaded QueuePool."""
+    return dict(engine_options(url, read_only=read_only), poolclass=InstrumentedAsyncPool)
+
+
+if IS_SQLITE:
+    async_engine = create_async_engine(DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1), **ENGINE_OPTIONS)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+else:
+    async_engine = create_async_engine(DATABASE_URL, **async_engine_options(DATABASE_URL))
+async_read_engines = [create_async_engine(url, **async_engine_options(url, read_only=True)) for url in DATABASE_READ_URLS]
+
+register("async-primary", async_engine)
+for number, read_engine in enumerate(async_read_engines, 1):
+    register(f"async-replica-{number}", read_engine)
+
+# Same session semantics as SessionLocal: no autoflush, objects stay usable after commit
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def async_read_session(user_id: str) -> AsyncSession:
+    """An async session for read-only work on behalf of user_id, on a replica when one is due."""
+    replica = choose_replica(user_id, async_read_engines)
+    return AsyncSessionLocal(bind=replica) if replica is not None else AsyncSessionLocal()
@@ -0,0 +1,193 @@
+"""Bulk import of historical entries through COPY.
+
+Records stream into a temporary staging table with psycopg's COPY protocol and are
+merged into entries with one set-based INSERT ... ON CONFLICT, all in a single
+transaction. Importing years of spreadsheet logs therefore costs one COPY and one
+statement rather than one round trip and commit per row. The SQLite backend has no
+COPY and loads the staging table with batched executemany inserts instead.
+
+Record semantics match crud.bulk_upsert_items: records with a key upsert by
+(user_id, kind, key), repeated keys collapse to the last one in the file, and
+records without a key are logged as events, keeping their occurred_at when given.
+Unlike bulk_upsert_items, keyed records keep a given occurred_at too (a dated log
+from a spreadsheet still happened on its date); updates without one leave the
+stored occurred_at alone.
+Readings in imported metric events are parsed into metric_points as well, and the
+history rollups of every period the import touches are recomputed.
+"""
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table, Text, Uuid, and_, case, func, insert, literal, select
+from sqlalchemy.orm import Session
+from typing import Any, Iterable, Iterator, Optional
+from pathlib import Path
+from datetime import datetime
+import csv
+import json
+import logfire
+import uuid
+
+from .crud import (
+    _ROLLUP_KINDS, _insert_on_conflict, _invalidate_overview, _log_time, _normalize_status, _refresh_rollups,
+    _write_metric_points,
+)
+from .db import Entry, IS_SQLITE, UTCDateTime
+
+_SQLITE_BATCH_SIZE = 5000
+
+# Session-local staging table, dropped again before the import commits
+_staging = Table(
+    'entries_import',
+    MetaData(),
+    Column('seq', BigInteger, nullable=False),
+    Column('id', Uuid, nullable=False),
+    Column('kind', String(50), nullable=False),
+    Column('key', String(255)),
+    Column('content', Text, nullable=False),
+    Column('status', String(50), nullable=False),
+    Column('occurred_at', UTCDateTime),
+    prefixes=['TEMPORARY'],
+)
+
+
+def read_records(path: str | Path, format: Optional[str] = None) -> Iterator[dict[str, Any]]:
+    """Yield records from a CSV (header row) or NDJSON file without loading it whole.
+
+    The format defaults to the file extension (.csv, otherwise NDJSON). Empty CSV
+    cells are treated as missing values.
+    """
+    path = Path(path)
+    format = format or ('csv' if path.suffix.lower() == '.csv' else 'ndjson')
+    with path.open(newline='' if format == 'csv' else None, encoding='utf-8') as f:
+        if format == 'csv':
+            for row in csv.DictReader(f):
+                yield {k: v for k, v in row.items() if v != ''}
+        elif format == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported format '{format}' (use 'csv' or 'ndjson')")
+
+
+def _staging_rows(records: Iterable[dict[str, Any]], kinds: set[str]) -> Iterator[tuple]:
+    for seq, record in enumerate(records, start=1):
+        kind = record.get('kind')
+        content = record.get('content')
+        if not kind or content is None:
+            raise ValueError(f"Record {seq} needs a 'kind' and 'content'")
+        key = record.get('key') or None
+        occurred_at = record.get('occurred_at') or None
+        if occurred_at is not None and not isinstance(occurred_at, datetime):
+            try:
+                occurred_at = datetime.fromisoformat(str(occurred_at))
+            except ValueError:
+                raise ValueError(f"Record {seq} has an invalid occurred_at: {occurred_at!r}") from None
+        kinds.add(kind)
+        yield (
+            seq,
+            uuid.uuid4(),  # only used for new rows; conflicting items keep their id
+            kind,
+            key,
+            content,
+            _normalize_status(record.get('status')) if key else 'active',
+            occurred_at,
+        )
+
+
+def _load_staging(connection, rows: Iterator[tuple]) -> None:
+    columns = [c.name for c in _staging.columns]
+    if IS_SQLITE:
+        batch: list[dict[str, Any]] = []
+        for row in rows:
+            batch.append(dict(zip(columns, row)))
+            if len(batch) == _SQLITE_BATCH_SIZE:
+                connection.execute(insert(_staging), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(_staging), batch)
+        return
+    # COPY goes through the session's own psycopg connection and transaction
+    with connection.connection.driver_connection.cursor() as cursor:
+        with cursor.copy(f"COPY {_staging.name} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def import_entries(session: Session, user_id: str, records: Iterable[dict[str, Any]]) -> dict[str, int]:
+    """COPY records into a staging table and merge them into entries in one statement.
+
+    Records are dicts with kind, content and optional key, status and occurred_at
+    (see read_records). Everything commits together; a bad record aborts the import.
+
+    Returns:
+        {'created': n, 'updated': n, 'events': n}
+    """
+    with logfire.span('bulk import entries', user_id=user_id) as span:
+        kinds: set[str] = set()
+        try:
+            connection = session.connection()
+            _staging.drop(connection, checkfirst=True)
+            _staging.create(connection)
+            _load_staging(connection, _staging_rows(records, kinds))
+
+            # One row per item key (the last in the file wins); every event row is distinct
+            latest = func.row_number().over(
+                partition_by=(_staging.c.kind, _staging.c.key, case((_staging.c.key.is_(None), _staging.c.seq))),
+                order_by=_staging.c.seq.desc(),
+            )
+            ranked = select(_staging, latest.label('latest')).subquery()
+            source = select(
+                ranked.c.id,
+                literal(user_id).label('user_id'),
+                ranked.c.kind,
+                ranked.c.key,
+                ranked.c.content,
+                ranked.c.status,
+                case((ranked.c.key.is_(None), func.coalesce(ranked.c.occurred_at, func.now())),
+                     else_=ranked.c.occurred_at).label('occurred_at'),
+            ).where(ranked.c.latest == 1)
+            stmt = _insert_on_conflict(Entry).from_select(
+                ['id', 'user_id', 'kind', 'key', 'content', 'status', 'occurred_at'], source,
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Entry.user_id, Entry.kind, Entry.key],
+                set_={
+                    "content": stmt.excluded.content,
+                    "status": stmt.excluded.status,
+                    "occurred_at": func.coalesce(stmt.excluded.occurred_at, Entry.occurred_at),
+                    "updated_at": func.now(),
+                },
+            ).returning(Entry.key, Entry.updated_at, Entry.kind, func.coalesce(Entry.occurred_at, Entry.created_at))
+
+            # Updated logs may leave the period they counted towards, so refresh that one too
+            rollup_times = [] if not kinds & set(_ROLLUP_KINDS) else [
+                _log_time(key, at) for key, at in session.execute(
+                    select(Entry.key, func.coalesce(Entry.occurred_at, Entry.created_at))
+                    .join(_staging, and_(_staging.c.kind == Entry.kind, _staging.c.key == Entry.key))
+                    .where(Entry.user_id == user_id, Entry.kind.in_(_ROLLUP_KINDS), _staging.c.occurred_at.isnot(None))
+                )
+            ]
+
+            # Fresh inserts have no updated_at; ON CONFLICT DO UPDATE always sets it
+            counts = {"created": 0, "updated": 0, "events": 0}
+            for key, updated_at, kind, at in session.execute(stmt):
+                counts["events" if key is None else "created" if updated_at is None else "updated"] += 1
+                if kind in _ROLLUP_KINDS:
+                    rollup_times.append(_log_time(key, at))
+            if 'metric' in kinds:
+                # Imported metric events keep their staging ids, which finds them again for parsing
+                metric_ids = select(_staging.c.id).where(_staging.c.key.is_(None), _staging.c.kind == 'metric')
+                _write_metric_points(session, session.execute(
+                    select(Entry.id, Entry.user_id, Entry.kind, Entry.key, Entry.content, Entry.occurred_at)
+                    .where(Entry.id.in_(metric_ids))
+                ).all())
+            _refresh_rollups(session, user_id, rollup_times)
+            _staging.drop(connection)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        _invalidate_overview(user_id, *kinds)
+
+        span.set_attributes(counts)
+        return counts
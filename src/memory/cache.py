@@ -0,0 +1,175 @@
+"""In-process cache for overview snapshots.
+
+Overview is the most frequent tool call and the underlying rows rarely change
+between calls, so we keep recent results keyed by (user_id, context, truncate_words).
+Entries expire after a TTL and the least recently used entry is evicted once the
+cache is full. Writes in crud invalidate only the contexts that render the kind
+that changed; writes from other processes arrive through notify.ChangeListener,
+which pauses the cache whenever it may be missing them.
+
+RecentWrites remembers which users wrote in the last few seconds, so reads for
+them can skip read replicas that may not have replayed the write yet.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Any, Callable, Optional
+import copy
+import os
+
+
+class OverviewCache:
+    """Thread-safe LRU cache with TTL expiry and hit/miss counters."""
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[tuple, tuple[float, dict]] = OrderedDict()
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._paused = False
+        # Bumped by invalidate (per user) and by pause/clear (for everyone), so a value
+        # built from reads that a write has since invalidated is never stored
+        self._epoch = 0
+        self._generations: dict[str, int] = {}
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0 and not self._paused
+
+    def pause(self) -> None:
+        """Empty the cache and treat every lookup as a miss until resume()."""
+        with self._lock:
+            self._paused = True
+            self._new_epoch()
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def resume(self) -> None:
+        self._paused = False
+
+    def get(self, key: tuple) -> Optional[dict]:
+        """Return a copy of the cached value, or None on miss/expiry."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, value = item
+            if expires_at <= monotonic():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        # Callers decorate the result (current_date etc.), so never hand out the cached dict
+        return copy.deepcopy(value)
+
+    def generation(self, user_id: str) -> tuple[int, int]:
+        """Token to capture before building a value for user_id and pass to set()."""
+        with self._lock:
+            return self._epoch, self._generations.get(user_id, 0)
+
+    def set(self, key: tuple, value: dict, generation: Optional[tuple[int, int]] = None) -> None:
+        """Store value, unless the user was invalidated since `generation` was taken."""
+        if not self.enabled:
+            return
+        stored = copy.deepcopy(value)
+        with self._lock:
+            if self._paused:  # paused while the value was being built
+                return
+            if generation is not None and generation != (self._epoch, self._generations.get(key[0], 0)):
+                return  # a write landed while the value was being built
+            self._data[key] = (monotonic() + self.ttl, stored)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: str, match: Optional[Callable[[tuple], bool]] = None) -> int:
+        """Drop cached entries for a user, optionally only keys accepted by `match`."""
+        with self._lock:
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+            stale = [
+                key for key in self._data
+                if key[0] == user_id and (match is None or match(key))
+            ]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._new_epoch()
+            self.invalidations += len(self._data)
+            self._data.clear()
+
+    def _new_epoch(self) -> None:
+        # Every outstanding generation is stale now, so per-user counters can restart
+        self._epoch += 1
+        self._generations.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "paused": self._paused,
+            }
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.invalidations = 0
+
+
+overview_cache = OverviewCache(
+    maxsize=int(os.getenv("OVERVIEW_CACHE_SIZE", "256")),
+    ttl=float(os.getenv("OVERVIEW_CACHE_TTL", "300")),
+)
+
+
+class RecentWrites:
+    """When each user last wrote, as far as this process has seen, for read-your-writes."""
+
+    def __init__(self, window: float = 5.0):
+        self.window = window
+        self._seen: dict[str, float] = {}
+        self._all_until = 0.0
+        self._prune_at = 1024
+        self._lock = Lock()
+
+    def mark(self, user_id: str) -> None:
+        now = monotonic()
+        with self._lock:
+            self._seen[user_id] = now
+            if len(self._seen) >= self._prune_at:
+                self._seen = {u: t for u, t in self._seen.items() if now - t < self.window}
+                self._prune_at = max(1024, 2 * len(self._seen))
+
+    def mark_all(self, seconds: Optional[float] = None) -> None:
+        """Treat every user as a recent writer for the window (or `seconds`), e.g. while
+        other processes' writes may have gone unseen."""
+        self._all_until = monotonic() + (self.window if seconds is None else seconds)
+
+    def is_recent(self, user_id: str) -> bool:
+        now = monotonic()
+        if now < self._all_until:
+            return True
+        seen = self._seen.get(user_id)
+        return seen is not None and now - seen < self.window
+
+
+recent_writes = RecentWrites(window=float(os.getenv("READ_YOUR_WRITES_SECONDS", "5")))
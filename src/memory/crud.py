@@ -1,16 +1,77 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import select, and_, update, delete
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, and_, or_, case, cast, insert, update, delete, bindparam, literal, literal_column, tuple_, union_all, Date, Double, String
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects.postgresql import insert as pg_insert
-from sqlalchemy.sql import func
-from typing import Optional, Any, Iterable
-from .db import Entry
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import column, func, table
+from typing import Optional, Any, Iterable, Iterator
+from .db import ChangeFeedHorizon, Entry, EntryTombstone, HistoryRollup, IS_SQLITE, MetricPoint, PREVIEW_WORDS, UTCDateTime
+from .cache import overview_cache, recent_writes
+from .metrics import normalize_metric_name, parse_metrics, unit_factor
 import uuid
 import logfire
-from datetime import datetime, date, timezone
+from datetime import datetime, date, time, timedelta, timezone
+import base64
+import functools
 import json
+import re
 from collections import defaultdict
 
 
+# Writes return the row via RETURNING; refresh any copy already in the identity map
+# and skip the extra SELECT the ORM would otherwise use to sync the session
+_RETURNING_OPTIONS = {"populate_existing": True, "synchronize_session": False}
+
+# INSERT ... ON CONFLICT for the configured backend; both dialects share the API
+_insert_on_conflict = sqlite_insert if IS_SQLITE else pg_insert
+
+_LOCK_CHANGE_FEED = select(func.entries_lock_change_feed(bindparam('owners', type_=ARRAY(String))))
+
+
+def lock_change_feed(session: Session, user_ids: Iterable[str]) -> None:
+    """Hold the change feed locks of user_ids until the transaction ends.
+
+    Call before a statement writing entries of several users: the locks are taken
+    once, in one order (migrations/013_change_feed_locks_and_retention.sql), where
+    the row triggers would take them row by row and can deadlock. SQLite has a
+    single writer and needs no locks.
+    """
+    if not IS_SQLITE:
+        session.execute(_LOCK_CHANGE_FEED, {"owners": list(user_ids)})
+
+
+def _locking_change_feed(stmt, user_id: str):
+    """An UPDATE or DELETE of user_id's entries that takes the user's change feed lock first.
+
+    The row triggers ask for it only after the row is locked, so a writer of the
+    same user holding the lock and wanting that row would deadlock. As a constant
+    condition, the lock is evaluated once, before any row qualifies. Inserts need
+    nothing: their trigger runs before ON CONFLICT locks a row.
+    """
+    if IS_SQLITE:
+        return stmt
+    return stmt.where(select(func.entries_lock_change_feed(literal([user_id], ARRAY(String)))).scalar_subquery())
+
+# SQLite's FTS5 index (see db.SQLITE_FTS_DDL); Postgres searches Entry.fts instead
+_entries_fts = table('entries_fts', column('entry_id', Entry.id.type), column('document', String))
+
+
+def _dispatch(fn):
+    """Serve calls whose session is an in-memory store (see memory_store) from the store.
+
+    The store implements each decorated operation under the same name and signature,
+    minus the session, so callers pick a backend just by the session they pass in.
+    """
+    @logfire.no_auto_trace  # spans belong to the wrapped function, not this shim
+    @functools.wraps(fn)
+    def wrapper(session, *args, **kwargs):
+        if getattr(session, 'in_memory', False):
+            return getattr(session, fn.__name__)(*args, **kwargs)
+        return fn(session, *args, **kwargs)
+    return wrapper
+
+
 def _serialize(entry: Entry) -> dict:
     """Serialize entry to dict."""
     return {
@@ -26,6 +87,22 @@ def _serialize(entry: Entry) -> dict:
     }
 
 
+def _encode_cursor(values: list[Any]) -> str:
+    """Opaque pagination token for the last row of a page."""
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def _decode_cursor(token: str, size: int) -> list[Any]:
+    """Decode a token from _encode_cursor, raising ValueError unless it holds `size` values."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
 def _format_timestamp(value: Optional[datetime]) -> Optional[str]:
     if not value:
         return None
@@ -43,6 +120,9 @@ def _short_ref(entry_id: uuid.UUID) -> str:
     return entry_id.hex[:8]
 
 
+_TRUNCATION_MARKER = "... [truncated - use get() for full content]"
+
+
 def _clean_entry(entry: Entry, *, for_overview: bool = False, truncate_content: int = 0, truncate_words: int = 0) -> dict[str, Any]:
     """Clean and format entry for output.
 
@@ -58,9 +138,10 @@ def _clean_entry(entry: Entry, *, for_overview: bool = False, truncate_content:
         truncated = False
 
         if truncate_words > 0:
-            # Word-based truncation (more natural)
+            # Word-based truncation (more natural). Overview rows of long entries may
+            # carry just a preview, with word_count giving the full length.
             words = content.split()
-            if len(words) > truncate_words:
+            if (getattr(entry, 'word_count', None) or len(words)) > truncate_words:
                 content = ' '.join(words[:truncate_words])
                 truncated = True
         elif truncate_content > 0 and len(content) > truncate_content:
@@ -69,7 +150,7 @@ def _clean_entry(entry: Entry, *, for_overview: bool = False, truncate_content:
             truncated = True
 
         if truncated:
-            content = content.rstrip() + "... [truncated - use get() for full content]"
+            content = content.rstrip() + _TRUNCATION_MARKER
 
         data: dict[str, Any] = {
             "key": entry.key,
@@ -126,6 +207,323 @@ def _group_by_status(entries: list[Entry], *, default_key: str = "other") -> dic
     return groups
 
 
+# Kinds included per overview context (None or unknown contexts include every section kind)
+_OVERVIEW_CONTEXT_KINDS: dict[str, set[str]] = {
+    'planning': {'goal', 'program', 'week', 'plan', 'preference', 'knowledge', 'log'},
+    'upcoming': {'goal', 'week', 'plan', 'log'},
+    'knowledge': {'goal', 'program', 'preference', 'knowledge'},
+    'history': {'goal', 'log', 'metric'},
+}
+
+
+# Kinds that have an overview section; everything else (e.g. 'issue') is never fetched
+_OVERVIEW_SECTION_KINDS = (
+    'strategy', 'goal', 'plan', 'current', 'program', 'week',
+    'preference', 'knowledge', 'principle', 'log', 'metric', 'note',
+)
+_OVERVIEW_STRATEGY_KEYS = ('long_term', 'long-term', 'short_term', 'short-term')
+# Kinds whose overview content is cut to truncate_words (the rest is shown in full)
+_OVERVIEW_TRUNCATED_KINDS = ('strategy', 'program', 'preference', 'knowledge', 'principle', 'log', 'note')
+
+
+def _overview_includes_kind(context: Optional[str], kind: str) -> bool:
+    if kind not in _OVERVIEW_SECTION_KINDS:
+        return False
+    kinds = _OVERVIEW_CONTEXT_KINDS.get(context) if context else None
+    return kinds is None or kind in kinds
+
+
+def _invalidate_overview(user_id: str, *kinds: str) -> None:
+    """Drop cached overviews for a user whose context renders any of the given kinds.
+
+    Every write path calls this, so it also keeps the user's reads on the primary
+    for the read-your-writes window.
+    """
+    recent_writes.mark(user_id)
+    overview_cache.invalidate(
+        user_id,
+        lambda cache_key: any(_overview_includes_kind(cache_key[1], kind) for kind in kinds),
+    )
+
+
+def overview_cache_stats() -> dict[str, Any]:
+    """Hit/miss counters and size of the in-process overview cache."""
+    return overview_cache.stats()
+
+
+def _activity_time():
+    """When an entry last mattered: occurrence for events, last change for items."""
+    return func.coalesce(Entry.occurred_at, Entry.updated_at, Entry.created_at)
+
+
+def _normalize_status(status: Optional[str]) -> str:
+    """Normalize status to binary ('active' or 'archived')."""
+    if status is None:
+        return 'active'
+    if status not in ('active', 'archived'):
+        return 'archived' if status in ('archived', 'deleted', 'inactive') else 'active'
+    return status
+
+
+def _metric_point_rows(entries: Iterable[Any]) -> list[dict[str, Any]]:
+    """metric_points rows for the readings in the metric events among `entries`."""
+    rows = []
+    for entry in entries:
+        if entry.kind != 'metric' or entry.key is not None:
+            continue
+        for metric_name, value, unit in parse_metrics(entry.content):
+            rows.append({
+                "entry_id": entry.id,
+                "metric_name": metric_name,
+                "user_id": entry.user_id,
+                "value": value,
+                "unit": unit,
+                "occurred_at": entry.occurred_at,
+            })
+    return rows
+
+
+def _write_metric_points(session: Session, entries: Iterable[Any], *, replace: bool = False) -> None:
+    """Store the parsed readings of metric events in the current transaction.
+
+    Nothing is executed for entries without readings, so other writes keep their
+    single statement. With replace, earlier readings of the entries are dropped first.
+    """
+    entries = [entry for entry in entries if entry.kind == 'metric' and entry.key is None]
+    if not entries:
+        return
+    if replace:
+        session.execute(delete(MetricPoint).where(MetricPoint.entry_id.in_([entry.id for entry in entries])))
+    rows = _metric_point_rows(entries)
+    if rows:
+        session.execute(insert(MetricPoint), rows)
+
+
+# History rollup periods, each mapping a day to the first day of its period
+_ROLLUP_PERIODS = {
+    'week': lambda day: day - timedelta(days=day.weekday()),  # ISO weeks start on Monday
+    'month': lambda day: day.replace(day=1),
+}
+_ROLLUP_KINDS = ('log', 'metric')
+_HISTORY_WEEKS = 12  # weekly rows in the history overview; months go back to the start
+_SESSION_TYPE = re.compile(r'^\d{4}-\d{2}-\d{2}-(.+)$')  # '2025-10-29-upper' -> 'upper'
+
+
+def _rollup_day(at: datetime) -> date:
+    """The UTC date a log or reading counts towards."""
+    return (at.astimezone(timezone.utc) if at.tzinfo else at).date()
+
+
+def _log_time(key: Optional[str], at: datetime) -> datetime:
+    """When a log counts for history: midnight UTC of its key's date ('2025-10-29-upper'), else `at`.
+
+    Date-keyed logs are often written after the session (or back-filled), so the
+    key is the better record of the day; `at` is occurred_at, falling back to created_at.
+    """
+    if key and _SESSION_TYPE.match(key):
+        try:
+            return datetime.combine(date.fromisoformat(key[:10]), time.min, timezone.utc)
+        except ValueError:  # '2025-13-45-upper' has the shape but no date
+            pass
+    return at
+
+
+def _period_end(period: str, start: date) -> date:
+    if period == 'week':
+        return start + timedelta(days=7)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def _aggregate_rollups(
+    logs: Iterable[tuple[Optional[str], datetime]],
+    points: Iterable[tuple[str, datetime, float, Optional[str]]],
+) -> dict[tuple[str, date], dict[str, Any]]:
+    """Summarize logs (key, at; see _log_time) and metric readings (name, at, value, unit) per (period, period_start).
+
+    A rollup has 'sessions' (log count), 'session_types' (counts of the type suffix
+    of date-keyed logs) and 'metrics' ({name: {count, min, max, avg, unit}}, in the
+    unit of the period's last reading; readings that don't convert to it are left out).
+    """
+    rollups: dict[tuple[str, date], dict[str, Any]] = defaultdict(
+        lambda: {"sessions": 0, "session_types": {}, "metrics": {}})
+    for key, at in logs:
+        match = _SESSION_TYPE.match(key or '')
+        day = _rollup_day(_log_time(key, at))
+        for period, start in _ROLLUP_PERIODS.items():
+            rollup = rollups[(period, start(day))]
+            rollup["sessions"] += 1
+            if match:
+                rollup["session_types"][match[1]] = rollup["session_types"].get(match[1], 0) + 1
+
+    # Per (period, start, name): {unit: [count, min, max, total]} and the last reading's (at, unit)
+    groups: dict[tuple[str, date, str], dict[Optional[str], list]] = defaultdict(dict)
+    last: dict[tuple[str, date, str], tuple[datetime, Optional[str]]] = {}
+    for name, at, value, unit in points:
+        for period, start in _ROLLUP_PERIODS.items():
+            bucket = (period, start(_rollup_day(at)), name)
+            group = groups[bucket].get(unit)
+            if group is None:
+                groups[bucket][unit] = [1, value, value, value]
+            else:
+                group[0] += 1
+                group[1] = min(group[1], value)
+                group[2] = max(group[2], value)
+                group[3] += value
+            if bucket not in last or at >= last[bucket][0]:
+                last[bucket] = (at, unit)
+    for (period, start, name), by_unit in groups.items():
+        unit = last[(period, start, name)][1]
+        count, low, high, total, _ = _merge_units(by_unit, unit)
+        rollups[(period, start)]["metrics"][name] = {
+            "count": count, "min": round(low, 2), "max": round(high, 2), "avg": round(total / count, 2), "unit": unit,
+        }
+    return rollups
+
+
+def _merge_units(groups: dict[Optional[str], Iterable[float]], unit: Optional[str]) -> tuple[int, float, float, float, int]:
+    """Combine per-unit (count, min, max, total) aggregates of one metric, converted to `unit`.
+
+    Returns (count, min, max, total, excluded); readings whose unit doesn't convert to
+    `unit` (see metrics.unit_factor) are left out and only counted in `excluded`.
+    """
+    count, low, high, total, excluded = 0, None, None, 0.0, 0
+    for group_unit, (group_count, group_min, group_max, group_total) in groups.items():
+        factor = unit_factor(group_unit, unit)
+        if factor is None:
+            excluded += group_count
+            continue
+        count += group_count
+        low = group_min * factor if low is None else min(low, group_min * factor)
+        high = group_max * factor if high is None else max(high, group_max * factor)
+        total += group_total * factor
+    return count, low, high, total, excluded
+
+
+def _rollup_source_stmt(user_id: str, start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Logs and metric readings of a user in [start, end), as (source, name, at, value, unit) rows.
+
+    Archived logs are left out, as in the overview. A date-keyed log is selected by its
+    key's date and by `at`, a superset of the logs _log_time puts in the span; rows
+    outside it only land in periods _refresh_rollups doesn't write.
+    """
+    at = func.coalesce(Entry.occurred_at, Entry.created_at)
+    logs = select(literal('log').label('source'), Entry.key.label('name'), at.label('at'),
+                  literal(None, Double).label('value'), literal(None, String).label('unit')
+                  ).where(Entry.user_id == user_id, Entry.kind == 'log', Entry.status != 'archived')
+    points = select(literal('metric'), MetricPoint.metric_name, MetricPoint.occurred_at, MetricPoint.value,
+                    MetricPoint.unit).where(MetricPoint.user_id == user_id)
+    if start is not None:
+        # ISO dates compare as strings, so the key's date needs no cast (which fails on '2025-13-45')
+        key_day = func.substr(Entry.key, 1, 10)
+        logs = logs.where(or_(
+            and_(at >= start, at < end),
+            and_(Entry.key.like('____-__-__-_%'),
+                 key_day >= start.date().isoformat(), key_day < end.date().isoformat()),
+        ))
+        points = points.where(MetricPoint.occurred_at >= start, MetricPoint.occurred_at < end)
+    return union_all(logs, points)
+
+
+def _compute_rollups(session: Session, user_id: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> dict[tuple[str, date], dict[str, Any]]:
+    logs, points = [], []
+    for row in session.execute(_rollup_source_stmt(user_id, start, end)):
+        if row.source == 'log':
+            logs.append((row.name, row.at))
+        else:
+            points.append((row.name, row.at, row.value, row.unit))
+    return _aggregate_rollups(logs, points)
+
+
+def _store_rollups(session: Session, user_id: str, rollups: dict[tuple[str, date], dict[str, Any]]) -> None:
+    rows = [
+        {"user_id": user_id, "period": period, "period_start": start, **rollup}
+        for (period, start), rollup in rollups.items()
+    ]
+    for chunk in range(0, len(rows), _BULK_CHUNK_SIZE):
+        stmt = _insert_on_conflict(HistoryRollup).values(rows[chunk:chunk + _BULK_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[HistoryRollup.user_id, HistoryRollup.period, HistoryRollup.period_start],
+            set_={
+                "sessions": stmt.excluded.sessions,
+                "session_types": stmt.excluded.session_types,
+                "metrics": stmt.excluded.metrics,
+                "updated_at": func.now(),
+            },
+        )
+        session.execute(stmt)
+
+
+def _refresh_rollups(session: Session, user_id: str, times: Iterable[Optional[datetime]]) -> None:
+    """Recompute the week and month rollups containing `times` in the current transaction.
+
+    One SELECT reads the logs and readings of the covered span and one upsert writes
+    the periods back (emptied periods as zero rows), so a log or metric write costs
+    two extra statements and other writes none.
+    """
+    days = {_rollup_day(at) for at in times if at is not None}
+    if not days:
+        return
+    targets = {(period, start(day)) for day in days for period, start in _ROLLUP_PERIODS.items()}
+    span_start = datetime.combine(min(start for _, start in targets), time.min, timezone.utc)
+    span_end = datetime.combine(max(_period_end(*target) for target in targets), time.min, timezone.utc)
+    computed = _compute_rollups(session, user_id, span_start, span_end)
+    # The span can clip periods other than the targets, so only the targets are written
+    _store_rollups(session, user_id, {
+        target: computed.get(target, {"sessions": 0, "session_types": {}, "metrics": {}}) for target in targets
+    })
+
+
+def _history_first_week() -> date:
+    """Start of the oldest week the history overview lists."""
+    this_week = _ROLLUP_PERIODS['week'](datetime.now(timezone.utc).date())
+    return this_week - timedelta(weeks=_HISTORY_WEEKS - 1)
+
+
+def _history_section(rollups: Iterable[tuple[str, date, dict[str, Any]]]) -> dict[str, list[dict]]:
+    """Render (period, period_start, rollup) rows as the history overview section, newest first.
+
+    Weeks cover the last _HISTORY_WEEKS weeks, months all history; periods without
+    logs or readings are left out.
+    """
+    first_week = _history_first_week()
+    section: dict[str, list[dict]] = {"weeks": [], "months": []}
+    for period, start, rollup in sorted(rollups, key=lambda row: row[1], reverse=True):
+        if not rollup["sessions"] and not rollup["metrics"]:
+            continue
+        if period == 'week' and start < first_week:
+            continue
+        row = {"start": start.isoformat(), "sessions": rollup["sessions"]}
+        if rollup["session_types"]:
+            row["session_types"] = dict(sorted(rollup["session_types"].items()))
+        if rollup["metrics"]:
+            row["metrics"] = dict(sorted(rollup["metrics"].items()))
+        section["weeks" if period == 'week' else "months"].append(row)
+    return section
+
+
+# Statements for the hottest calls are built once, with every value a bind parameter.
+# Executing the same statement object reuses its memoized cache key and compiled SQL,
+# so a call skips rebuilding and re-compiling the tree; identical SQL text also lets
+# psycopg prepare it server-side (see db.engine_options).
+_upsert_values = _insert_on_conflict(Entry).values(
+    user_id=bindparam('user_id'),
+    kind=bindparam('kind'),
+    key=bindparam('key'),
+    content=bindparam('content'),
+    status=bindparam('status'),
+)
+_UPSERT_ITEM = _upsert_values.on_conflict_do_update(
+    index_elements=[Entry.user_id, Entry.kind, Entry.key],
+    set_={
+        "content": _upsert_values.excluded.content,
+        "status": _upsert_values.excluded.status,
+        "updated_at": func.now(),
+    },
+).returning(Entry)
+
+
+@_dispatch
 def upsert_item(
     session: Session,
     user_id: str,
@@ -144,74 +542,136 @@ def upsert_item(
                 If both old_key and key exist, raises ValueError.
     """
     with logfire.span('upsert item', user_id=user_id, kind=kind, key=key, old_key=old_key):
-        # Normalize status to binary
-        if status is None:
-            status = 'active'
-        elif status not in ('active', 'archived'):
-            status = 'archived' if status in ('archived', 'deleted', 'inactive') else 'active'
+        status = _normalize_status(status)
 
-        # Handle rename case
+        # Handle rename case: a single UPDATE ... RETURNING, the unique constraint
+        # on (user_id, kind, key) rejects renaming onto an existing key
         if old_key is not None and old_key != key:
-            # Check if old entry exists
-            old_entry = session.execute(
-                select(Entry).where(and_(
-                    Entry.user_id == user_id,
-                    Entry.kind == kind,
-                    Entry.key == old_key
-                ))
-            ).scalar_one_or_none()
-
-            if old_entry:
-                # Check if new key already exists (conflict)
-                new_entry_exists = session.execute(
-                    select(Entry).where(and_(
-                        Entry.user_id == user_id,
-                        Entry.kind == kind,
-                        Entry.key == key
-                    ))
-                ).scalar_one_or_none()
-
-                if new_entry_exists:
-                    raise ValueError(f"Cannot rename: entry with key '{key}' already exists")
-
-                # Rename: update the old entry with new key and content
-                old_entry.key = key
-                old_entry.content = content
-                old_entry.status = status
-                old_entry.updated_at = func.now()
+            rename = _locking_change_feed(
+                update(Entry)
+                .where(and_(Entry.user_id == user_id, Entry.kind == kind, Entry.key == old_key))
+                .values(key=key, content=content, status=status, updated_at=func.now())
+                .returning(Entry),
+                user_id,
+            )
+            try:
+                renamed = session.scalars(rename, execution_options=_RETURNING_OPTIONS).one_or_none()
+            except IntegrityError:
+                session.rollback()
+                raise ValueError(f"Cannot rename: entry with key '{key}' already exists") from None
+
+            if renamed is not None:
+                if kind == 'log':
+                    # A date key moves the log between periods, so refresh the one it left too
+                    at = renamed.occurred_at or renamed.created_at
+                    _refresh_rollups(session, user_id, [_log_time(old_key, at), _log_time(key, at)])
                 session.commit()
-                session.refresh(old_entry)
-                return _serialize(old_entry)
+                _invalidate_overview(user_id, kind)
+                return _serialize(renamed)
             # If old entry doesn't exist, fall through to regular upsert
 
         # Regular upsert (no rename or old_key doesn't exist)
-        stmt = pg_insert(Entry).values(
-            user_id=user_id,
-            kind=kind,
-            key=key,
-            content=content,
-            status=status,
-        ).on_conflict_do_update(
-            index_elements=[Entry.user_id, Entry.kind, Entry.key],
-            set_={
-                "content": content,
-                "status": status,
-                "updated_at": func.now(),
-            },
-        )
-
-        session.execute(stmt)
+        entry = session.scalars(
+            _UPSERT_ITEM,
+            {"user_id": user_id, "kind": kind, "key": key, "content": content, "status": status},
+            execution_options=_RETURNING_OPTIONS,
+        ).one()
+        if kind == 'log':
+            _refresh_rollups(session, user_id, [_log_time(key, entry.occurred_at or entry.created_at)])
         session.commit()
-        entry = session.execute(
-            select(Entry).where(and_(Entry.user_id == user_id, Entry.kind == kind, Entry.key == key))
-        ).scalar_one()
+        _invalidate_overview(user_id, kind)
         return _serialize(entry)
 
 
-# bulk_upsert_items removed - use individual upsert calls instead
-# The simplified architecture emphasizes clarity over batch optimization
+# Rows per INSERT statement; keeps bind parameters well under PostgreSQL's 65535 limit
+_BULK_CHUNK_SIZE = 1000
 
 
+@_dispatch
+def bulk_upsert_items(
+    session: Session,
+    user_id: str,
+    *,
+    items: list[dict[str, Any]],
+) -> list[dict]:
+    """Upsert many entries with one multi-row INSERT ... ON CONFLICT DO UPDATE ... RETURNING.
+
+    Each record has kind, key, content and optional status. Records with a key upsert
+    by (user_id, kind, key) like upsert_item; records with an empty key are logged as
+    events (occurred_at now) like log_event. Everything commits in one transaction.
+
+    Returns the serialized rows in input order, each with an 'outcome' of 'created'
+    or 'updated'. Repeated (kind, key) records collapse into one write (last wins)
+    and all report that final row.
+    """
+    with logfire.span('bulk upsert items', user_id=user_id, count=len(items)):
+        if not items:
+            return []
+
+        now = datetime.now()
+        keyed: dict[tuple[str, str], dict[str, Any]] = {}
+        events: list[dict[str, Any]] = []
+        positions: list[tuple[str, Any]] = []  # ('item', (kind, key)) or ('event', id)
+        for record in items:
+            kind = record.get('kind')
+            content = record.get('content')
+            if not kind or content is None:
+                raise ValueError("Each record needs a 'kind' and 'content'")
+            key = record.get('key') or None
+            row = {
+                "id": uuid.uuid4(),
+                "user_id": user_id,
+                "kind": kind,
+                "key": key,
+                "content": content,
+                "status": _normalize_status(record.get('status')) if key else 'active',
+                "occurred_at": None if key else now,
+            }
+            if key:
+                keyed[(kind, key)] = row
+                positions.append(('item', (kind, key)))
+            else:
+                events.append(row)
+                positions.append(('event', row["id"]))
+
+        rows = list(keyed.values()) + events
+        written_items: dict[tuple[str, str], Entry] = {}
+        written_events: dict[uuid.UUID, Entry] = {}
+        for start in range(0, len(rows), _BULK_CHUNK_SIZE):
+            stmt = _insert_on_conflict(Entry).values(rows[start:start + _BULK_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Entry.user_id, Entry.kind, Entry.key],
+                set_={
+                    "content": stmt.excluded.content,
+                    "status": stmt.excluded.status,
+                    "updated_at": func.now(),
+                },
+            ).returning(Entry)
+            # Conflicting rows keep their stored id, so match keyed rows by (kind, key)
+            for entry in session.scalars(stmt, execution_options=_RETURNING_OPTIONS):
+                if entry.key is None:
+                    written_events[entry.id] = entry
+                else:
+                    written_items[(entry.kind, entry.key)] = entry
+        _write_metric_points(session, written_events.values())
+        _refresh_rollups(session, user_id, [
+            _log_time(entry.key, entry.occurred_at or entry.created_at)
+            for entry in [*written_items.values(), *written_events.values()]
+            if entry.kind in _ROLLUP_KINDS
+        ])
+        session.commit()
+        _invalidate_overview(user_id, *{row["kind"] for row in rows})
+
+        results = []
+        for position, ident in positions:
+            entry = written_items[ident] if position == 'item' else written_events[ident]
+            # Fresh inserts have no updated_at; ON CONFLICT DO UPDATE always sets it
+            outcome = 'created' if entry.updated_at is None else 'updated'
+            results.append({**_serialize(entry), "outcome": outcome})
+        return results
+
+
+@_dispatch
 def get_item(session: Session, user_id: str, *, kind: str, key: str) -> Optional[dict]:
     with logfire.span('get item', user_id=user_id, kind=kind, key=key):
         stmt = select(Entry).where(
@@ -221,47 +681,188 @@ def get_item(session: Session, user_id: str, *, kind: str, key: str) -> Optional
         return _serialize(entry) if entry else None
 
 
+_requested_keys = func.unnest(
+    bindparam('kinds', type_=ARRAY(String)),
+    bindparam('keys', type_=ARRAY(String)),
+).table_valued('kind', 'key', with_ordinality='ord').render_derived(name='requested')
+_ITEMS_BY_KEYS = (
+    select(Entry, _requested_keys.c.ord)
+    .join(_requested_keys, and_(Entry.kind == _requested_keys.c.kind, Entry.key == _requested_keys.c.key))
+    .where(Entry.user_id == bindparam('user_id'))
+)
+
+
+@_dispatch
 def get_items_by_keys(
     session: Session,
     user_id: str,
     *,
     keys: list[tuple[str, str]],  # [(kind, key), ...]
 ) -> list[dict]:
-    """Fetch full content for multiple items by their (kind, key) tuples."""
+    """Fetch full content for multiple items by their (kind, key) tuples.
+
+    The requested pairs are sent as two arrays and unnested WITH ORDINALITY into a
+    relation joined on (kind, key), which the planner resolves through
+    uq_entries_user_kind_key. The statement shape doesn't depend on how many keys are
+    requested, so it compiles once. Results come back in request order; pairs with no
+    stored item are returned as {'kind', 'key', 'missing': True}.
+    """
     with logfire.span('get items by keys', user_id=user_id, count=len(keys)):
         if not keys:
             return []
 
-        # Build OR conditions for each (kind, key) pair
-        conditions = [
-            and_(Entry.kind == kind, Entry.key == key)
-            for kind, key in keys
+        if IS_SQLITE:
+            # No unnest in SQLite: match the pairs as row values and restore order here
+            stmt = select(Entry).where(Entry.user_id == user_id, tuple_(Entry.kind, Entry.key).in_(keys))
+            stored = {(entry.kind, entry.key): entry for entry in session.scalars(stmt)}
+            found = {ord_: stored[tuple(pair)] for ord_, pair in enumerate(keys) if tuple(pair) in stored}
+        else:
+            # WITH ORDINALITY numbers rows from 1
+            found = {ord_ - 1: entry for entry, ord_ in session.execute(_ITEMS_BY_KEYS, {
+                "user_id": user_id,
+                "kinds": [kind for kind, _ in keys],
+                "keys": [key for _, key in keys],
+            })}
+
+        return [
+            _serialize(found[ord_]) if ord_ in found else {"kind": kind, "key": key, "missing": True}
+            for ord_, (kind, key) in enumerate(keys)
         ]
 
-        stmt = select(Entry).where(
-            and_(Entry.user_id == user_id, *conditions) if len(conditions) == 1
-            else and_(Entry.user_id == user_id, *[c for c in [Entry.kind.in_([k[0] for k in keys]), Entry.key.in_([k[1] for k in keys])] if c is not None])
-        )
-
-        # Simpler approach: query all matching keys
-        from sqlalchemy import or_
-        or_conditions = [and_(Entry.kind == kind, Entry.key == key) for kind, key in keys]
-        stmt = select(Entry).where(
-            and_(Entry.user_id == user_id, or_(*or_conditions))
-        )
-
-        entries = session.execute(stmt).scalars().all()
-        return [_serialize(e) for e in entries]
-
 
+@_dispatch
 def delete_item(session: Session, user_id: str, *, kind: str, key: str) -> bool:
     with logfire.span('delete item', user_id=user_id, kind=kind, key=key):
-        stmt = delete(Entry).where(
+        stmt = _locking_change_feed(delete(Entry).where(
             and_(Entry.user_id == user_id, Entry.kind == kind, Entry.key == key)
+        ).returning(func.coalesce(Entry.occurred_at, Entry.created_at)), user_id)
+        deleted = session.execute(stmt).scalars().all()
+        if deleted and kind == 'log':
+            _refresh_rollups(session, user_id, [_log_time(key, at) for at in deleted])
+        session.commit()
+        if deleted:
+            _invalidate_overview(user_id, kind)
+            return True
+        return False
+
+
+@_dispatch
+def archive_items(
+    session: Session,
+    user_id: str,
+    *,
+    kind: str,
+    key: Optional[str] = None,
+    status: Optional[str] = None,
+    key_prefix: Optional[str] = None,
+    before: Optional[datetime] = None,
+) -> list[str]:
+    """Archive keyed items with a single UPDATE ... RETURNING key. Content is untouched.
+
+    Args:
+        key: Archive only this item
+        status: Only archive items currently in this status (default: any non-archived)
+        key_prefix: Only archive items whose key starts with this prefix (e.g. '2025-09-')
+        before: Only archive items last touched before this time
+
+    Returns the archived keys.
+    """
+    with logfire.span('archive items', user_id=user_id, kind=kind, key=key, key_prefix=key_prefix):
+        conditions = [
+            Entry.user_id == user_id,
+            Entry.kind == kind,
+            Entry.key.isnot(None),
+            Entry.status == status if status else Entry.status.is_distinct_from('archived'),
+        ]
+        if key is not None:
+            conditions.append(Entry.key == key)
+        if key_prefix:
+            conditions.append(Entry.key.startswith(key_prefix, autoescape=True))
+        if before is not None:
+            conditions.append(_activity_time() < before)
+
+        stmt = _locking_change_feed(
+            update(Entry)
+            .where(and_(*conditions))
+            .values(status='archived', updated_at=func.now())
+            .returning(Entry.key, func.coalesce(Entry.occurred_at, Entry.created_at)),
+            user_id,
         )
-        res = session.execute(stmt)
+        archived = session.execute(stmt, execution_options={"synchronize_session": False}).all()
+        archived_keys = [key for key, _ in archived]
+        if kind == 'log':
+            # Archived logs drop out of the history rollups
+            _refresh_rollups(session, user_id, [_log_time(key, at) for key, at in archived])
         session.commit()
-        return res.rowcount > 0
+        if archived_keys:
+            _invalidate_overview(user_id, kind)
+        return archived_keys
+
+
+@functools.lru_cache(maxsize=None)
+def _page_stmt(listing: str, filters: frozenset[str], after: bool):
+    """The keyset page statement of one listing ('items' or 'events') and set of filters,
+    built once per shape like _UPSERT_ITEM; user_id, limit and each filter are bind
+    parameters of the same name, last_at/last_id those of the cursor (when `after`).
+
+    The page is picked from (id, sort_at) alone, which the partial list indexes answer
+    with an index-only scan; only the rows on the page are then fetched from the heap.
+    """
+    if listing == 'items':
+        # Never-updated items sort by creation time (idx_entries_items_recent)
+        sort_at = func.coalesce(Entry.updated_at, Entry.created_at)
+        conditions = [Entry.kind == bindparam('kind'), Entry.key.isnot(None)]
+    else:
+        sort_at = Entry.occurred_at
+        conditions = [Entry.key.is_(None), Entry.occurred_at.isnot(None)]
+        if 'kind' in filters:
+            conditions.append(Entry.kind == bindparam('kind'))
+        if 'start' in filters:
+            conditions.append(Entry.occurred_at >= bindparam('start'))
+        if 'end' in filters:
+            conditions.append(Entry.occurred_at <= bindparam('end'))
+    if 'status' in filters:
+        conditions.append(Entry.status == bindparam('status'))
+    if after:
+        conditions.append(tuple_(sort_at, Entry.id) < tuple_(
+            bindparam('last_at', type_=UTCDateTime()),
+            bindparam('last_id', type_=Entry.id.type),
+        ))
+    page_ids = (
+        select(Entry.id, sort_at.label('sort_at'))
+        .where(Entry.user_id == bindparam('user_id'), *conditions)
+        .order_by(sort_at.desc(), Entry.id.desc())
+        .limit(bindparam('limit'))
+        .subquery('page')
+    )
+    return (
+        select(Entry, page_ids.c.sort_at)
+        .join(page_ids, Entry.id == page_ids.c.id)
+        .order_by(page_ids.c.sort_at.desc(), page_ids.c.id.desc())
+    )
+
+
+def _keyset_page(session: Session, listing: str, params: dict[str, Any], *, limit: int, cursor: Optional[str]) -> dict:
+    """Return the page of a listing (see _page_stmt) after `cursor`, newest-first on (sort_at, id).
+
+    params holds user_id and the filters in use; filters left out don't apply.
+    """
+    params = dict(params, limit=limit + 1)
+    if cursor:
+        last_at, last_id = _decode_cursor(cursor, 2)
+        try:
+            params.update(last_at=datetime.fromisoformat(last_at), last_id=uuid.UUID(last_id))
+        except (TypeError, ValueError):
+            raise ValueError("Invalid cursor") from None
+    stmt = _page_stmt(listing, frozenset(params), bool(cursor))
+
+    rows = session.execute(stmt, params).all()
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit and page:
+        last = page[-1]
+        next_cursor = _encode_cursor([last.sort_at.isoformat(), str(last.Entry.id)])
+    return {"items": [_serialize(row.Entry) for row in page], "next_cursor": next_cursor}
 
 
 def list_items(
@@ -272,18 +873,37 @@ def list_items(
     status: Optional[str] = None,
     limit: int = 100,
 ) -> list[dict]:
-    """List items of a given kind."""
-    with logfire.span('list items', user_id=user_id, kind=kind):
-        stmt = select(Entry).where(and_(Entry.user_id == user_id, Entry.kind == kind, Entry.key.isnot(None)))
-        if status:
-            stmt = stmt.where(Entry.status == status)
+    """List items of a given kind (first page of list_items_page)."""
+    return list_items_page(session, user_id, kind=kind, status=status, limit=limit)["items"]
 
-        # Sort by updated_at desc (most recent first)
-        stmt = stmt.order_by(Entry.updated_at.desc().nulls_last(), Entry.created_at.desc()).limit(limit)
-        results = session.execute(stmt).scalars().all()
-        return [_serialize(e) for e in results]
 
+@_dispatch
+def list_items_page(
+    session: Session,
+    user_id: str,
+    *,
+    kind: str,
+    status: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> dict:
+    """List items of a given kind, most recently changed first, one page at a time.
+
+    Args:
+        cursor: next_cursor from the previous page; pages are keyset-paginated on
+               (last change, id), so deep pages cost the same as the first.
 
+    Returns:
+        {'items': [...], 'next_cursor': str | None}
+    """
+    with logfire.span('list items', user_id=user_id, kind=kind, has_cursor=cursor is not None):
+        params = {"user_id": user_id, "kind": kind}
+        if status:
+            params["status"] = status
+        return _keyset_page(session, 'items', params, limit=limit, cursor=cursor)
+
+
+@_dispatch
 def log_event(
     session: Session,
     user_id: str,
@@ -292,19 +912,25 @@ def log_event(
     content: str,
     occurred_at: Optional[datetime] = None,
 ) -> dict:
-    """Log a timestamped event. Everything goes in content."""
+    """Log a timestamped event. Everything goes in content.
+
+    Readings in metric events ('Weight: 71kg') are also stored in metric_points.
+    """
     with logfire.span('log event', user_id=user_id, kind=kind):
-        entry = Entry(
+        stmt = insert(Entry).values(
             user_id=user_id,
             kind=kind,
             key=None,  # Events don't have keys
             content=content,
             status='active',  # Events are always active initially
             occurred_at=occurred_at or datetime.now(),  # Default to now if not provided
-        )
-        session.add(entry)
+        ).returning(Entry)
+        entry = session.scalars(stmt, execution_options=_RETURNING_OPTIONS).one()
+        _write_metric_points(session, [entry])
+        if kind in _ROLLUP_KINDS:
+            _refresh_rollups(session, user_id, [entry.occurred_at])
         session.commit()
-        session.refresh(entry)
+        _invalidate_overview(user_id, kind)
         return _serialize(entry)
 
 
@@ -317,20 +943,39 @@ def list_events(
     end: Optional[datetime] = None,
     limit: int = 100,
 ) -> list[dict]:
-    """List timestamped events."""
-    with logfire.span('list events', user_id=user_id):
-        stmt = select(Entry).where(and_(Entry.user_id == user_id, Entry.key.is_(None)))
-        if kind:
-            stmt = stmt.where(Entry.kind == kind)
-        if start:
-            stmt = stmt.where(Entry.occurred_at >= start)
-        if end:
-            stmt = stmt.where(Entry.occurred_at <= end)
-        stmt = stmt.order_by(Entry.occurred_at.desc().nulls_last(), Entry.created_at.desc()).limit(limit)
-        results = session.execute(stmt).scalars().all()
-        return [_serialize(e) for e in results]
+    """List timestamped events (first page of list_events_page)."""
+    return list_events_page(session, user_id, kind=kind, start=start, end=end, limit=limit)["items"]
 
 
+@_dispatch
+def list_events_page(
+    session: Session,
+    user_id: str,
+    *,
+    kind: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> dict:
+    """List timestamped events, most recent first, one page at a time.
+
+    Pages are keyset-paginated on (occurred_at, id) and walk idx_entries_events_recent
+    (idx_entries_user_occured_at without a kind), so paging through years of history
+    costs the same per page as the first one.
+    Events always carry occurred_at (log_event defaults it to now).
+
+    Returns:
+        {'items': [...], 'next_cursor': str | None}
+    """
+    with logfire.span('list events', user_id=user_id, has_cursor=cursor is not None):
+        params = {"user_id": user_id, "kind": kind, "start": start, "end": end}
+        return _keyset_page(
+            session, 'events', {k: v for k, v in params.items() if v}, limit=limit, cursor=cursor
+        )
+
+
+@_dispatch
 def update_event(
     session: Session,
     user_id: str,
@@ -346,26 +991,39 @@ def update_event(
         except ValueError:
             return None
 
-        stmt = select(Entry).where(
-            and_(Entry.user_id == user_id, Entry.id == event_uuid, Entry.key.is_(None))
+        # Update fields
+        values: dict[str, Any] = {"updated_at": func.now()}
+        if content is not None:
+            values["content"] = content
+        previous_at = None
+        if occurred_at is not None:
+            values["occurred_at"] = occurred_at
+            # Moving an event also changes the rollup period it leaves
+            previous_at = session.scalar(select(Entry.occurred_at).where(
+                Entry.user_id == user_id, Entry.id == event_uuid, Entry.key.is_(None)))
+
+        stmt = _locking_change_feed(
+            update(Entry)
+            .where(and_(Entry.user_id == user_id, Entry.id == event_uuid, Entry.key.is_(None)))
+            .values(**values)
+            .returning(Entry),
+            user_id,
         )
-        entry = session.execute(stmt).scalar_one_or_none()
+        entry = session.scalars(stmt, execution_options=_RETURNING_OPTIONS).one_or_none()
+        if entry is not None:
+            _write_metric_points(session, [entry], replace=True)
+            if entry.kind in _ROLLUP_KINDS:
+                _refresh_rollups(session, user_id, [previous_at, entry.occurred_at])
+        session.commit()
 
         if not entry:
             return None
 
-        # Update fields
-        if content is not None:
-            entry.content = content
-        if occurred_at is not None:
-            entry.occurred_at = occurred_at
-
-        entry.updated_at = func.now()
-        session.commit()
-        session.refresh(entry)
+        _invalidate_overview(user_id, entry.kind)
         return _serialize(entry)
 
 
+@_dispatch
 def delete_event(
     session: Session,
     user_id: str,
@@ -379,12 +1037,21 @@ def delete_event(
         except ValueError:
             return False
 
-        stmt = delete(Entry).where(
+        stmt = _locking_change_feed(delete(Entry).where(
             and_(Entry.user_id == user_id, Entry.id == event_uuid, Entry.key.is_(None))
-        )
-        res = session.execute(stmt)
+        ).returning(Entry.kind, Entry.occurred_at), user_id)
+        deleted = session.execute(stmt).all()
+        _refresh_rollups(session, user_id, [row.occurred_at for row in deleted if row.kind in _ROLLUP_KINDS])
         session.commit()
-        return res.rowcount > 0
+        if deleted:
+            _invalidate_overview(user_id, *[row.kind for row in deleted])
+            return True
+        return False
+
+
+def _fts5_terms(query: str) -> str:
+    """Quote each word as an FTS5 string so user input can't inject query syntax (implicit AND)."""
+    return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query or ''))
 
 
 def search_entries(
@@ -395,19 +1062,460 @@ def search_entries(
     kind: Optional[str] = None,
     limit: int = 100,
 ) -> list[dict]:
-    with logfire.span('search entries in database', user_id=user_id, has_kind=kind is not None):
-        stmt = select(Entry).where(Entry.user_id == user_id)
+    """Full-text search returning the best `limit` hits (see search_entries_page)."""
+    return search_entries_page(session, user_id, query=query, kind=kind, limit=limit)["items"]
+
+
+def _decode_search_cursor(token: str) -> tuple[float, datetime, uuid.UUID, datetime]:
+    """(score, recency, id, reference_time) from a search_entries_page cursor."""
+    score, recency, entry_id, reference_time = _decode_cursor(token, 4)
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError("Invalid cursor")
+    try:
+        return float(score), datetime.fromisoformat(recency), uuid.UUID(entry_id), datetime.fromisoformat(reference_time)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+
+
+@_dispatch
+def search_entries_page(
+    session: Session,
+    user_id: str,
+    *,
+    query: str,
+    kind: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    recency_half_life_days: Optional[float] = None,
+) -> dict:
+    """Relevance-ranked full-text search over the stored fts column, one page at a time.
+
+    Matches use the GIN index on entries.fts and are ordered by ts_rank_cd, then by
+    recency (on SQLite: the entries_fts FTS5 index, ranked by bm25). With recency_half_life_days, a hit's rank halves for every half-life
+    elapsed since it occurred or last changed, favouring recent entries among
+    similar matches.
+
+    Args:
+        cursor: next_cursor from the previous page; pages are keyset-paginated on
+               (score, recency, id), so deep pages cost the same as the first.
+
+    Returns:
+        {'items': [...], 'next_cursor': str | None}
+    """
+    with logfire.span('search entries in database', user_id=user_id, has_kind=kind is not None, has_cursor=cursor is not None):
+        after = _decode_search_cursor(cursor) if cursor else None
+        # Recency weights are relative to the time of the first page, so scores stay stable across pages
+        reference_time = after[3] if after else datetime.now(timezone.utc)
+
+        recency = _activity_time()
+        reference = bindparam('reference_time', reference_time, type_=UTCDateTime())
+        if IS_SQLITE:
+            terms = _fts5_terms(query)
+            if query and not terms:
+                return {"items": [], "next_cursor": None}
+            # bm25() is lower-is-better; negate it so both backends rank descending
+            score = -func.bm25(literal_column('entries_fts')) if terms else literal(0.0)
+            age_days = func.julianday(reference) - func.julianday(recency)
+        else:
+            score = func.ts_rank_cd(Entry.fts, func.plainto_tsquery('english', query)) if query else literal(0.0)
+            age_days = func.extract('epoch', reference - recency) / 86400.0
+        if recency_half_life_days:
+            age_days = case((age_days > 0, age_days), else_=0.0)
+            score = score * func.power(0.5, age_days / recency_half_life_days)
+        score = cast(score, Double)
+
+        stmt = select(Entry, score.label('score'), recency.label('recency')).where(Entry.user_id == user_id)
         if kind:
             stmt = stmt.where(Entry.kind == kind)
-        if query:
-            stmt = stmt.where(
-                func.to_tsvector('english', func.concat(func.coalesce(Entry.key, ''), ' ', Entry.content)).bool_op('@@')(
-                    func.plainto_tsquery('english', query)
-                )
+        if query and IS_SQLITE:
+            stmt = stmt.join(_entries_fts, _entries_fts.c.entry_id == Entry.id).where(
+                literal_column('entries_fts').bool_op('MATCH')(terms))
+        elif query:
+            stmt = stmt.where(Entry.fts.bool_op('@@')(func.plainto_tsquery('english', query)))
+        if after:
+            last_score, last_recency, last_id, _ = after
+            stmt = stmt.where(tuple_(score, recency, Entry.id) < tuple_(
+                bindparam('last_score', last_score, type_=Double),
+                bindparam('last_recency', last_recency, type_=UTCDateTime()),
+                bindparam('last_id', last_id, type_=Entry.id.type),
+            ))
+        stmt = stmt.order_by(score.desc(), recency.desc(), Entry.id.desc()).limit(limit + 1)
+
+        rows = session.execute(stmt).all()
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit and page:
+            last = page[-1]
+            next_cursor = _encode_cursor([last.score, last.recency.isoformat(), str(last.Entry.id), reference_time.isoformat()])
+        return {"items": [_serialize(row.Entry) for row in page], "next_cursor": next_cursor}
+
+
+_EXPORT_BATCH_SIZE = 1000
+
+
+def export_statement(user_id: str, *, kind: Optional[str] = None):
+    """Every entry for a user, oldest first, as plain columns.
+
+    Selecting columns rather than Entry keeps streamed rows out of the session's
+    identity map, so memory stays bounded however many rows are exported.
+    """
+    stmt = select(
+        Entry.id, Entry.user_id, Entry.kind, Entry.key, Entry.content, Entry.status,
+        Entry.occurred_at, Entry.created_at, Entry.updated_at,
+    ).where(Entry.user_id == user_id)
+    if kind:
+        stmt = stmt.where(Entry.kind == kind)
+    return stmt.order_by(Entry.created_at, Entry.id)
+
+
+@_dispatch
+def export_entries(
+    session: Session,
+    user_id: str,
+    *,
+    kind: Optional[str] = None,
+    batch_size: int = _EXPORT_BATCH_SIZE,
+) -> Iterator[dict]:
+    """Stream every entry for a user, oldest first, in constant memory.
+
+    Rows come from a server-side cursor (yield_per implies stream_results) in
+    batches of batch_size, so a full-history export never materializes the
+    result set. The session's transaction stays open until the generator is
+    exhausted or closed.
+    """
+    result = session.execute(export_statement(user_id, kind=kind), execution_options={"yield_per": batch_size})
+    for row in result:
+        yield _serialize(row)
+
+
+def _change_token(since: Optional[str]) -> tuple[int, int]:
+    """The change_seq a token from list_changes stands for (0, the start, for None)
+    and the user's tombstone horizon when it was handed out."""
+    if not since:
+        return 0, 0
+    seq, horizon = _decode_cursor(since, 2)
+    if not isinstance(seq, int) or not isinstance(horizon, int):
+        raise ValueError("Invalid cursor")
+    return seq, horizon
+
+
+def _change_feed_page(session: Session, user_id: str, after: int, limit: int) -> list:
+    changed = select(
+        Entry.change_seq, Entry.id, Entry.user_id, Entry.kind, Entry.key, Entry.content, Entry.status,
+        Entry.occurred_at, Entry.created_at, Entry.updated_at, literal(False).label('deleted'),
+    ).where(Entry.user_id == user_id, Entry.change_seq > after)
+    deleted = select(
+        EntryTombstone.change_seq, EntryTombstone.entry_id, EntryTombstone.user_id, EntryTombstone.kind,
+        EntryTombstone.key, literal(None, String), literal(None, String), literal(None, UTCDateTime),
+        literal(None, UTCDateTime), literal(None, UTCDateTime), literal(True),
+    ).where(EntryTombstone.user_id == user_id, EntryTombstone.change_seq > after)
+    feed = union_all(changed, deleted).subquery()
+    return session.execute(select(feed).order_by(feed.c.change_seq).limit(limit + 1)).all()
+
+
+@_dispatch
+def list_changes(
+    session: Session,
+    user_id: str,
+    *,
+    since: Optional[str] = None,
+    limit: int = 500,
+) -> dict:
+    """Entries written or deleted after a change token, oldest change first.
+
+    Inserts and updates stamp an entry with the next change_seq and deletes leave a
+    tombstone with one (migrations/010_change_feed.sql), so one query merging
+    idx_entries_user_change_seq and idx_entry_tombstones_user_change_seq returns the
+    delta. A user's writers take change_seq one transaction at a time (012 and 013
+    on Postgres; SQLite has a single writer), so no write can commit later with a
+    change_seq below a token already handed out. A client mirror applies 'changed' rows by id, drops 'deleted' ids and
+    passes next_token back as since; without since the feed starts from the
+    beginning (a full snapshot). Keep calling while has_more is true.
+
+    Tombstones older than the retention window are pruned (prune_tombstones). A
+    token from before the latest prune could miss deletes, so it gets a full
+    snapshot with 'reset' set instead; the client then discards its mirror first.
+
+    Returns:
+        {'changed': [...], 'deleted': [{'id', 'kind', 'key'}], 'next_token': str, 'has_more': bool, 'reset': bool}
+    """
+    with logfire.span('list changes', user_id=user_id, has_since=since is not None) as span:
+        after, seen_horizon = _change_token(since)
+        rows = _change_feed_page(session, user_id, after, limit)
+        # Read after the feed: a prune committing in between moves the horizon too
+        horizon = session.scalar(
+            select(ChangeFeedHorizon.change_seq).where(ChangeFeedHorizon.user_id == user_id)) or 0
+        # A token handed out since the last prune is safe even below the horizon:
+        # it comes from a feed read that had nothing left to miss
+        reset = bool(since) and after < horizon and seen_horizon < horizon
+        if reset:
+            after = 0
+            rows = _change_feed_page(session, user_id, after, limit)
+
+        page = rows[:limit]
+        result: dict[str, Any] = {
+            "changed": [_serialize(row) for row in page if not row.deleted],
+            "deleted": [{"id": str(row.id), "kind": row.kind, "key": row.key} for row in page if row.deleted],
+            "next_token": _encode_cursor([page[-1].change_seq if page else after, horizon]),
+            "has_more": len(rows) > limit,
+            "reset": reset,
+        }
+        span.set_attributes({"changed": len(result["changed"]), "deleted": len(result["deleted"]), "reset": reset})
+        return result
+
+
+def prune_tombstones(session: Session, older_than: datetime, user_id: Optional[str] = None) -> int:
+    """Delete tombstones of entries deleted before older_than (one user's, or everyone's).
+
+    Each user's change_feed_horizons row moves up to the newest change_seq removed,
+    so list_changes resets tokens that could have missed those deletes. Returns the
+    number of tombstones deleted.
+    """
+    with logfire.span('prune tombstones', user_id=user_id) as span:
+        stmt = delete(EntryTombstone).where(EntryTombstone.deleted_at < older_than)
+        if user_id:
+            stmt = stmt.where(EntryTombstone.user_id == user_id)
+        pruned = session.execute(stmt.returning(EntryTombstone.user_id, EntryTombstone.change_seq)).all()
+        horizons: dict[str, int] = {}
+        for uid, seq in pruned:
+            horizons[uid] = max(seq, horizons.get(uid, 0))
+        # Sorted, so concurrent prunes lock horizon rows in the same order
+        rows = [{"user_id": uid, "change_seq": seq} for uid, seq in sorted(horizons.items())]
+        for chunk in range(0, len(rows), _BULK_CHUNK_SIZE):
+            upsert = _insert_on_conflict(ChangeFeedHorizon).values(rows[chunk:chunk + _BULK_CHUNK_SIZE])
+            session.execute(upsert.on_conflict_do_update(
+                index_elements=[ChangeFeedHorizon.user_id],
+                set_={"change_seq": case(
+                    (upsert.excluded.change_seq > ChangeFeedHorizon.change_seq, upsert.excluded.change_seq),
+                    else_=ChangeFeedHorizon.change_seq,
+                )},
+            ))
+        session.commit()
+        span.set_attribute('tombstones', len(pruned))
+        return len(pruned)
+
+
+def rebuild_metric_points(session: Session, user_id: Optional[str] = None, *, batch_size: int = _EXPORT_BATCH_SIZE) -> int:
+    """Re-parse every metric event (one user's, or everyone's) into metric_points.
+
+    For metric entries written before metric_points existed, or after parser
+    changes. Each batch replaces its entries' readings; returns the number of
+    readings stored.
+    """
+    with logfire.span('rebuild metric points', user_id=user_id) as span:
+        stmt = select(Entry.id, Entry.user_id, Entry.kind, Entry.key, Entry.content, Entry.occurred_at).where(
+            Entry.kind == 'metric', Entry.key.is_(None))
+        if user_id:
+            stmt = stmt.where(Entry.user_id == user_id)
+        # Metric entries are short: read them in one go, write their readings back in batches
+        rows = session.execute(stmt).all()
+        written = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            _write_metric_points(session, batch, replace=True)
+            written += len(_metric_point_rows(batch))
+            session.commit()
+        span.set_attribute('points', written)
+        return written
+
+
+def rebuild_history_rollups(session: Session, user_id: Optional[str] = None) -> int:
+    """Recompute every history rollup (one user's, or everyone's) from logs and metric_points.
+
+    For history written before history_rollups existed, after rebuild_metric_points,
+    or as a periodic job repairing rows changed outside crud. Each user's rollups
+    are replaced in their own transaction; returns the number of rollups stored.
+    """
+    with logfire.span('rebuild history rollups', user_id=user_id) as span:
+        if user_id:
+            user_ids = [user_id]
+        else:
+            user_ids = session.scalars(
+                select(Entry.user_id).where(Entry.kind == 'log')
+                .union(select(MetricPoint.user_id), select(HistoryRollup.user_id))
+            ).all()
+        written = 0
+        for uid in user_ids:
+            session.execute(delete(HistoryRollup).where(HistoryRollup.user_id == uid))
+            rollups = _compute_rollups(session, uid)
+            _store_rollups(session, uid, rollups)
+            session.commit()
+            written += len(rollups)
+        span.set_attribute('rollups', written)
+        return written
+
+
+# Date buckets for metric_series, as (Postgres date_trunc field, SQLite date() modifiers)
+_METRIC_BUCKETS = {
+    'day': ('day', ()),
+    'week': ('week', ('weekday 0', '-6 days')),  # ISO weeks start on Monday
+    'month': ('month', ('start of month',)),
+}
+
+
+def _metric_conditions(user_id: str, metric: str, start: Optional[datetime], end: Optional[datetime],
+                       point=MetricPoint) -> list:
+    conditions = [point.user_id == user_id, point.metric_name == normalize_metric_name(metric)]
+    if start:
+        conditions.append(point.occurred_at >= start)
+    if end:
+        conditions.append(point.occurred_at <= end)
+    return conditions
+
+
+def _metric_summary(metric: str, groups: list) -> dict:
+    """metric_range's result from per-unit rows (unit, count, min, max, total, start, end, first, last)."""
+    if not groups:
+        return {
+            "metric": normalize_metric_name(metric), "count": 0, "min": None, "max": None, "avg": None,
+            "first": None, "last": None, "change": None, "unit": None, "start": None, "end": None, "excluded": 0,
+        }
+    latest = max(groups, key=lambda group: group.end)
+    unit = latest.unit
+    count, low, high, total, excluded = _merge_units(
+        {group.unit: (group.count, group.min, group.max, group.total) for group in groups}, unit)
+    earliest = min((group for group in groups if unit_factor(group.unit, unit) is not None), key=lambda group: group.start)
+    first = earliest.first * unit_factor(earliest.unit, unit)
+    return {
+        "metric": normalize_metric_name(metric),
+        "count": count,
+        "min": low,
+        "max": high,
+        "avg": total / count,
+        "first": first,
+        "last": latest.last,
+        "change": latest.last - first,
+        "unit": unit,
+        "start": earliest.start.isoformat(),
+        "end": latest.end.isoformat(),
+        "excluded": excluded,
+    }
+
+
+def _metric_series_rows(groups: list) -> list[dict]:
+    """metric_series' result from per-(bucket, unit) rows (bucket, unit, count, min, max, total, end)."""
+    if not groups:
+        return []
+    # One unit for the whole series: the latest reading's
+    unit = max(groups, key=lambda group: group.end).unit
+    buckets: dict[str, dict[Optional[str], tuple]] = defaultdict(dict)
+    for group in groups:
+        buckets[str(group.bucket)][group.unit] = (group.count, group.min, group.max, group.total)
+    rows = []
+    for bucket, by_unit in sorted(buckets.items()):
+        count, low, high, total, _ = _merge_units(by_unit, unit)
+        if count:
+            rows.append({"bucket": bucket, "count": count, "avg": total / count, "min": low, "max": high, "unit": unit})
+    return rows
+
+
+@_dispatch
+def latest_metric(session: Session, user_id: str, *, metric: str) -> Optional[dict]:
+    """Most recent reading of a metric: {'metric', 'value', 'unit', 'occurred_at'} or None."""
+    with logfire.span('latest metric', user_id=user_id, metric=metric):
+        stmt = (
+            select(MetricPoint.value, MetricPoint.unit, MetricPoint.occurred_at)
+            .where(and_(*_metric_conditions(user_id, metric, None, None)))
+            .order_by(MetricPoint.occurred_at.desc())
+            .limit(1)
+        )
+        row = session.execute(stmt).one_or_none()
+        if row is None:
+            return None
+        return {
+            "metric": normalize_metric_name(metric),
+            "value": row.value,
+            "unit": row.unit,
+            "occurred_at": row.occurred_at.isoformat(),
+        }
+
+
+@_dispatch
+def metric_range(
+    session: Session,
+    user_id: str,
+    *,
+    metric: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> dict:
+    """Summarize a metric over a time range in one query.
+
+    Aggregates and the first/last readings all come from
+    idx_metric_points_user_metric_time, grouped by unit. They are reported in the
+    unit of the last reading: readings in convertible units ('lbs' and 'kg') are
+    converted, others are left out and counted in 'excluded'.
+
+    Returns:
+        {'metric', 'count', 'min', 'max', 'avg', 'first', 'last', 'change', 'unit',
+         'start', 'end', 'excluded'} ('start'/'end' are the first and last reading times)
+    """
+    with logfire.span('metric range', user_id=user_id, metric=metric):
+        conditions = _metric_conditions(user_id, metric, start, end)
+        point = aliased(MetricPoint, name='point')
+
+        def _edge(column, order):
+            # First or last reading in the unit of the enclosing group
+            return (
+                select(column)
+                .where(and_(*conditions), MetricPoint.unit.is_not_distinct_from(point.unit))
+                .order_by(order).limit(1).scalar_subquery()
             )
-        stmt = stmt.order_by(Entry.updated_at.desc().nulls_last(), Entry.created_at.desc()).limit(limit)
-        results = session.execute(stmt).scalars().all()
-        return [_serialize(e) for e in results]
+
+        stmt = select(
+            point.unit,
+            func.count().label('count'),
+            func.min(point.value).label('min'),
+            func.max(point.value).label('max'),
+            func.sum(point.value).label('total'),
+            func.min(point.occurred_at).label('start'),
+            func.max(point.occurred_at).label('end'),
+            _edge(MetricPoint.value, MetricPoint.occurred_at.asc()).label('first'),
+            _edge(MetricPoint.value, MetricPoint.occurred_at.desc()).label('last'),
+        ).where(and_(*_metric_conditions(user_id, metric, start, end, point))).group_by(point.unit)
+        return _metric_summary(metric, session.execute(stmt).all())
+
+
+@_dispatch
+def metric_series(
+    session: Session,
+    user_id: str,
+    *,
+    metric: str,
+    bucket: str = 'week',
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> list[dict]:
+    """Downsample a metric to one row per day, week (from Monday) or month, oldest first.
+
+    Every row is in the unit of the last reading, converted as in metric_range;
+    buckets with only readings that don't convert are left out.
+
+    Returns:
+        [{'bucket': 'YYYY-MM-DD', 'count', 'avg', 'min', 'max', 'unit'}, ...]
+    """
+    with logfire.span('metric series', user_id=user_id, metric=metric, bucket=bucket):
+        if bucket not in _METRIC_BUCKETS:
+            raise ValueError(f"Invalid bucket '{bucket}' (use {', '.join(_METRIC_BUCKETS)})")
+        field, modifiers = _METRIC_BUCKETS[bucket]
+        if IS_SQLITE:
+            bucket_start = func.date(MetricPoint.occurred_at, *modifiers)
+        else:
+            bucket_start = cast(func.date_trunc(field, MetricPoint.occurred_at), Date)
+        stmt = (
+            select(
+                bucket_start.label('bucket'),
+                MetricPoint.unit,
+                func.count().label('count'),
+                func.min(MetricPoint.value).label('min'),
+                func.max(MetricPoint.value).label('max'),
+                func.sum(MetricPoint.value).label('total'),
+                func.max(MetricPoint.occurred_at).label('end'),
+            )
+            .where(and_(*_metric_conditions(user_id, metric, start, end)))
+            .group_by(bucket_start, MetricPoint.unit)
+        )
+        return _metric_series_rows(session.execute(stmt).all())
 
 
 # Temporal context removed - put date/week info directly in content
@@ -417,7 +1525,8 @@ def get_overview(
     session: Session,
     user_id: str,
     truncate_words: int = 200,
-    context: Optional[str] = None
+    context: Optional[str] = None,
+    max_tokens: Optional[int] = None,
 ) -> dict:
     """Return clean, organized overview with truncated content for scanning.
 
@@ -428,172 +1537,364 @@ def get_overview(
                 - 'planning': Goals (priority order), program, week, plans (recent 5/2wks), preferences, knowledge, logs (recent 10/2wks)
                 - 'upcoming': Goals, week, plans, recent logs (1 week)
                 - 'knowledge': Goals, program, preferences, knowledge
-                - 'history': Goals, all logs, metrics (for progress review)
+                - 'history': Goals, recent logs and metrics, weekly/monthly rollups (for progress review)
                 - None: All data (default behavior)
+        max_tokens: Optional budget for the whole response (estimated, see _estimate_tokens).
+                   Sections are filled by priority and content truncated harder to fit;
+                   the response then carries a 'budget' report of what was left out.
+
+    Results are served from the in-process overview cache when possible; crud writes
+    invalidate the affected (user, context) entries.
     """
-    with logfire.span('get overview', user_id=user_id, truncate_words=truncate_words, context=context):
-        # Define context-based kind filters
-        context_filters = {
-            'planning': {'goal', 'program', 'week', 'plan', 'preference', 'knowledge', 'log'},
-            'upcoming': {'goal', 'week', 'plan', 'log'},
-            'knowledge': {'goal', 'program', 'preference', 'knowledge'},
-            'history': {'goal', 'log', 'metric'},
-        }
+    if max_tokens is not None and max_tokens <= 0:
+        raise ValueError("max_tokens must be positive")
+    with logfire.span('get overview', user_id=user_id, truncate_words=truncate_words, context=context,
+                      max_tokens=max_tokens) as span:
+        cache_key = (user_id, context, truncate_words)
+        overview = overview_cache.get(cache_key)
+        span.set_attribute('cache_hit', overview is not None)
+        if overview is not None:
+            overview.update(_overview_dates())
+        else:
+            generation = overview_cache.generation(user_id)
+            overview = _build_overview(session, user_id, truncate_words=truncate_words, context=context)
+            overview_cache.set(cache_key, overview, generation)
+
+        if max_tokens is not None:
+            # The full overview stays cached; each budget is fitted from it per call
+            overview = _fit_overview(overview, max_tokens, truncate_words)
+            span.set_attribute('elided', sum(overview["budget"].get("elided", {}).values()))
+        return overview
 
-        # Exclude archived entries and issues from overview
-        conditions = [
-            Entry.user_id == user_id,
-            Entry.kind != 'issue',
-            Entry.status != 'archived'
-        ]
 
-        # Add context-based kind filtering
-        if context and context in context_filters:
-            conditions.append(Entry.kind.in_(context_filters[context]))
+def _overview_dates() -> dict[str, str]:
+    """Current date and ISO week, stamped onto every overview (cached or not)."""
+    now = datetime.now()
+    current_week = now.isocalendar()  # Returns (year, week_number, day_of_week)
+    return {
+        "current_date": now.strftime("%Y-%m-%d"),
+        "current_week": f"{current_week[0]}-week-{current_week[1]:02d}",
+    }
 
-        stmt = select(Entry).where(and_(*conditions))
-        entries = session.execute(stmt).scalars().all()
 
-        by_kind: dict[str, list[Entry]] = defaultdict(list)
-        for entry in entries:
-            by_kind[entry.kind].append(entry)
+# Sections in the order a token budget fills them; the rest of the overview is header
+_OVERVIEW_SECTION_PRIORITY = (
+    'goals', 'strategies', 'week', 'recent_plans', 'current', 'program', 'recent_logs',
+    'recent_metrics', 'history', 'recent_notes', 'preferences', 'knowledge', 'principles',
+)
+# Sections of _OVERVIEW_TRUNCATED_KINDS: only these are cut shorter to fit a budget
+_OVERVIEW_TRUNCATED_SECTIONS = (
+    'strategies', 'program', 'preferences', 'knowledge', 'principles', 'recent_logs', 'recent_notes',
+)
+# Word limits tried in turn (below the caller's truncate_words) before entries are elided
+_BUDGET_TRUNCATE_WORDS = (100, 50, 25, 10)
+_BUDGET_REPORT_TOKENS = 40  # room kept for the 'budget' report itself
 
-        def _sorted(items: list[Entry]) -> list[Entry]:
-            # Sort by updated_at descending (most recent first)
-            # Priority is now in attrs and could be string or int, so skip it
-            return sorted(
-                items,
-                key=lambda x: -(x.updated_at or x.created_at or datetime.min).timestamp(),
-            )
 
-        # Calculate current date and week number
-        now = datetime.now()
-        current_date = now.strftime("%Y-%m-%d")
-        current_week = now.isocalendar()  # Returns (year, week_number, day_of_week)
-        week_string = f"{current_week[0]}-week-{current_week[1]:02d}"
+def _estimate_tokens(value: Any) -> int:
+    """Rough token count of a JSON-like value: ~4 characters per token plus punctuation.
 
-        overview: dict[str, Any] = {
-            "current_date": current_date,
-            "current_week": week_string,
-        }
+    Walks the value instead of serializing it, so sizing a section allocates nothing.
+    """
+    if isinstance(value, str):
+        return len(value) // 4 + 1
+    if isinstance(value, dict):
+        return sum(len(k) // 4 + _estimate_tokens(v) + 2 for k, v in value.items()) + 1
+    if isinstance(value, list):
+        return sum(_estimate_tokens(v) + 1 for v in value) + 1
+    return 1
+
+
+def _truncate_words(content: str, words: int) -> str:
+    """Re-truncate (possibly already truncated) overview content to `words` words."""
+    text = content.removesuffix(_TRUNCATION_MARKER)
+    parts = text.split()
+    if len(parts) <= words:
+        return content
+    return ' '.join(parts[:words]) + _TRUNCATION_MARKER
+
+
+def _fill_overview(overview: dict, budget: int, words: Optional[int]) -> tuple[dict, int, dict[str, int], dict[str, int]]:
+    """Fill sections in priority order until the next entry would pass `budget`.
+
+    With `words`, content of _OVERVIEW_TRUNCATED_SECTIONS is first cut to that many
+    words; other sections always keep their content. From the first entry that
+    doesn't fit, it and everything after it is elided. Returns (overview, estimated
+    tokens, elided entry counts by section, truncated entry counts by section).
+    """
+    fitted = {k: v for k, v in overview.items() if k not in _OVERVIEW_SECTION_PRIORITY}
+    used = _estimate_tokens(fitted)
+    elided: dict[str, int] = {}
+    truncated: dict[str, int] = {}
+    full = False
+    for name in _OVERVIEW_SECTION_PRIORITY:
+        section = overview.get(name)
+        if not section:
+            continue
+        # Sections are lists, or dicts of lists (goals by status, history) or of single entries (strategies)
+        groups = section.items() if isinstance(section, dict) else [(None, section)]
+        kept: dict[Any, Any] = {}
+        section_cost = len(name) // 4 + 3
+        used += section_cost
+        shorten = words is not None and name in _OVERVIEW_TRUNCATED_SECTIONS
+        for group, values in groups:
+            entries = values if isinstance(values, list) else [values]
+            taken = []
+            for entry in entries:
+                if not full:
+                    cut = False
+                    if shorten and 'content' in entry:
+                        content = _truncate_words(entry['content'], words)
+                        cut = content is not entry['content']
+                        if cut:
+                            entry = {**entry, 'content': content}
+                    cost = _estimate_tokens(entry) + 1
+                    full = used + cost > budget
+                if full:
+                    elided[name] = elided.get(name, 0) + 1
+                    continue
+                used += cost
+                taken.append(entry)
+                if cut:
+                    truncated[name] = truncated.get(name, 0) + 1
+            if taken:
+                kept[group] = taken if isinstance(values, list) else taken[0]
+        if kept:
+            fitted[name] = kept[None] if None in kept else kept
+        else:
+            used -= section_cost
+    return fitted, used, elided, truncated
+
+
+def _fit_overview(overview: dict, max_tokens: int, truncate_words: int) -> dict:
+    """Copy of `overview` whose estimated size fits max_tokens.
+
+    The overview is first tried as is; then content of the truncated sections is cut
+    to successively fewer words (_BUDGET_TRUNCATE_WORDS) until everything fits; if
+    even the shortest level doesn't, lower-priority entries are elided. The result
+    reports the outcome under 'budget', including how many entries were truncated.
+    """
+    budget = max_tokens - _BUDGET_REPORT_TOKENS
+    levels = [None] + [w for w in _BUDGET_TRUNCATE_WORDS if truncate_words <= 0 or w < truncate_words]
+    for words in levels:
+        fitted, used, elided, truncated = _fill_overview(overview, budget, words)
+        if not elided:
+            break
+    report: dict[str, Any] = {"max_tokens": max_tokens, "estimated_tokens": used}
+    if words is not None:
+        report["truncate_words"] = words
+    if truncated:
+        report["truncated"] = truncated
+    if elided:
+        report["elided"] = elided
+    fitted["budget"] = report
+    return fitted
+
+
+def _overview_section_limits(context: Optional[str]) -> dict[str, int]:
+    """Max rows rendered per limited overview section, by kind."""
+    # Defaults: 10 logs / 5 plans (~2 weeks), last 10 metrics, last 5 notes
+    limits = {'plan': 5, 'log': 10, 'metric': 10, 'note': 5}
+    if context == 'upcoming':
+        limits['log'] = 7  # ~1 week
+    elif context == 'history':
+        # Long-range review reads the 'history' rollups; raw rows stay a recent sample
+        limits.update(log=20, metric=20)
+    return limits
+
+
+def _overview_stmt(user_id: str, context: Optional[str], limits: dict[str, int], truncate_words: int):
+    """Select only the rows the overview sections will render.
+
+    Rows are ranked per kind with ROW_NUMBER() in the same order the sections sort
+    them (plans by key, events by occurrence), so limited sections transfer at most
+    their limit regardless of how much history the user has. On Postgres, entries of
+    truncated sections longer than PREVIEW_WORDS transfer their stored preview
+    instead of their content whenever truncate_words is within PREVIEW_WORDS.
+    """
+    # Exclude archived entries and kinds no section renders (e.g. 'issue')
+    conditions = [
+        Entry.user_id == user_id,
+        Entry.kind.in_(_OVERVIEW_SECTION_KINDS),
+        Entry.status != 'archived',
+        or_(Entry.kind != 'strategy', func.lower(Entry.key).in_(_OVERVIEW_STRATEGY_KEYS)),
+    ]
+
+    # Add context-based kind filtering
+    if context and context in _OVERVIEW_CONTEXT_KINDS:
+        conditions.append(Entry.kind.in_(_OVERVIEW_CONTEXT_KINDS[context]))
+
+    section_rank = func.row_number().over(
+        partition_by=Entry.kind,
+        order_by=(
+            case((Entry.kind == 'plan', Entry.key)).desc().nulls_last(),
+            func.coalesce(Entry.occurred_at, Entry.created_at).desc().nulls_last(),
+        ),
+    )
+    ranked = select(Entry.id, Entry.kind, section_rank.label('section_rank')).where(and_(*conditions)).subquery()
+
+    within_limit = or_(
+        ranked.c.kind.not_in(list(limits)),
+        *[and_(ranked.c.kind == kind, ranked.c.section_rank <= limit) for kind, limit in limits.items()],
+    )
+    columns = [Entry.id, Entry.kind, Entry.key, Entry.status, Entry.occurred_at, Entry.created_at, Entry.updated_at]
+    if IS_SQLITE or not 0 < truncate_words <= PREVIEW_WORDS:
+        columns.append(Entry.content)
+    else:
+        # Only entries past PREVIEW_WORDS have a preview; shorter ones are cut from content
+        uses_preview = and_(Entry.kind.in_(_OVERVIEW_TRUNCATED_KINDS), Entry.word_count > PREVIEW_WORDS)
+        columns += [case((uses_preview, Entry.preview), else_=Entry.content).label('content'), Entry.word_count]
+    return select(*columns).join(ranked, Entry.id == ranked.c.id).where(within_limit)
+
+
+@_dispatch
+def _build_overview(session: Session, user_id: str, *, truncate_words: int, context: Optional[str]) -> dict:
+    """Query and assemble the overview sections (uncached)."""
+    limits = _overview_section_limits(context)
+    entries = session.execute(_overview_stmt(user_id, context, limits, truncate_words)).all()
+    history = None
+    if context == 'history':
+        stmt = select(
+            HistoryRollup.period, HistoryRollup.period_start, HistoryRollup.sessions,
+            HistoryRollup.session_types, HistoryRollup.metrics,
+        ).where(
+            HistoryRollup.user_id == user_id,
+            or_(HistoryRollup.period == 'month', HistoryRollup.period_start >= _history_first_week()),
+        )
+        history = _history_section(
+            (row.period, row.period_start,
+             {"sessions": row.sessions, "session_types": row.session_types, "metrics": row.metrics})
+            for row in session.execute(stmt)
+        )
+    return _assemble_overview(entries, limits, truncate_words=truncate_words, history=history)
 
-        # Determine log limit based on context
-        log_limit = 10  # default (10 logs or ~2 weeks)
-        plan_limit = 5  # default (5 plans or ~2 weeks)
-        if context == 'planning':
-            log_limit = 10  # most recent 10 or ~2 weeks
-            plan_limit = 5  # most recent 5 or ~2 weeks
-        elif context == 'upcoming':
-            log_limit = 7   # ~1 week
-            plan_limit = 5  # ~1 week
-        elif context == 'history':
-            log_limit = 500  # All history (large limit)
-            plan_limit = 500  # All history
-
-        # Strategies (long-term and short-term) - TRUNCATED
-        strategies = by_kind.get("strategy", [])
-        if strategies:
-            key_map = {(s.key or "").lower(): s for s in strategies}
-            long_term = key_map.get("long_term") or key_map.get("long-term")
-            short_term = key_map.get("short_term") or key_map.get("short-term")
-
-            strategy_section: dict[str, Any] = {}
-            if long_term:
-                strategy_section["long_term"] = _clean_entry(long_term, for_overview=True, truncate_words=truncate_words)
-            if short_term:
-                strategy_section["short_term"] = _clean_entry(short_term, for_overview=True, truncate_words=truncate_words)
-
-            if strategy_section:
-                overview["strategies"] = strategy_section
-
-        # Goals (grouped by status) - full content, ordered by key (p1, p2, etc.)
-        goals = by_kind.get("goal", [])
-        if goals:
-            def _key_sort(item: Entry) -> str:
-                # Sort by key to get natural ordering like p1, p2, p3, etc.
-                return item.key or ""
-
-            goal_groups = _group_by_status(goals, default_key="active")
-            goals_section: dict[str, list[dict[str, Any]]] = {}
-            for status, items in goal_groups.items():
-                sorted_items = sorted(items, key=_key_sort)
-                cleaned = [_clean_entry(item, for_overview=True) for item in sorted_items]
-                if cleaned:
-                    goals_section[status] = cleaned
-            if goals_section:
-                overview["goals"] = goals_section
-
-        # Plans - recent plans only, sorted by date (recent first)
-        plans = by_kind.get("plan", [])
-        if plans:
-            # Sort by key (which contains date YYYY-MM-DD) descending (recent first)
-            recent_plans = sorted(
-                plans,
-                key=lambda item: item.key or "",
-                reverse=True,
-            )[:plan_limit]
-            overview["recent_plans"] = [_clean_entry(item, for_overview=True) for item in recent_plans]
-
-        # Current state (simple list) - full content
-        current = by_kind.get("current", [])
-        if current:
-            overview["current"] = [_clean_entry(item, for_overview=True) for item in _sorted(current)]
-
-        # Program (current program) - TRUNCATED
-        programs = by_kind.get("program", [])
-        if programs:
-            overview["program"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(programs)]
-
-        # Week (current week plan) - full content
-        weeks = by_kind.get("week", [])
-        if weeks:
-            overview["week"] = [_clean_entry(item, for_overview=True) for item in _sorted(weeks)]
-
-        # Preferences (simple list) - TRUNCATED
-        preferences = by_kind.get("preference", [])
-        if preferences:
-            overview["preferences"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(preferences)]
-
-        # Knowledge (simple list) - TRUNCATED
-        knowledge = by_kind.get("knowledge", [])
-        if knowledge:
-            overview["knowledge"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(knowledge)]
-
-        # Principles (simple list) - TRUNCATED
-        principles = by_kind.get("principle", [])
-        if principles:
-            overview["principles"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(principles)]
-
-        # Recent logs (context-aware limit) - TRUNCATED
-        logs = by_kind.get("log", [])
-        if logs:
-            recent = sorted(
-                logs,
-                key=lambda item: (item.occurred_at or item.created_at or datetime.min),
-                reverse=True,
-            )[:log_limit]
-            overview["recent_logs"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in recent]
-
-        # Recent metrics - full content (already short)
-        # Limit based on context: history mode shows all, default shows last 10
-        metrics = by_kind.get("metric", [])
-        if metrics:
-            metric_limit = 500 if context == 'history' else 10
-            recent = sorted(
-                metrics,
-                key=lambda item: (item.occurred_at or item.created_at or datetime.min),
-                reverse=True,
-            )[:metric_limit]
-            overview["recent_metrics"] = [_clean_entry(item, for_overview=True) for item in recent]
-
-        # Notes (last 5 only) - TRUNCATED
-        notes = by_kind.get("note", [])
-        if notes:
-            recent = sorted(
-                notes,
-                key=lambda item: (item.occurred_at or item.created_at or datetime.min),
-                reverse=True,
-            )[:5]
-            overview["recent_notes"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in recent]
 
-        return overview
+def _assemble_overview(entries: list[Any], limits: dict[str, int], *, truncate_words: int,
+                       history: Optional[dict[str, list[dict]]] = None) -> dict:
+    """Render the overview sections from the rows _overview_stmt selects (plus rollups for 'history')."""
+    by_kind: dict[str, list[Entry]] = defaultdict(list)
+    for entry in entries:
+        by_kind[entry.kind].append(entry)
+
+    def _sorted(items: list[Entry]) -> list[Entry]:
+        # Sort by updated_at descending (most recent first)
+        # Priority is now in attrs and could be string or int, so skip it
+        return sorted(
+            items,
+            key=lambda x: -(x.updated_at or x.created_at or datetime.min).timestamp(),
+        )
+
+    overview: dict[str, Any] = _overview_dates()
+    plan_limit = limits['plan']
+    log_limit = limits['log']
+
+    # Strategies (long-term and short-term) - TRUNCATED
+    strategies = by_kind.get("strategy", [])
+    if strategies:
+        key_map = {(s.key or "").lower(): s for s in strategies}
+        long_term = key_map.get("long_term") or key_map.get("long-term")
+        short_term = key_map.get("short_term") or key_map.get("short-term")
+
+        strategy_section: dict[str, Any] = {}
+        if long_term:
+            strategy_section["long_term"] = _clean_entry(long_term, for_overview=True, truncate_words=truncate_words)
+        if short_term:
+            strategy_section["short_term"] = _clean_entry(short_term, for_overview=True, truncate_words=truncate_words)
+
+        if strategy_section:
+            overview["strategies"] = strategy_section
+
+    # Goals (grouped by status) - full content, ordered by key (p1, p2, etc.)
+    goals = by_kind.get("goal", [])
+    if goals:
+        def _key_sort(item: Entry) -> str:
+            # Sort by key to get natural ordering like p1, p2, p3, etc.
+            return item.key or ""
+
+        goal_groups = _group_by_status(goals, default_key="active")
+        goals_section: dict[str, list[dict[str, Any]]] = {}
+        for status, items in goal_groups.items():
+            sorted_items = sorted(items, key=_key_sort)
+            cleaned = [_clean_entry(item, for_overview=True) for item in sorted_items]
+            if cleaned:
+                goals_section[status] = cleaned
+        if goals_section:
+            overview["goals"] = goals_section
+
+    # Plans - recent plans only, sorted by date (recent first)
+    plans = by_kind.get("plan", [])
+    if plans:
+        # Sort by key (which contains date YYYY-MM-DD) descending (recent first)
+        recent_plans = sorted(
+            plans,
+            key=lambda item: item.key or "",
+            reverse=True,
+        )[:plan_limit]
+        overview["recent_plans"] = [_clean_entry(item, for_overview=True) for item in recent_plans]
+
+    # Current state (simple list) - full content
+    current = by_kind.get("current", [])
+    if current:
+        overview["current"] = [_clean_entry(item, for_overview=True) for item in _sorted(current)]
+
+    # Program (current program) - TRUNCATED
+    programs = by_kind.get("program", [])
+    if programs:
+        overview["program"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(programs)]
+
+    # Week (current week plan) - full content
+    weeks = by_kind.get("week", [])
+    if weeks:
+        overview["week"] = [_clean_entry(item, for_overview=True) for item in _sorted(weeks)]
+
+    # Preferences (simple list) - TRUNCATED
+    preferences = by_kind.get("preference", [])
+    if preferences:
+        overview["preferences"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(preferences)]
+
+    # Knowledge (simple list) - TRUNCATED
+    knowledge = by_kind.get("knowledge", [])
+    if knowledge:
+        overview["knowledge"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(knowledge)]
+
+    # Principles (simple list) - TRUNCATED
+    principles = by_kind.get("principle", [])
+    if principles:
+        overview["principles"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in _sorted(principles)]
+
+    # Recent logs (context-aware limit) - TRUNCATED
+    logs = by_kind.get("log", [])
+    if logs:
+        recent = sorted(
+            logs,
+            key=lambda item: (item.occurred_at or item.created_at or datetime.min),
+            reverse=True,
+        )[:log_limit]
+        overview["recent_logs"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in recent]
+
+    # Recent metrics - full content (already short)
+    # Limit based on context: history mode shows the last 20, default the last 10
+    metrics = by_kind.get("metric", [])
+    if metrics:
+        recent = sorted(
+            metrics,
+            key=lambda item: (item.occurred_at or item.created_at or datetime.min),
+            reverse=True,
+        )[:limits['metric']]
+        overview["recent_metrics"] = [_clean_entry(item, for_overview=True) for item in recent]
+
+    # Notes (last 5 only) - TRUNCATED
+    notes = by_kind.get("note", [])
+    if notes:
+        recent = sorted(
+            notes,
+            key=lambda item: (item.occurred_at or item.created_at or datetime.min),
+            reverse=True,
+        )[:limits['note']]
+        overview["recent_notes"] = [_clean_entry(item, for_overview=True, truncate_words=truncate_words) for item in recent]
+
+    # Weekly and monthly rollups - counts and metric ranges, no content
+    if history and (history["weeks"] or history["months"]):
+        overview["history"] = history
+
+    return overview
@@ -1,9 +1,18 @@
-from sqlalchemy import create_engine, Column, String, Text, DateTime, Index, UniqueConstraint
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event, BigInteger, Column, Computed, Date, Double, ForeignKey, Integer, JSON, String, Text, DateTime, Index, TypeDecorator, UniqueConstraint, Uuid
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import declarative_base, deferred, sessionmaker
 from sqlalchemy.sql import func
+from sqlalchemy.sql.functions import now
+from datetime import timezone
+import math
 import os
-from sqlalchemy import text as sql_text
+import random
+import uuid
+from sqlalchemy import make_url, text as sql_text
+
+from .cache import recent_writes
+from .pool import InstrumentedQueuePool, register
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
@@ -13,33 +22,148 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgresql://"):
     DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+psycopg://")
 
-# Optimized for Supabase pooler connection
-# Since Supabase already provides connection pooling, we keep a minimal local pool
-engine = create_engine(
-    DATABASE_URL,
-    pool_size=2,  # Small local pool since Supabase handles pooling
-    max_overflow=3,  # Allow some overflow for bursts
-    pool_pre_ping=False,  # Supabase pooler handles dead connections
-    pool_recycle=-1,  # Disable recycling, let Supabase handle it
-    echo_pool=False,  # Disable pool debugging
-    connect_args={
-        "connect_timeout": 10,
-        "options": "-c statement_timeout=30000",  # 30 second statement timeout
-        "keepalives": 1,
-        "keepalives_idle": 30,
-        "keepalives_interval": 10,
-        "keepalives_count": 5,
-    } if DATABASE_URL.startswith("postgresql") else {}
-)
+# sqlite:///path/to/fitness.db selects the embedded single-user backend
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+if IS_SQLITE:
+    # One local file: no network, no server-side pool to defer to
+    ENGINE_OPTIONS = dict(connect_args={"timeout": 30})
+else:
+    # Optimized for Supabase pooler connection: Supabase already pools server-side, so the
+    # local pool stays small by default. DATABASE_POOL_* resize it for bursty multi-client
+    # load; pool_stats() and the db.pool.* metrics show checkout waits to size it from.
+    ENGINE_OPTIONS = dict(
+        poolclass=InstrumentedQueuePool,
+        pool_size=int(os.getenv("DATABASE_POOL_SIZE", "2")),
+        max_overflow=int(os.getenv("DATABASE_MAX_OVERFLOW", "3")),  # extra connections for bursts
+        pool_timeout=float(os.getenv("DATABASE_POOL_TIMEOUT", "30")),  # seconds to wait for a connection
+        pool_recycle=int(os.getenv("DATABASE_POOL_RECYCLE", "-1")),  # -1: never, let Supabase handle it
+        pool_pre_ping=os.getenv("DATABASE_POOL_PRE_PING", "false").lower() == "true",  # off: the pooler handles dead connections
+        echo_pool=False,  # Disable pool debugging
+        connect_args={
+            "connect_timeout": 10,
+            "options": "-c statement_timeout=30000",  # 30 second statement timeout
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 5,
+        },
+    )
+
+# Server-side prepared statements: psycopg prepares a query once a connection has run it
+# DATABASE_PREPARE_THRESHOLD times, skipping parse and plan from then on. Transaction-mode
+# poolers (Supabase on port 6543, PgBouncer pool_mode=transaction) hand every transaction
+# a different server connection that lacks the statement, so preparing is off through them.
+# DATABASE_POOL_MODE=transaction|session overrides the guess from the URL's port.
+PREPARE_THRESHOLD = int(os.getenv("DATABASE_PREPARE_THRESHOLD", "5"))
+
+
+def pool_mode(url: str) -> str:
+    """'transaction' when url goes through a transaction-mode pooler, else 'session'."""
+    mode = os.getenv("DATABASE_POOL_MODE", "auto").lower()
+    if mode != "auto":
+        return mode
+    return "transaction" if make_url(url).port == 6543 else "session"
+
+
+def engine_options(url: str, *, read_only: bool = False) -> dict:
+    """ENGINE_OPTIONS for one database URL: prepared statements unless it is pooled per
+    transaction, and sessions that refuse writes for read replicas."""
+    if IS_SQLITE:
+        return ENGINE_OPTIONS
+    connect_args = dict(
+        ENGINE_OPTIONS["connect_args"],
+        prepare_threshold=None if pool_mode(url) == "transaction" else PREPARE_THRESHOLD,
+    )
+    if read_only:
+        connect_args["options"] += " -c default_transaction_read_only=on"
+    return dict(ENGINE_OPTIONS, connect_args=connect_args)
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+
+# Optional read replicas (comma-separated URLs) for read-only tool calls; one SQLite
+# file has none. Their sessions refuse writes, so a misrouted write fails loudly.
+DATABASE_READ_URLS = [] if IS_SQLITE else [
+    url.strip().replace("postgresql://", "postgresql+psycopg://", 1)
+    for url in os.getenv("DATABASE_READ_URL", "").split(",") if url.strip()
+]
+read_engines = [create_engine(url, **engine_options(url, read_only=True)) for url in DATABASE_READ_URLS]
+
+register("primary", engine)
+for number, read_engine in enumerate(read_engines, 1):
+    register(f"replica-{number}", read_engine)
+
+
+def choose_replica(user_id: str, replicas: list):
+    """A random replica to read user_id's data from, or None to use the primary.
+
+    Users who wrote within READ_YOUR_WRITES_SECONDS stay on the primary, since a
+    replica may not have replayed that write yet.
+    """
+    if not replicas or recent_writes.is_recent(user_id):
+        return None
+    return random.choice(replicas)
+
+
+@compiles(now, "sqlite")
+def _sqlite_now(element, compiler, **kw):
+    # UTC with microsecond digits, the same text format SQLAlchemy stores datetimes in,
+    # so server- and client-side timestamps compare correctly as strings
+    return "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """WAL lets readers proceed during writes; LIKE matches case-sensitively and
+    ON DELETE CASCADE applies, as on Postgres."""
+    cursor = dbapi_connection.cursor()
+    for pragma in (
+        "journal_mode=WAL",
+        "synchronous=NORMAL",
+        "busy_timeout=5000",
+        "case_sensitive_like=ON",
+        "foreign_keys=ON",
+    ):
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+    # Recency-weighted search needs power(); older SQLite builds lack the math functions
+    if hasattr(dbapi_connection, "create_function"):
+        dbapi_connection.create_function("power", 2, math.pow, deterministic=True)
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+
+
+class UTCDateTime(TypeDecorator):
+    """timestamptz on Postgres; on SQLite, stored as naive UTC text and read back as aware UTC."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+    def process_result_value(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
+
 
 Base = declarative_base()
 
+# Words kept in Entry.preview; overviews truncating to at most this many never read content
+PREVIEW_WORDS = 200
+_WORD_COUNT_SQL = r"cardinality(array_remove(regexp_split_to_array(content, '\s+'), ''))"
+
 
 class Entry(Base):
     __tablename__ = "entries"
 
     # Core identity
-    id = Column(UUID, primary_key=True, server_default=func.gen_random_uuid())
+    id = Column(Uuid, primary_key=True, default=uuid.uuid4, server_default=None if IS_SQLITE else func.gen_random_uuid())
     user_id = Column(String(255), nullable=False, index=True)
 
     # Type and identity
@@ -52,24 +176,206 @@ class Entry(Base):
     # Simple binary status
     status = Column(String(50), default='active')  # Only 'active' or 'archived'
 
+    # Full-text search vector, generated by Postgres on write (never loaded by default).
+    # SQLite keeps the equivalent in the entries_fts FTS5 table instead.
+    if not IS_SQLITE:
+        fts = deferred(Column(
+            TSVECTOR,
+            Computed("to_tsvector('english', coalesce(key, '') || ' ' || content)", persisted=True),
+        ))
+        # Overview previews, also generated on write: the word count, and for content
+        # longer than PREVIEW_WORDS words its first PREVIEW_WORDS words (whitespace kept)
+        word_count = deferred(Column(Integer, Computed(_WORD_COUNT_SQL, persisted=True)))
+        preview = deferred(Column(Text, Computed(
+            f"CASE WHEN {_WORD_COUNT_SQL} > {PREVIEW_WORDS} "
+            rf"THEN substring(content from '^\s*(\S+(?:\s+\S+){{0,{PREVIEW_WORDS - 1}}})') END",
+            persisted=True,
+        )))
+
     # Timestamps
-    occurred_at = Column(DateTime(timezone=True))  # For events
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    occurred_at = Column(UTCDateTime)  # For events
+    created_at = Column(UTCDateTime, server_default=func.now())
+    updated_at = Column(UTCDateTime, onupdate=func.now())
+
+    # Position in the change feed (crud.list_changes): bumped by triggers on every
+    # insert and update, from one sequence shared with entry_tombstones, in commit
+    # order per user (migrations/012_change_feed_commit_order.sql, 013)
+    change_seq = Column(BigInteger, server_default=None if IS_SQLITE else sql_text("nextval('entries_change_seq')"))
 
     __table_args__ = (
         UniqueConstraint('user_id', 'kind', 'key', name='uq_entries_user_kind_key'),
+        Index('idx_entries_user_occured_at', 'user_id', 'occurred_at'),
+        Index('idx_entries_user_change_seq', 'user_id', 'change_seq'),
+        # Partial indexes for the item/event split; list pages resolve from them index-only
         Index(
-            'idx_entries_fts',
-            func.to_tsvector('english', func.concat(func.coalesce(key, ''), ' ', content)),
-            postgresql_using='gin'
+            'idx_entries_items_recent',
+            user_id, kind, func.coalesce(updated_at, created_at).desc(), id.desc(),
+            postgresql_include=['status', 'updated_at', 'created_at'],
+            postgresql_where=key.isnot(None),
+            sqlite_where=key.isnot(None),
         ),
-        Index('idx_entries_user_occured_at', 'user_id', 'occurred_at'),
+        Index(
+            'idx_entries_events_recent',
+            user_id, kind, occurred_at.desc(), id.desc(),
+            postgresql_where=key.is_(None),
+            sqlite_where=key.is_(None),
+        ),
+    ) + (() if IS_SQLITE else (Index('idx_entries_fts', 'fts', postgresql_using='gin'),))
+
+
+class MetricPoint(Base):
+    """A numeric reading parsed from a metric event (see metrics.parse_metrics).
+
+    Rows are written alongside their entry and deleted with it; occurred_at is
+    copied from the entry so trend queries never touch entries.
+    """
+    __tablename__ = "metric_points"
+
+    entry_id = Column(Uuid, ForeignKey("entries.id", ondelete="CASCADE"), primary_key=True)
+    metric_name = Column(String(100), primary_key=True)
+    user_id = Column(String(255), nullable=False)
+    value = Column(Double, nullable=False)
+    unit = Column(String(20))
+    occurred_at = Column(UTCDateTime, nullable=False)
+
+    __table_args__ = (
+        # Latest/range/series queries resolve from this index alone
+        Index(
+            'idx_metric_points_user_metric_time',
+            'user_id', 'metric_name', 'occurred_at',
+            postgresql_include=['value', 'unit'],
+        ),
+    )
+
+
+class EntryTombstone(Base):
+    """What remains of a deleted entry, so change feeds can report the delete.
+
+    Written by a delete trigger on entries (migrations/010_change_feed.sql,
+    SQLITE_CHANGE_DDL) with the next change_seq.
+    """
+    __tablename__ = "entry_tombstones"
+
+    entry_id = Column(Uuid, primary_key=True)
+    user_id = Column(String(255), nullable=False)
+    kind = Column(String(50), nullable=False)
+    key = Column(String(255))
+    change_seq = Column(BigInteger, nullable=False)
+    deleted_at = Column(UTCDateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_entry_tombstones_user_change_seq', 'user_id', 'change_seq'),
     )
 
+
+class ChangeFeedHorizon(Base):
+    """Per user, the newest change_seq of a tombstone crud.prune_tombstones removed.
+
+    list_changes can no longer report deletes up to it, so older tokens get a
+    fresh snapshot (migrations/013_change_feed_locks_and_retention.sql).
+    """
+    __tablename__ = "change_feed_horizons"
+
+    user_id = Column(String(255), primary_key=True)
+    change_seq = Column(BigInteger, nullable=False)
+
+
+class HistoryRollup(Base):
+    """Per-user summary of one ISO week or calendar month of logs and metric readings.
+
+    crud recomputes the periods a log or metric write touches in the same
+    transaction, so the history overview reads a few hundred small rows instead of
+    every log. Buckets follow each entry's occurred_at as a UTC date; keyed logs
+    use their key's date ('2025-10-29-upper'), else created_at. Archived logs don't count.
+    """
+    __tablename__ = "history_rollups"
+
+    user_id = Column(String(255), primary_key=True)
+    period = Column(String(10), primary_key=True)  # 'week' or 'month'
+    period_start = Column(Date, primary_key=True)  # Monday, or the 1st of the month
+    sessions = Column(Integer, nullable=False, default=0)  # logs in the period
+    session_types = Column(JSON().with_variant(JSONB(), 'postgresql'), nullable=False)  # {'upper': 2, ...} from log keys
+    metrics = Column(JSON().with_variant(JSONB(), 'postgresql'), nullable=False)  # {'weight': {count, min, max, avg, unit}}
+    updated_at = Column(UTCDateTime, server_default=func.now())
+
 # Create session factory with autoflush disabled for better performance
 SessionLocal = sessionmaker(
     bind=engine,
     autoflush=False,  # Disable autoflush for better performance
     expire_on_commit=False  # Don't expire objects after commit
 )
+
+
+def read_session(user_id: str):
+    """A session for read-only work on behalf of user_id, on a replica when one is due."""
+    replica = choose_replica(user_id, read_engines)
+    return SessionLocal(bind=replica) if replica is not None else SessionLocal()
+
+
+# SQLite full-text index: FTS5 rows mirror key + content, kept in sync by triggers.
+# entries has no stable integer key (VACUUM may renumber rowids), so entries_fts_map
+# records which FTS row belongs to which entry for updates and deletes.
+SQLITE_FTS_DDL = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts
+        USING fts5(entry_id UNINDEXED, document, tokenize='porter unicode61')""",
+    """CREATE TABLE IF NOT EXISTS entries_fts_map (
+        entry_id CHAR(32) PRIMARY KEY, fts_rowid INTEGER NOT NULL) WITHOUT ROWID""",
+    """CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+        INSERT INTO entries_fts (entry_id, document) VALUES (new.id, coalesce(new.key, '') || ' ' || new.content);
+        INSERT INTO entries_fts_map (entry_id, fts_rowid) VALUES (new.id, last_insert_rowid());
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS entries_fts_update AFTER UPDATE OF key, content ON entries BEGIN
+        UPDATE entries_fts SET document = coalesce(new.key, '') || ' ' || new.content
+        WHERE rowid = (SELECT fts_rowid FROM entries_fts_map WHERE entry_id = old.id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS entries_fts_delete AFTER DELETE ON entries BEGIN
+        DELETE FROM entries_fts WHERE rowid = (SELECT fts_rowid FROM entries_fts_map WHERE entry_id = old.id);
+        DELETE FROM entries_fts_map WHERE entry_id = old.id;
+    END""",
+)
+
+# SQLite change feed: a one-row counter stands in for Postgres' entries_change_seq.
+# Inserts and updates stamp the entry with the next value, deletes leave a tombstone.
+_SQLITE_NEXT_CHANGE = "UPDATE change_counter SET value = value + 1 WHERE id = 1;"
+SQLITE_CHANGE_DDL = (
+    """CREATE TABLE IF NOT EXISTS change_counter (
+        id INTEGER PRIMARY KEY CHECK (id = 1), value INTEGER NOT NULL)""",
+    "INSERT OR IGNORE INTO change_counter (id, value) SELECT 1, coalesce(max(change_seq), 0) FROM entries",
+    f"""CREATE TRIGGER IF NOT EXISTS entries_change_insert AFTER INSERT ON entries BEGIN
+        {_SQLITE_NEXT_CHANGE}
+        UPDATE entries SET change_seq = (SELECT value FROM change_counter) WHERE id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS entries_change_update
+        AFTER UPDATE OF kind, key, content, status, occurred_at ON entries BEGIN
+        {_SQLITE_NEXT_CHANGE}
+        UPDATE entries SET change_seq = (SELECT value FROM change_counter) WHERE id = new.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS entries_change_delete AFTER DELETE ON entries BEGIN
+        {_SQLITE_NEXT_CHANGE}
+        INSERT OR REPLACE INTO entry_tombstones (entry_id, user_id, kind, key, change_seq, deleted_at)
+        VALUES (old.id, old.user_id, old.kind, old.key, (SELECT value FROM change_counter),
+                strftime('%Y-%m-%d %H:%M:%f000', 'now'));
+    END""",
+)
+
+
+def init_sqlite_schema(bind=engine) -> None:
+    """Create the entries table, indexes, FTS5 index and change triggers in a SQLite database (idempotent).
+
+    Postgres schemas come from migrations/; the embedded backend has no migration
+    runner, so the model is the source of truth there.
+    """
+    Base.metadata.create_all(bind)
+    with bind.begin() as conn:
+        columns = {row[1] for row in conn.execute(sql_text("PRAGMA table_info(entries)"))}
+        if 'change_seq' not in columns:
+            # Files created before the change feed: number existing rows in insertion order
+            conn.execute(sql_text("ALTER TABLE entries ADD COLUMN change_seq BIGINT"))
+            conn.execute(sql_text("UPDATE entries SET change_seq = rowid"))
+            conn.execute(sql_text("CREATE INDEX idx_entries_user_change_seq ON entries (user_id, change_seq)"))
+        for ddl in SQLITE_FTS_DDL + SQLITE_CHANGE_DDL:
+            conn.execute(sql_text(ddl))
+
+
+if IS_SQLITE:
+    init_sqlite_schema()
@@ -0,0 +1,540 @@
+"""Pure-Python in-memory implementation of the crud operations.
+
+MemoryStore keeps entries in plain dicts: items indexed by (user_id, kind) then
+key, events in per-user lists sorted by (occurred_at, id), an inverted index
+from lowercased words to the entries containing them, and parsed metric readings
+in per-(user, metric) lists sorted by time. Pass a store wherever crud
+expects a session and the decorated crud functions are served from it, with the
+same arguments, results, cursors and overview cache invalidation as the database.
+
+It exists for fast tests (no database, no network) and as a reference model to
+check the SQL backends against. Known differences: search matches whole words
+without stemming or stop words, and scores are term counts rather than
+ts_rank_cd/bm25, so only the order of results is comparable, not score values.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator, NamedTuple, Optional
+import re
+import uuid
+
+from .crud import (
+    _OVERVIEW_CONTEXT_KINDS,
+    _OVERVIEW_SECTION_KINDS,
+    _OVERVIEW_STRATEGY_KEYS,
+    _METRIC_BUCKETS,
+    _aggregate_rollups,
+    _assemble_overview,
+    _change_token,
+    _decode_cursor,
+    _decode_search_cursor,
+    _encode_cursor,
+    _history_section,
+    _invalidate_overview,
+    _metric_series_rows,
+    _metric_summary,
+    _normalize_status,
+    _overview_section_limits,
+    _serialize,
+)
+from .metrics import normalize_metric_name, parse_metrics
+
+
+@dataclass(slots=True)
+class MemoryEntry:
+    """One stored entry; attribute names match db.Entry so crud's serializers apply."""
+
+    id: uuid.UUID
+    user_id: str
+    kind: str
+    key: Optional[str]
+    content: str
+    status: str
+    occurred_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    change_seq: int = 0
+
+
+class _UnitGroup(NamedTuple):
+    """A metric's readings in one unit, shaped like a row of crud.metric_range's query."""
+
+    unit: Optional[str]
+    count: int
+    min: float
+    max: float
+    total: float
+    start: datetime
+    end: datetime
+    first: float
+    last: float
+
+
+class _BucketGroup(NamedTuple):
+    """A metric's readings in one bucket and unit, like a row of crud.metric_series' query."""
+
+    bucket: str
+    unit: Optional[str]
+    count: int
+    min: float
+    max: float
+    total: float
+    end: datetime
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _utc(value: datetime) -> datetime:
+    """Naive datetimes are UTC, as on the SQLite backend."""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r'\w+', text.lower())
+
+
+def _activity_time(entry: MemoryEntry) -> datetime:
+    """When an entry last mattered: occurrence for events, last change for items."""
+    return entry.occurred_at or entry.updated_at or entry.created_at
+
+
+def _item_time(entry: MemoryEntry) -> datetime:
+    return entry.updated_at or entry.created_at
+
+
+class MemoryStore:
+    """In-memory stand-in for a database session (see module docstring)."""
+
+    # crud._dispatch routes calls to the store when it sees this flag
+    in_memory = True
+
+    def __init__(self) -> None:
+        self._entries: dict[uuid.UUID, MemoryEntry] = {}
+        self._items: dict[tuple[str, str], dict[str, uuid.UUID]] = defaultdict(dict)
+        self._events: dict[str, list[tuple[datetime, uuid.UUID]]] = defaultdict(list)
+        self._postings: dict[str, dict[uuid.UUID, int]] = defaultdict(dict)
+        self._points: dict[tuple[str, str], list[tuple[datetime, uuid.UUID, float, Optional[str]]]] = defaultdict(list)
+        self._change_seq = 0
+        self._tombstones: dict[str, list[tuple[int, uuid.UUID, str, Optional[str]]]] = defaultdict(list)
+
+    # ------------------------------------------------------------------
+    # Storage and index maintenance
+    # ------------------------------------------------------------------
+
+    def _index(self, entry: MemoryEntry) -> None:
+        for word, count in Counter(_words(f"{entry.key or ''} {entry.content}")).items():
+            self._postings[word][entry.id] = count
+
+    def _unindex(self, entry: MemoryEntry) -> None:
+        for word in set(_words(f"{entry.key or ''} {entry.content}")):
+            postings = self._postings[word]
+            postings.pop(entry.id, None)
+            if not postings:
+                del self._postings[word]
+
+    def _readings(self, entry: MemoryEntry) -> list[tuple[str, float, Optional[str]]]:
+        return parse_metrics(entry.content) if entry.kind == 'metric' and entry.key is None else []
+
+    def _next_change(self) -> int:
+        self._change_seq += 1
+        return self._change_seq
+
+    def _add(self, entry: MemoryEntry) -> MemoryEntry:
+        entry.change_seq = self._next_change()  # inserts and updates both pass through here
+        self._entries[entry.id] = entry
+        if entry.key is None:
+            insort(self._events[entry.user_id], (entry.occurred_at, entry.id))
+        else:
+            self._items[(entry.user_id, entry.kind)][entry.key] = entry.id
+        self._index(entry)
+        for name, value, unit in self._readings(entry):
+            insort(self._points[(entry.user_id, name)], (entry.occurred_at, entry.id, value, unit))
+        return entry
+
+    def _remove(self, entry: MemoryEntry) -> None:
+        del self._entries[entry.id]
+        if entry.key is None:
+            self._events[entry.user_id].remove((entry.occurred_at, entry.id))
+        else:
+            del self._items[(entry.user_id, entry.kind)][entry.key]
+        self._unindex(entry)
+        for name, value, unit in self._readings(entry):
+            self._points[(entry.user_id, name)].remove((entry.occurred_at, entry.id, value, unit))
+
+    def _delete(self, entry: MemoryEntry) -> None:
+        """Remove an entry for good, leaving a tombstone for list_changes."""
+        self._remove(entry)
+        self._tombstones[entry.user_id].append((self._next_change(), entry.id, entry.kind, entry.key))
+
+    def _update(self, entry: MemoryEntry, **values: Any) -> MemoryEntry:
+        """Change an entry's fields, keeping every index in step."""
+        self._remove(entry)
+        for name, value in values.items():
+            setattr(entry, name, value)
+        entry.updated_at = _now()
+        return self._add(entry)
+
+    def _new(self, user_id: str, kind: str, key: Optional[str], content: str, status: str,
+             occurred_at: Optional[datetime] = None) -> MemoryEntry:
+        return self._add(MemoryEntry(
+            id=uuid.uuid4(), user_id=user_id, kind=kind, key=key, content=content, status=status,
+            occurred_at=occurred_at, created_at=_now(),
+        ))
+
+    def _item(self, user_id: str, kind: str, key: str) -> Optional[MemoryEntry]:
+        entry_id = self._items.get((user_id, kind), {}).get(key)
+        return self._entries[entry_id] if entry_id else None
+
+    def _event(self, user_id: str, event_id: str) -> Optional[MemoryEntry]:
+        try:
+            entry = self._entries.get(uuid.UUID(event_id))
+        except ValueError:
+            return None
+        if entry is None or entry.user_id != user_id or entry.key is not None:
+            return None
+        return entry
+
+    def _user_entries(self, user_id: str) -> Iterator[MemoryEntry]:
+        return (entry for entry in self._entries.values() if entry.user_id == user_id)
+
+    # ------------------------------------------------------------------
+    # Items
+    # ------------------------------------------------------------------
+
+    def upsert_item(self, user_id: str, *, kind: str, key: str, content: str,
+                    status: Optional[str] = None, old_key: Optional[str] = None) -> dict:
+        """See crud.upsert_item."""
+        status = _normalize_status(status)
+        if old_key is not None and old_key != key:
+            renamed = self._item(user_id, kind, old_key)
+            if renamed is not None:
+                if self._item(user_id, kind, key) is not None:
+                    raise ValueError(f"Cannot rename: entry with key '{key}' already exists")
+                self._update(renamed, key=key, content=content, status=status)
+                _invalidate_overview(user_id, kind)
+                return _serialize(renamed)
+
+        entry = self._item(user_id, kind, key)
+        if entry is None:
+            entry = self._new(user_id, kind, key, content, status)
+        else:
+            self._update(entry, content=content, status=status)
+        _invalidate_overview(user_id, kind)
+        return _serialize(entry)
+
+    def bulk_upsert_items(self, user_id: str, *, items: list[dict[str, Any]]) -> list[dict]:
+        """See crud.bulk_upsert_items."""
+        records = []
+        for record in items:
+            if not record.get('kind') or record.get('content') is None:
+                raise ValueError("Each record needs a 'kind' and 'content'")
+            records.append((record['kind'], record.get('key') or None, record['content'], record.get('status')))
+
+        # Repeated keys collapse to the last record, written once
+        last_keyed = {(kind, key): i for i, (kind, key, _, _) in enumerate(records) if key}
+        now = _now()
+        written: dict[Any, tuple[MemoryEntry, str]] = {}
+        for i, (kind, key, content, status) in enumerate(records):
+            if key and last_keyed[(kind, key)] != i:
+                continue
+            if key:
+                entry = self._item(user_id, kind, key)
+                if entry is None:
+                    written[(kind, key)] = (self._new(user_id, kind, key, content, _normalize_status(status)), 'created')
+                else:
+                    written[(kind, key)] = (self._update(entry, content=content, status=_normalize_status(status)), 'updated')
+            else:
+                written[i] = (self._new(user_id, kind, None, content, 'active', occurred_at=now), 'created')
+        if records:
+            _invalidate_overview(user_id, *{kind for kind, _, _, _ in records})
+
+        results = []
+        for i, (kind, key, _, _) in enumerate(records):
+            entry, outcome = written[(kind, key) if key else i]
+            results.append({**_serialize(entry), "outcome": outcome})
+        return results
+
+    def get_item(self, user_id: str, *, kind: str, key: str) -> Optional[dict]:
+        """See crud.get_item."""
+        entry = self._item(user_id, kind, key)
+        return _serialize(entry) if entry else None
+
+    def get_items_by_keys(self, user_id: str, *, keys: list[tuple[str, str]]) -> list[dict]:
+        """See crud.get_items_by_keys."""
+        results = []
+        for kind, key in keys:
+            entry = self._item(user_id, kind, key)
+            results.append(_serialize(entry) if entry else {"kind": kind, "key": key, "missing": True})
+        return results
+
+    def delete_item(self, user_id: str, *, kind: str, key: str) -> bool:
+        """See crud.delete_item."""
+        entry = self._item(user_id, kind, key)
+        if entry is None:
+            return False
+        self._delete(entry)
+        _invalidate_overview(user_id, kind)
+        return True
+
+    def archive_items(self, user_id: str, *, kind: str, key: Optional[str] = None, status: Optional[str] = None,
+                      key_prefix: Optional[str] = None, before: Optional[datetime] = None) -> list[str]:
+        """See crud.archive_items."""
+        matched = []
+        for item_key, entry_id in self._items.get((user_id, kind), {}).items():
+            entry = self._entries[entry_id]
+            if (entry.status != status) if status else entry.status == 'archived':
+                continue
+            if key is not None and item_key != key:
+                continue
+            if key_prefix and not item_key.startswith(key_prefix):
+                continue
+            if before is not None and not _activity_time(entry) < _utc(before):
+                continue
+            matched.append(entry)
+
+        # Collect first: archiving re-indexes the entry, which reorders _items
+        for entry in matched:
+            self._update(entry, status='archived')
+        if matched:
+            _invalidate_overview(user_id, kind)
+        return [entry.key for entry in matched]
+
+    def list_items_page(self, user_id: str, *, kind: str, status: Optional[str] = None,
+                        limit: int = 100, cursor: Optional[str] = None) -> dict:
+        """See crud.list_items_page."""
+        entries = [self._entries[i] for i in self._items.get((user_id, kind), {}).values()]
+        if status:
+            entries = [entry for entry in entries if entry.status == status]
+        rows = sorted(((_item_time(entry), entry.id) for entry in entries), reverse=True)
+        return self._page(rows, limit=limit, cursor=cursor)
+
+    # ------------------------------------------------------------------
+    # Events
+    # ------------------------------------------------------------------
+
+    def log_event(self, user_id: str, *, kind: str, content: str, occurred_at: Optional[datetime] = None) -> dict:
+        """See crud.log_event."""
+        entry = self._new(user_id, kind, None, content, 'active', occurred_at=_utc(occurred_at) if occurred_at else _now())
+        _invalidate_overview(user_id, kind)
+        return _serialize(entry)
+
+    def list_events_page(self, user_id: str, *, kind: Optional[str] = None, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, limit: int = 100, cursor: Optional[str] = None) -> dict:
+        """See crud.list_events_page."""
+        events = self._events.get(user_id, [])
+        # The list is sorted on (occurred_at, id), so the time window is a slice
+        low = bisect_left(events, (_utc(start),)) if start else 0
+        high = bisect_right(events, (_utc(end), uuid.UUID(int=(1 << 128) - 1))) if end else len(events)
+        rows = [row for row in reversed(events[low:high]) if not kind or self._entries[row[1]].kind == kind]
+        return self._page(rows, limit=limit, cursor=cursor)
+
+    def update_event(self, user_id: str, *, event_id: str, content: Optional[str] = None,
+                     occurred_at: Optional[datetime] = None) -> Optional[dict]:
+        """See crud.update_event."""
+        entry = self._event(user_id, event_id)
+        if entry is None:
+            return None
+        values: dict[str, Any] = {}
+        if content is not None:
+            values["content"] = content
+        if occurred_at is not None:
+            values["occurred_at"] = _utc(occurred_at)
+        self._update(entry, **values)
+        _invalidate_overview(user_id, entry.kind)
+        return _serialize(entry)
+
+    def delete_event(self, user_id: str, *, event_id: str) -> bool:
+        """See crud.delete_event."""
+        entry = self._event(user_id, event_id)
+        if entry is None:
+            return False
+        self._delete(entry)
+        _invalidate_overview(user_id, entry.kind)
+        return True
+
+    def _page(self, rows: list[tuple[datetime, uuid.UUID]], *, limit: int, cursor: Optional[str]) -> dict:
+        """Page (sort_at, id) rows sorted newest-first, with crud._keyset_page's cursors."""
+        if cursor:
+            last_at, last_id = _decode_cursor(cursor, 2)
+            try:
+                after = (_utc(datetime.fromisoformat(last_at)), uuid.UUID(last_id))
+            except (TypeError, ValueError):
+                raise ValueError("Invalid cursor") from None
+            rows = [row for row in rows if row < after]
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit and page:
+            last_at, last_id = page[-1]
+            next_cursor = _encode_cursor([last_at.isoformat(), str(last_id)])
+        return {"items": [_serialize(self._entries[entry_id]) for _, entry_id in page], "next_cursor": next_cursor}
+
+    # ------------------------------------------------------------------
+    # Search and export
+    # ------------------------------------------------------------------
+
+    def search_entries_page(self, user_id: str, *, query: str, kind: Optional[str] = None, limit: int = 20,
+                            cursor: Optional[str] = None, recency_half_life_days: Optional[float] = None) -> dict:
+        """See crud.search_entries_page; every query word must match, scored by occurrences."""
+        after = _decode_search_cursor(cursor) if cursor else None
+        reference_time = _utc(after[3]) if after else _now()
+
+        terms = set(_words(query or ''))
+        if query and not terms:
+            return {"items": [], "next_cursor": None}
+        if terms:
+            postings = [self._postings.get(term, {}) for term in terms]
+            matched = set.intersection(*(set(p) for p in postings))
+            scores = {entry_id: float(sum(p[entry_id] for p in postings)) for entry_id in matched}
+        else:
+            scores = {entry.id: 0.0 for entry in self._user_entries(user_id)}
+
+        rows = []
+        for entry_id, score in scores.items():
+            entry = self._entries[entry_id]
+            if entry.user_id != user_id or (kind and entry.kind != kind):
+                continue
+            recency = _activity_time(entry)
+            if recency_half_life_days:
+                age_days = max((reference_time - recency).total_seconds() / 86400.0, 0.0)
+                score *= 0.5 ** (age_days / recency_half_life_days)
+            rows.append((score, recency, entry_id))
+        rows.sort(reverse=True)
+
+        if after:
+            last = (after[0], _utc(after[1]), after[2])
+            rows = [row for row in rows if row < last]
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit and page:
+            score, recency, entry_id = page[-1]
+            next_cursor = _encode_cursor([score, recency.isoformat(), str(entry_id), reference_time.isoformat()])
+        return {"items": [_serialize(self._entries[entry_id]) for _, _, entry_id in page], "next_cursor": next_cursor}
+
+    def export_entries(self, user_id: str, *, kind: Optional[str] = None, batch_size: int = 0) -> Iterator[dict]:
+        """See crud.export_entries (batch_size is accepted for compatibility and ignored)."""
+        entries = [entry for entry in self._user_entries(user_id) if not kind or entry.kind == kind]
+        for entry in sorted(entries, key=lambda entry: (entry.created_at, entry.id)):
+            yield _serialize(entry)
+
+    def list_changes(self, user_id: str, *, since: Optional[str] = None, limit: int = 500) -> dict:
+        """See crud.list_changes; the store never prunes tombstones, so tokens never reset."""
+        after, _ = _change_token(since)
+        feed: list[tuple[int, Any]] = [
+            (entry.change_seq, entry) for entry in self._user_entries(user_id) if entry.change_seq > after
+        ]
+        feed += [(tombstone[0], tombstone) for tombstone in self._tombstones.get(user_id, []) if tombstone[0] > after]
+        feed.sort(key=lambda change: change[0])
+        page = feed[:limit]
+        return {
+            "changed": [_serialize(row) for _, row in page if isinstance(row, MemoryEntry)],
+            "deleted": [
+                {"id": str(row[1]), "kind": row[2], "key": row[3]} for _, row in page if not isinstance(row, MemoryEntry)
+            ],
+            "next_token": _encode_cursor([page[-1][0] if page else after, 0]),
+            "has_more": len(feed) > limit,
+            "reset": False,
+        }
+
+    # ------------------------------------------------------------------
+    # Metric time series
+    # ------------------------------------------------------------------
+
+    def _metric_points(self, user_id: str, metric: str, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> list[tuple[datetime, uuid.UUID, float, Optional[str]]]:
+        points = self._points.get((user_id, normalize_metric_name(metric)), [])
+        low = bisect_left(points, (_utc(start),)) if start else 0
+        high = bisect_right(points, (_utc(end), uuid.UUID(int=(1 << 128) - 1))) if end else len(points)
+        return points[low:high]
+
+    def latest_metric(self, user_id: str, *, metric: str) -> Optional[dict]:
+        """See crud.latest_metric."""
+        points = self._metric_points(user_id, metric)
+        if not points:
+            return None
+        occurred_at, _, value, unit = points[-1]
+        return {"metric": normalize_metric_name(metric), "value": value, "unit": unit, "occurred_at": occurred_at.isoformat()}
+
+    def metric_range(self, user_id: str, *, metric: str, start: Optional[datetime] = None,
+                     end: Optional[datetime] = None) -> dict:
+        """See crud.metric_range."""
+        groups: dict[Optional[str], _UnitGroup] = {}
+        for occurred_at, _, value, unit in self._metric_points(user_id, metric, start, end):
+            group = groups.get(unit)
+            if group is None:
+                groups[unit] = _UnitGroup(unit, 1, value, value, value, occurred_at, occurred_at, value, value)
+            else:
+                groups[unit] = group._replace(count=group.count + 1, min=min(group.min, value), max=max(group.max, value),
+                                              total=group.total + value, end=occurred_at, last=value)
+        return _metric_summary(metric, list(groups.values()))
+
+    def metric_series(self, user_id: str, *, metric: str, bucket: str = 'week', start: Optional[datetime] = None,
+                      end: Optional[datetime] = None) -> list[dict]:
+        """See crud.metric_series."""
+        if bucket not in _METRIC_BUCKETS:
+            raise ValueError(f"Invalid bucket '{bucket}' (use {', '.join(_METRIC_BUCKETS)})")
+        groups: dict[tuple[str, Optional[str]], _BucketGroup] = {}
+        for occurred_at, _, value, unit in self._metric_points(user_id, metric, start, end):
+            day = occurred_at.date()
+            if bucket == 'week':
+                day -= timedelta(days=day.weekday())
+            elif bucket == 'month':
+                day = day.replace(day=1)
+            group = groups.get((day.isoformat(), unit))
+            if group is None:
+                groups[(day.isoformat(), unit)] = _BucketGroup(day.isoformat(), unit, 1, value, value, value, occurred_at)
+            else:
+                groups[(day.isoformat(), unit)] = group._replace(
+                    count=group.count + 1, min=min(group.min, value), max=max(group.max, value),
+                    total=group.total + value, end=occurred_at)
+        return _metric_series_rows(list(groups.values()))
+
+    # ------------------------------------------------------------------
+    # Overview
+    # ------------------------------------------------------------------
+
+    def _build_overview(self, user_id: str, *, truncate_words: int, context: Optional[str]) -> dict:
+        """See crud._build_overview: the same rows as _overview_stmt, picked in Python."""
+        limits = _overview_section_limits(context)
+        kinds = _OVERVIEW_CONTEXT_KINDS.get(context) if context else None
+        by_kind: dict[str, list[MemoryEntry]] = defaultdict(list)
+        for entry in self._user_entries(user_id):
+            if entry.kind not in _OVERVIEW_SECTION_KINDS or entry.status == 'archived':
+                continue
+            if kinds is not None and entry.kind not in kinds:
+                continue
+            if entry.kind == 'strategy' and (entry.key or '').lower() not in _OVERVIEW_STRATEGY_KEYS:
+                continue
+            by_kind[entry.kind].append(entry)
+
+        entries = []
+        for kind, rows in by_kind.items():
+            if kind in limits:
+                # Same per-kind ranking as the ROW_NUMBER() in _overview_stmt
+                rows.sort(key=lambda entry: entry.occurred_at or entry.created_at, reverse=True)
+                if kind == 'plan':
+                    rows.sort(key=lambda entry: entry.key, reverse=True)
+                rows = rows[:limits[kind]]
+            entries.extend(rows)
+        history = None
+        if context == 'history':
+            history = _history_section(self._rollups(user_id))
+        return _assemble_overview(entries, limits, truncate_words=truncate_words, history=history)
+
+    def _rollups(self, user_id: str) -> Iterator[tuple[str, Any, dict[str, Any]]]:
+        """The history_rollups rows for a user, computed from scratch (the store keeps no table)."""
+        logs = [
+            (entry.key, entry.occurred_at or entry.created_at)
+            for entry in self._user_entries(user_id) if entry.kind == 'log' and entry.status != 'archived'
+        ]
+        points = [
+            (name, occurred_at, value, unit)
+            for (uid, name), readings in self._points.items() if uid == user_id
+            for occurred_at, _, value, unit in readings
+        ]
+        for (period, start), rollup in _aggregate_rollups(logs, points).items():
+            yield period, start, rollup
@@ -0,0 +1,109 @@
+"""Extraction of numeric readings from free-text metric entries.
+
+Metrics are logged as natural text ('Weight: 71kg', 'Bodyweight: 180 lbs, 15%
+bodyfat', 'HRV 65ms'). parse_metrics pulls (metric_name, value, unit) triples out
+of that text at write time so crud can store them in metric_points, where trends
+are answered by an index range scan instead of re-reading every metric string.
+
+Parsing is deliberately conservative: content is split into comma, semicolon and
+newline separated segments (a comma between digits, as in '1,234', does not split),
+and a segment only yields a reading when it has one of three shapes:
+
+    name: value [unit]     'Weight: 71kg', 'Resting HR = 52 bpm (morning)'
+    name value [unit]      'HRV 65ms' (whole segment)
+    value [unit] name      '15% bodyfat' (whole segment)
+
+The value and unit must end the segment, save for a parenthetical and closing
+punctuation. Anything else (e.g. 'Squat 5x5 @ 100kg', 'Blood pressure: 120/80',
+'Weight: 1,234kg') is ignored rather than guessed at.
+
+Readings of one metric may come in different units ('71kg', '156 lbs');
+unit_factor converts between units of the same dimension so aggregates can be
+taken in one unit.
+"""
+
+from typing import Optional
+import re
+
+# Canonical spelling for common unit variants; unlisted units are kept lowercased
+_UNIT_ALIASES = {
+    'kgs': 'kg', 'kilos': 'kg',
+    'lb': 'lbs', 'pounds': 'lbs',
+    'hr': 'h', 'hrs': 'h', 'hour': 'h', 'hours': 'h',
+    'mins': 'min', 'minute': 'min', 'minutes': 'min',
+    'sec': 's', 'secs': 's', 'second': 's', 'seconds': 's',
+    'mile': 'mi', 'miles': 'mi',
+    'kcals': 'kcal', 'cals': 'cal',
+}
+_UNITS = sorted(
+    {'kg', 'lbs', 'g', '%', 'bpm', 'ms', 'h', 'min', 's', 'km', 'mi', 'm', 'cm', 'kcal', 'cal', 'w'}
+    | set(_UNIT_ALIASES),
+    key=len,
+    reverse=True,
+)
+
+_NAME = r"(?P<name>[A-Za-z][A-Za-z0-9 _\-]*?)"
+_VALUE = r"(?P<value>[-+]?\d+(?:\.\d+)?)"
+_UNIT = r"(?:\s*(?P<unit>" + '|'.join(re.escape(u) for u in _UNITS) + r")(?![A-Za-z]))?"
+
+# What may follow a reading: '(morning)', a full stop, nothing else
+_END = r"\s*(?:\([^()]*\))?\s*[.!]?\s*$"
+
+_PATTERNS = (
+    re.compile(rf"\s*{_NAME}\s*[:=]\s*{_VALUE}{_UNIT}{_END}", re.IGNORECASE),
+    re.compile(rf"\s*{_NAME}\s+{_VALUE}{_UNIT}{_END}", re.IGNORECASE),
+    re.compile(rf"\s*{_VALUE}{_UNIT}\s+{_NAME}\s*$", re.IGNORECASE),
+)
+
+# Segment breaks: semicolons, newlines and commas other than thousands separators
+_SEGMENT_SPLIT = re.compile(r"[;\n]|(?<!\d),|,(?!\d{3}(?!\d))")
+
+# Convertible units as (dimension, size in the dimension's base unit)
+_UNIT_SCALES = {
+    'kg': ('mass', 1.0), 'lbs': ('mass', 0.45359237),
+    'm': ('length', 1.0), 'cm': ('length', 0.01), 'km': ('length', 1000.0), 'mi': ('length', 1609.344),
+    's': ('time', 1.0), 'ms': ('time', 0.001), 'min': ('time', 60.0), 'h': ('time', 3600.0),
+}
+
+
+def normalize_metric_name(name: str) -> str:
+    """'Resting HR' -> 'resting_hr', so spellings of one metric share a series."""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def _normalize_unit(unit: Optional[str]) -> Optional[str]:
+    if not unit:
+        return None
+    unit = unit.lower()
+    return _UNIT_ALIASES.get(unit, unit)
+
+
+def unit_factor(unit: Optional[str], to_unit: Optional[str]) -> Optional[float]:
+    """Multiplier taking a reading in `unit` to `to_unit`, or None if they don't convert.
+
+    Equal units (including both None) convert with 1; 'g' is left out of the scales
+    because grams of protein and kilograms of bodyweight are never one metric.
+    """
+    if unit == to_unit:
+        return 1.0
+    source, target = _UNIT_SCALES.get(unit or ''), _UNIT_SCALES.get(to_unit or '')
+    if source is None or target is None or source[0] != target[0]:
+        return None
+    return source[1] / target[1]
+
+
+def parse_metrics(content: str) -> list[tuple[str, float, Optional[str]]]:
+    """Return the (metric_name, value, unit) readings found in content.
+
+    A metric named twice in one entry keeps its last reading.
+    """
+    readings: dict[str, tuple[str, float, Optional[str]]] = {}
+    for segment in _SEGMENT_SPLIT.split(content or ''):
+        for pattern in _PATTERNS:
+            match = pattern.match(segment)
+            if match:
+                name = normalize_metric_name(match['name'])
+                if name:
+                    readings[name] = (name, float(match['value']), _normalize_unit(match['unit']))
+                break
+    return list(readings.values())
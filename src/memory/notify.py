@@ -0,0 +1,156 @@
+"""Cross-process cache invalidation over Postgres LISTEN/NOTIFY.
+
+Each server process caches overviews in memory (cache.overview_cache), and crud
+only invalidates them for the process's own writes. migrations/011_entries_notify.sql
+makes every statement that changes entries NOTIFY the entries_changed channel with
+{"user_id", "kind", "key"} per (user, kind) it touched. A ChangeListener keeps a
+dedicated connection LISTENing on that channel in a background thread and drops
+the matching local state as notifications arrive.
+
+Notifications sent while the listener is not connected are lost for good, so
+the cache is paused (every lookup a miss) from the moment the connection drops
+until it is back and LISTENing, and flushed on every (re)connect. Reads stay off
+read replicas over the same stretch, plus the read-your-writes window after it, and
+for that window after every user's notified write.
+
+Transaction-mode poolers (e.g. Supabase on port 6543) accept LISTEN but never
+deliver notifications: set DATABASE_LISTEN_URL to a direct or session-mode
+connection string when DATABASE_URL goes through one.
+"""
+
+from threading import Event, Thread
+from time import monotonic
+from typing import Callable, NamedTuple, Optional
+import json
+import os
+
+import logfire
+import psycopg
+
+from .cache import overview_cache, recent_writes
+from .crud import _invalidate_overview
+from .db import DATABASE_URL, IS_SQLITE
+
+CHANNEL = "entries_changed"
+
+
+class Change(NamedTuple):
+    """One notification: entries of this user and kind changed (key is None if several did)."""
+
+    user_id: str
+    kind: str
+    key: Optional[str]
+
+
+# Handlers get a Change, or None when everything local must be dropped
+ChangeHandler = Callable[[Optional[Change]], None]
+
+
+class ChangeListener:
+    """Background thread applying entries_changed notifications to local caches.
+
+    The overview cache is always kept in step; add_handler registers further read
+    models. Handlers run on the listener thread and must be quick and thread-safe.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        *,
+        poll_interval: float = 1.0,
+        heartbeat_interval: float = 30.0,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.url = url
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = Event()
+        self.backend_pid: Optional[int] = None
+        self.notifications = 0
+        self.reconnects = 0
+        self._handlers: list[ChangeHandler] = []
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def add_handler(self, handler: ChangeHandler) -> None:
+        self._handlers.append(handler)
+
+    def start(self) -> "ChangeListener":
+        """Start listening; the cache stays paused until the first connection is up."""
+        overview_cache.pause()
+        recent_writes.mark_all(float('inf'))
+        self._stop.clear()
+        self._thread = Thread(target=self._run, name="entries-change-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop listening; the cache goes back to tracking this process's writes only."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        overview_cache.resume()
+        recent_writes.mark_all()
+
+    def _flush(self) -> None:
+        overview_cache.clear()
+        recent_writes.mark_all()
+        for handler in self._handlers:
+            handler(None)
+
+    def _apply(self, payload: str) -> None:
+        self.notifications += 1
+        try:
+            change = Change(**json.loads(payload))
+        except (TypeError, ValueError):
+            logfire.warn('unreadable change notification, flushing local caches', payload=payload)
+            self._flush()
+            return
+        _invalidate_overview(change.user_id, change.kind)
+        for handler in self._handlers:
+            handler(change)
+
+    def _run(self) -> None:
+        delay = self.reconnect_delay
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.url, autocommit=True, connect_timeout=10) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    # Anything may have changed while nobody was listening
+                    self._flush()
+                    overview_cache.resume()
+                    self.backend_pid = conn.info.backend_pid
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    logfire.info('change listener connected', backend_pid=self.backend_pid)
+                    beat = monotonic()
+                    while not self._stop.is_set():
+                        for notify in conn.notifies(timeout=self.poll_interval):
+                            self._apply(notify.payload)
+                        if monotonic() - beat >= self.heartbeat_interval:
+                            # A silently dropped connection only surfaces when used
+                            conn.execute("SELECT 1")
+                            beat = monotonic()
+            except (psycopg.Error, OSError) as exc:
+                logfire.warn('change listener disconnected', error=str(exc))
+            finally:
+                self.connected.clear()
+            if self._stop.is_set():
+                break
+            overview_cache.pause()
+            recent_writes.mark_all(float('inf'))
+            self.reconnects += 1
+            self._stop.wait(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+
+def start_change_listener() -> Optional[ChangeListener]:
+    """Start this process's listener, unless on SQLite (one process) or CACHE_LISTEN=false."""
+    if IS_SQLITE or os.getenv("CACHE_LISTEN", "true").lower() == "false":
+        return None
+    url = os.getenv("DATABASE_LISTEN_URL") or DATABASE_URL.replace("postgresql+psycopg://", "postgresql://")
+    return ChangeListener(url).start()
@@ -0,0 +1,128 @@
+"""Connection pools that measure their own checkouts.
+
+InstrumentedQueuePool (sync engines) and InstrumentedAsyncPool (async engines) time
+every checkout, i.e. how long a caller waited for a connection, and count checkouts
+that gave up after pool_timeout. Engines registered here report size, in-use and
+overflow counts alongside those timings through pool_stats() and as logfire metrics,
+so the DATABASE_POOL_* settings can be sized from what the pool actually saw.
+"""
+
+from threading import Lock
+from time import perf_counter
+from typing import Any
+
+import logfire
+from opentelemetry.metrics import CallbackOptions, Observation
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Checkouts waiting at least this long are logged: the pool is too small for the load
+SLOW_CHECKOUT_SECONDS = 0.1
+
+_checkout_wait = logfire.metric_histogram(
+    'db.pool.checkout_wait', unit='ms', description='Time spent waiting for a pooled connection'
+)
+
+
+class PoolStats:
+    """Thread-safe checkout counters and wait times for one pool."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, *, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(1000 * self.wait_total / self.checkouts, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(1000 * self.wait_max, 3),
+            }
+
+
+class _InstrumentedPool:
+    """Mixin over a QueuePool timing _do_get, the step that queues when the pool is exhausted."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.stats.record(perf_counter() - started, timed_out=True)
+            logfire.warn('database pool checkout timed out', pool=self.status())
+            raise
+        wait = perf_counter() - started
+        self.stats.record(wait)
+        _checkout_wait.record(1000 * wait)
+        if wait >= SLOW_CHECKOUT_SECONDS:
+            logfire.info('slow database pool checkout', wait_ms=round(1000 * wait, 1), pool=self.status())
+        return record
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    pass
+
+
+class InstrumentedAsyncPool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    pass
+
+
+# Engines by name ('primary', 'replica-1', 'async-primary', ...); engine.pool is looked
+# up on every read because dispose() swaps in a fresh pool
+_engines: dict[str, Any] = {}
+
+
+def register(name: str, engine) -> None:
+    """Report engine's pool under name in pool_stats() and the pool gauges."""
+    _engines[name] = engine.sync_engine if hasattr(engine, 'sync_engine') else engine
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    """Size, occupancy and checkout timings of every registered pool that is instrumented."""
+    stats = {}
+    for name, engine in _engines.items():
+        pool = engine.pool
+        if not isinstance(pool, _InstrumentedPool):
+            continue
+        stats[name] = {
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            # Connections open beyond size; negative while the pool is still filling up
+            'overflow': pool.overflow(),
+            **pool.stats.snapshot(),
+        }
+    return stats
+
+
+def _observe(field: str):
+    def callback(options: CallbackOptions):
+        return [Observation(stats[field], {'pool': name}) for name, stats in pool_stats().items()]
+    return callback
+
+
+logfire.metric_gauge_callback(
+    'db.pool.in_use', [_observe('in_use')], unit='1', description='Connections checked out of the pool'
+)
+logfire.metric_gauge_callback(
+    'db.pool.overflow', [_observe('overflow')], unit='1', description='Connections open beyond pool_size'
+)
@@ -20,7 +20,33 @@ sys.path.insert(0, str(SRC_PATH))
 
 load_dotenv()
 
-from src.memory.db import SessionLocal, Entry
+# Backend for session_and_user: the configured database, or the in-memory store
+BACKEND_CHOICES = ("database", "memory")
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    parser.addoption(
+        "--backend",
+        choices=BACKEND_CHOICES,
+        default=os.getenv("FITNESS_TEST_BACKEND", "database"),
+        help="storage backend for crud tests (default: FITNESS_TEST_BACKEND or 'database')",
+    )
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    config.addinivalue_line("markers", "database: needs a real database; skipped with --backend memory")
+    if config.getoption("backend") == "memory":
+        # crud still builds an engine on import; an in-memory SQLite one is never used
+        os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+def pytest_collection_modifyitems(config: pytest.Config, items: list[pytest.Item]) -> None:
+    if config.getoption("backend") != "memory":
+        return
+    skip = pytest.mark.skip(reason="needs a real database (--backend database)")
+    for item in items:
+        if "database" in item.keywords:
+            item.add_marker(skip)
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -33,25 +59,43 @@ def load_environment() -> None:
 
 
 @pytest.fixture
-def session_and_user() -> Iterator[Tuple[Session, str]]:
-    """Provide a DB session and unique user id, cleaning up afterwards."""
+def session_and_user(request: pytest.FixtureRequest) -> Iterator[Tuple[Session, str]]:
+    """Provide a DB session (or a fresh MemoryStore) and unique user id, cleaning up afterwards."""
     user_id = f"test-user-{uuid.uuid4()}"
+    if request.config.getoption("backend") == "memory":
+        from src.memory.memory_store import MemoryStore
+
+        yield MemoryStore(), user_id
+        return
+
+    from src.memory.db import SessionLocal, ChangeFeedHorizon, Entry, EntryTombstone, HistoryRollup
+
     with SessionLocal() as session:
         try:
             yield session, user_id
         finally:
             with SessionLocal() as cleanup:
                 cleanup.execute(delete(Entry).where(Entry.user_id == user_id))
+                cleanup.execute(delete(HistoryRollup).where(HistoryRollup.user_id == user_id))
+                cleanup.execute(delete(EntryTombstone).where(EntryTombstone.user_id == user_id))
+                cleanup.execute(delete(ChangeFeedHorizon).where(ChangeFeedHorizon.user_id == user_id))
                 cleanup.commit()
 
 
 @pytest.fixture(scope="session")
-def cleanup_entries() -> Callable[[str], None]:
-    """Return a helper that deletes all entries for a user id."""
+def cleanup_entries(request: pytest.FixtureRequest) -> Callable[[str], None]:
+    """Return a helper that deletes all entries and rollups for a user id (a no-op for in-memory stores)."""
+    if request.config.getoption("backend") == "memory":
+        return lambda user_id: None
+
+    from src.memory.db import SessionLocal, ChangeFeedHorizon, Entry, EntryTombstone, HistoryRollup
 
     def _cleanup(user_id: str) -> None:
         with SessionLocal() as session:
             session.execute(delete(Entry).where(Entry.user_id == user_id))
+            session.execute(delete(HistoryRollup).where(HistoryRollup.user_id == user_id))
+            session.execute(delete(EntryTombstone).where(EntryTombstone.user_id == user_id))
+            session.execute(delete(ChangeFeedHorizon).where(ChangeFeedHorizon.user_id == user_id))
             session.commit()
 
     return _cleanup
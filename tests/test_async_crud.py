@@ -0,0 +1,105 @@
+"""Tests for the async crud counterparts over the async engine."""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Tuple
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.memory import async_crud
+from src.memory.async_db import AsyncSessionLocal, async_engine
+from src.memory.db import Entry
+
+# The async layer drives crud over AsyncSession.run_sync, which needs a real engine
+pytestmark = pytest.mark.database
+
+
+@pytest_asyncio.fixture
+async def async_session_and_user() -> AsyncIterator[Tuple[AsyncSession, str]]:
+    """Provide an async session and unique user id, cleaning up afterwards."""
+    user_id = f"test-user-{uuid.uuid4()}"
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session, user_id
+        finally:
+            async with AsyncSessionLocal() as cleanup:
+                await cleanup.execute(delete(Entry).where(Entry.user_id == user_id))
+                await cleanup.commit()
+    # Pooled connections are bound to this test's event loop
+    await async_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_async_upsert_and_get(async_session_and_user: Tuple[AsyncSession, str]):
+    """Test async upsert followed by async fetch."""
+    session, user_id = async_session_and_user
+
+    created = await async_crud.upsert_item(
+        session, user_id,
+        kind='goal', key='bench-225', content='Bench 225x5 by June.'
+    )
+    fetched = await async_crud.get_item(session, user_id, kind='goal', key='bench-225')
+
+    assert fetched is not None
+    assert fetched['id'] == created['id']
+    assert 'June' in fetched['content']
+
+
+@pytest.mark.asyncio
+async def test_async_events_and_overview(async_session_and_user: Tuple[AsyncSession, str]):
+    """Test async event logging, listing and overview."""
+    session, user_id = async_session_and_user
+
+    base_date = datetime.now() - timedelta(days=3)
+    for i in range(3):
+        await async_crud.log_event(
+            session, user_id,
+            kind='log',
+            content=f'Workout {i}',
+            occurred_at=base_date + timedelta(days=i)
+        )
+
+    events = await async_crud.list_events(session, user_id, kind='log')
+    assert [e['content'] for e in events] == ['Workout 2', 'Workout 1', 'Workout 0']
+
+    overview = await async_crud.get_overview(session, user_id, context='upcoming')
+    assert len(overview['recent_logs']) == 3
+
+
+@pytest.mark.asyncio
+async def test_async_concurrent_sessions(async_session_and_user: Tuple[AsyncSession, str]):
+    """Test many concurrent tool-style calls on separate async sessions."""
+    _, user_id = async_session_and_user
+
+    async def _write(i: int) -> dict:
+        async with AsyncSessionLocal() as session:
+            return await async_crud.upsert_item(
+                session, user_id,
+                kind='knowledge', key=f'note-{i}', content=f'Knowledge {i}'
+            )
+
+    results = await asyncio.gather(*[_write(i) for i in range(10)])
+    assert len({r['id'] for r in results}) == 10
+
+    async with AsyncSessionLocal() as session:
+        items = await async_crud.list_items(session, user_id, kind='knowledge')
+    assert len(items) == 10
+
+
+@pytest.mark.asyncio
+async def test_async_export_entries(async_session_and_user: Tuple[AsyncSession, str]):
+    """Test async export streams every entry."""
+    session, user_id = async_session_and_user
+
+    for i in range(3):
+        await async_crud.log_event(session, user_id, kind='log', content=f'Workout {i}')
+
+    exported = [e async for e in async_crud.export_entries(session, user_id, batch_size=2)]
+
+    assert [e['content'] for e in exported] == ['Workout 0', 'Workout 1', 'Workout 2']
@@ -0,0 +1,86 @@
+"""Tests for the COPY-based bulk import."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+from sqlalchemy.orm import Session
+
+from src.memory.bulk_import import import_entries, read_records
+from src.memory.crud import get_item, get_overview, list_events, list_items, upsert_item
+
+
+@pytest.mark.database
+def test_import_entries_merges_items_and_events(session_and_user: Tuple[Session, str]):
+    """Test one import creates, updates, dedupes keys and keeps event timestamps."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5')
+
+    result = import_entries(session, user_id, [
+        {'kind': 'goal', 'key': 'bench-225', 'content': 'Bench 225x5 by June'},
+        {'kind': 'knowledge', 'key': 'knee-health', 'content': 'First draft'},
+        {'kind': 'knowledge', 'key': 'knee-health', 'content': 'Final draft', 'status': 'archived'},
+        {'kind': 'log', 'content': 'Squat 5x5 @ 100kg', 'occurred_at': '2022-03-01T07:00:00+00:00'},
+        {'kind': 'log', 'content': 'Squat 5x5 @ 100kg', 'occurred_at': '2022-03-03T07:00:00+00:00'},
+    ])
+
+    assert result == {'created': 1, 'updated': 1, 'events': 2}
+    assert get_item(session, user_id, kind='goal', key='bench-225')['content'] == 'Bench 225x5 by June'
+    knee = get_item(session, user_id, kind='knowledge', key='knee-health')
+    assert knee['content'] == 'Final draft'
+    assert knee['status'] == 'archived'
+    logs = list_events(session, user_id, kind='log')
+    assert [e['occurred_at'][:10] for e in logs] == ['2022-03-03', '2022-03-01']
+
+
+@pytest.mark.database
+def test_import_entries_keeps_dates_of_keyed_logs(session_and_user: Tuple[Session, str]):
+    """Test a dated keyed log keeps its occurred_at, and re-importing it without one keeps it too."""
+    session, user_id = session_and_user
+
+    import_entries(session, user_id, [
+        {'kind': 'log', 'key': 'squat-day', 'content': 'Squat 5x5 @ 100kg', 'occurred_at': '2022-03-01T07:00:00+00:00'},
+        {'kind': 'goal', 'key': 'bench-225', 'content': 'Bench 225x5'},
+    ])
+    log = get_item(session, user_id, kind='log', key='squat-day')
+    assert log['occurred_at'][:19] == '2022-03-01T07:00:00'
+    assert get_item(session, user_id, kind='goal', key='bench-225')['occurred_at'] is None
+
+    import_entries(session, user_id, [{'kind': 'log', 'key': 'squat-day', 'content': 'Squat 5x5 @ 102.5kg'}])
+    log = get_item(session, user_id, kind='log', key='squat-day')
+    assert (log['content'], log['occurred_at'][:10]) == ('Squat 5x5 @ 102.5kg', '2022-03-01')
+
+    months = {m['start']: m for m in get_overview(session, user_id, context='history')['history']['months']}
+    assert months['2022-03-01']['sessions'] == 1
+
+
+@pytest.mark.database
+def test_import_entries_rejects_bad_records(session_and_user: Tuple[Session, str]):
+    """Test a bad record aborts the whole import and leaves the session usable."""
+    session, user_id = session_and_user
+
+    with pytest.raises(ValueError):
+        import_entries(session, user_id, [
+            {'kind': 'goal', 'key': 'bench-225', 'content': 'Bench'},
+            {'kind': 'goal', 'key': 'squat-315'},
+        ])
+
+    assert list_items(session, user_id, kind='goal') == []
+
+
+def test_read_records_csv_and_ndjson(tmp_path: Path):
+    """Test both file formats yield records, with empty CSV cells dropped."""
+    csv_path = tmp_path / 'history.csv'
+    csv_path.write_text('kind,key,content,occurred_at\nlog,,"Run 5k, easy",2021-06-01\ngoal,sub-20,Sub-20 5k,\n')
+    ndjson_path = tmp_path / 'history.ndjson'
+    ndjson_path.write_text(json.dumps({'kind': 'log', 'content': 'Run 5k'}) + '\n\n')
+
+    assert list(read_records(csv_path)) == [
+        {'kind': 'log', 'content': 'Run 5k, easy', 'occurred_at': '2021-06-01'},
+        {'kind': 'goal', 'key': 'sub-20', 'content': 'Sub-20 5k'},
+    ]
+    assert list(read_records(ndjson_path)) == [{'kind': 'log', 'content': 'Run 5k'}]
@@ -2,24 +2,55 @@
 
 from __future__ import annotations
 
-from datetime import datetime, timedelta
-from typing import Tuple
+from contextlib import contextmanager
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterator, Tuple
 
 import pytest
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
+from src.memory.db import IS_SQLITE
 from src.memory.crud import (
     upsert_item,
+    bulk_upsert_items,
+    archive_items,
     get_item,
     get_items_by_keys,
     list_items,
+    list_items_page,
     delete_item,
+    delete_event,
+    export_entries,
+    list_changes,
     log_event,
+    prune_tombstones,
     list_events,
+    list_events_page,
     search_entries,
+    search_entries_page,
+    update_event,
+    _encode_cursor,
 )
 
 
+@contextmanager
+def count_statements(session: Session) -> Iterator[list[str]]:
+    """Record the SQL statements executed on the session's engine."""
+    statements: list[str] = []
+    engine = session.get_bind()
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+
 def test_upsert_item_create(session_and_user: Tuple[Session, str]):
     """Test creating a new item with upsert."""
     session, user_id = session_and_user
@@ -101,6 +132,54 @@ def test_upsert_item_rename(session_and_user: Tuple[Session, str]):
     assert old_item is None
 
 
+def test_upsert_item_rename_conflict(session_and_user: Tuple[Session, str]):
+    """Test renaming onto an existing key raises and leaves both items intact."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-old', content='Old.')
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='New.')
+
+    with pytest.raises(ValueError):
+        upsert_item(session, user_id, kind='goal', key='bench-225', old_key='bench-old', content='Renamed.')
+
+    assert get_item(session, user_id, kind='goal', key='bench-old')['content'] == 'Old.'
+    assert get_item(session, user_id, kind='goal', key='bench-225')['content'] == 'New.'
+
+
+@pytest.mark.database
+def test_writes_use_single_statement(session_and_user: Tuple[Session, str]):
+    """Test every write returns its row from the write statement itself."""
+    session, user_id = session_and_user
+
+    with count_statements(session) as statements:
+        created = upsert_item(session, user_id, kind='goal', key='bench-old', content='Bench.')
+    assert len(statements) == 1
+    assert 'RETURNING' in statements[0]
+
+    with count_statements(session) as statements:
+        updated = upsert_item(session, user_id, kind='goal', key='bench-old', content='Bench 225.')
+    assert len(statements) == 1
+    assert updated['id'] == created['id']
+    assert updated['updated_at'] is not None
+
+    with count_statements(session) as statements:
+        renamed = upsert_item(session, user_id, kind='goal', key='bench-225', old_key='bench-old', content='Bench 225x5.')
+    assert len(statements) == 1
+    assert renamed['id'] == created['id']
+    assert renamed['key'] == 'bench-225'
+
+    with count_statements(session) as statements:
+        event_row = log_event(session, user_id, kind='note', content='Knee tight.')
+    assert len(statements) == 1
+    assert event_row['created_at'] is not None
+
+    with count_statements(session) as statements:
+        edited = update_event(session, user_id, event_id=event_row['id'], content='Knee fine.')
+    assert len(statements) == 1
+    assert edited['content'] == 'Knee fine.'
+    assert edited['updated_at'] is not None
+
+
 def test_get_item(session_and_user: Tuple[Session, str]):
     """Test retrieving a specific item by kind and key."""
     session, user_id = session_and_user
@@ -154,6 +233,33 @@ def test_get_items_by_keys(session_and_user: Tuple[Session, str]):
     assert 'knee-health' in keys
 
 
+def test_get_items_by_keys_order_and_missing(session_and_user: Tuple[Session, str]):
+    """Test results follow request order and mark missing items."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench goal')
+    upsert_item(session, user_id, kind='knowledge', key='knee-health', content='Knee info')
+    upsert_item(session, f'{user_id}-other', kind='goal', key='squat-315', content='Other user')
+
+    results = get_items_by_keys(
+        session, user_id,
+        keys=[
+            ('knowledge', 'knee-health'),
+            ('goal', 'squat-315'),
+            ('goal', 'bench-225'),
+            ('knowledge', 'bench-225'),
+        ]
+    )
+
+    assert [r['key'] for r in results] == ['knee-health', 'squat-315', 'bench-225', 'bench-225']
+    assert 'missing' not in results[0]
+    assert results[1] == {'kind': 'goal', 'key': 'squat-315', 'missing': True}
+    assert results[2]['content'] == 'Bench goal'
+    assert results[3] == {'kind': 'knowledge', 'key': 'bench-225', 'missing': True}
+
+    delete_item(session, f'{user_id}-other', kind='goal', key='squat-315')
+
+
 def test_list_items_by_kind(session_and_user: Tuple[Session, str]):
     """Test listing items filtered by kind."""
     session, user_id = session_and_user
@@ -313,6 +419,205 @@ def test_list_events_date_filter(session_and_user: Tuple[Session, str]):
     assert len(results) == 3
 
 
+def test_list_events_page_cursor(session_and_user: Tuple[Session, str]):
+    """Test event pages walk newest-first without gaps, including same-timestamp ties."""
+    session, user_id = session_and_user
+
+    base_date = datetime.now() - timedelta(days=10)
+    for i in range(7):
+        # Pairs share an occurred_at so the id tiebreak is exercised
+        log_event(session, user_id, kind='log', content=f'Workout {i}', occurred_at=base_date + timedelta(days=i // 2))
+
+    seen: list[dict] = []
+    cursor = None
+    while True:
+        page = list_events_page(session, user_id, kind='log', limit=3, cursor=cursor)
+        seen.extend(page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert len({r['id'] for r in seen}) == 7
+    occurred = [r['occurred_at'] for r in seen]
+    assert occurred == sorted(occurred, reverse=True)
+    assert seen == list_events(session, user_id, kind='log')
+
+    with pytest.raises(ValueError):
+        list_events_page(session, user_id, kind='log', cursor='not-a-cursor')
+
+
+def test_list_items_page_cursor(session_and_user: Tuple[Session, str]):
+    """Test item pages return every item once, most recently changed first."""
+    session, user_id = session_and_user
+
+    for i in range(5):
+        upsert_item(session, user_id, kind='goal', key=f'goal-{i}', content=f'Goal {i}')
+    upsert_item(session, user_id, kind='goal', key='goal-0', content='Goal 0, revised')
+
+    first = list_items_page(session, user_id, kind='goal', limit=2)
+    assert first['items'][0]['key'] == 'goal-0'
+    second = list_items_page(session, user_id, kind='goal', limit=2, cursor=first['next_cursor'])
+    third = list_items_page(session, user_id, kind='goal', limit=2, cursor=second['next_cursor'])
+
+    keys = [r['key'] for page in (first, second, third) for r in page['items']]
+    assert sorted(keys) == [f'goal-{i}' for i in range(5)]
+    assert third['next_cursor'] is None
+
+
+def test_export_entries_streams_everything(session_and_user: Tuple[Session, str]):
+    """Test export yields every entry oldest-first across several fetch batches."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5')
+    for i in range(4):
+        log_event(session, user_id, kind='log', content=f'Workout {i}')
+
+    exported = list(export_entries(session, user_id, batch_size=2))
+
+    assert len(exported) == 5
+    assert exported[0]['key'] == 'bench-225'
+    assert [e['content'] for e in exported[1:]] == [f'Workout {i}' for i in range(4)]
+    assert [e['kind'] for e in export_entries(session, user_id, kind='goal')] == ['goal']
+
+
+def test_list_changes_since_token(session_and_user: Tuple[Session, str]):
+    """Test the change feed returns only writes and deletes after the token, in order."""
+    session, user_id = session_and_user
+
+    goal = upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225.')
+    event_row = log_event(session, user_id, kind='log', content='Squats.')
+    upsert_item(session, user_id, kind='plan', key='2025-10-27-upper', content='Bench 4x8.')
+
+    snapshot = list_changes(session, user_id)
+    assert [row['key'] for row in snapshot['changed']] == ['bench-225', None, '2025-10-27-upper']
+    assert snapshot['deleted'] == []
+    assert snapshot['has_more'] is False
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5.')
+    delete_event(session, user_id, event_id=event_row['id'])
+    archive_items(session, user_id, kind='plan')
+
+    delta = list_changes(session, user_id, since=snapshot['next_token'])
+    assert [(row['key'], row['content'], row['status']) for row in delta['changed']] == [
+        ('bench-225', 'Bench 225x5.', 'active'),
+        ('2025-10-27-upper', 'Bench 4x8.', 'archived'),
+    ]
+    assert delta['changed'][0]['id'] == goal['id']
+    assert delta['deleted'] == [{'id': event_row['id'], 'kind': 'log', 'key': None}]
+
+    caught_up = list_changes(session, user_id, since=delta['next_token'])
+    assert caught_up['changed'] == caught_up['deleted'] == []
+    assert caught_up['next_token'] == delta['next_token']
+
+    # Paging walks the same feed one change at a time
+    token, seen = None, []
+    while True:
+        page = list_changes(session, user_id, since=token, limit=1)
+        seen += [row['key'] for row in page['changed']] + [row['id'] for row in page['deleted']]
+        token = page['next_token']
+        if not page['has_more']:
+            break
+    assert seen == ['bench-225', event_row['id'], '2025-10-27-upper']
+    with pytest.raises(ValueError):
+        list_changes(session, user_id, since='not-a-token')
+
+
+@pytest.mark.database
+def test_list_changes_never_skips_overlapping_writes(session_and_user: Tuple[Session, str]):
+    """Test a write that commits while an earlier one is still open can't move the token past it."""
+    from src.memory.db import Entry, SessionLocal
+
+    session, user_id = session_and_user
+    token = list_changes(session, user_id)['next_token']
+    session.commit()
+
+    with SessionLocal() as first:
+        first.add(Entry(user_id=user_id, kind='goal', key='first', content='Open transaction.', status='active'))
+        first.flush()
+
+        # The second writer for the same user waits for the first to finish
+        def write_second() -> None:
+            with SessionLocal() as other:
+                upsert_item(other, user_id, kind='goal', key='second', content='Committed meanwhile.')
+
+        second = threading.Thread(target=write_second)
+        second.start()
+        second.join(0.5)
+        assert second.is_alive()
+        synced = list_changes(session, user_id, since=token)
+        session.commit()
+        assert synced['changed'] == [] and synced['next_token'] == token
+
+        first.commit()
+    second.join(10)
+    assert not second.is_alive()
+
+    delta = list_changes(session, user_id, since=token)
+    assert [row['key'] for row in delta['changed']] == ['first', 'second']
+
+
+@pytest.mark.database
+@pytest.mark.skipif(IS_SQLITE, reason="SQLite has a single writer")
+def test_writers_take_the_change_feed_lock_before_row_locks(session_and_user: Tuple[Session, str]):
+    """Test a writer queued behind an open transaction of the same user holds no row it will want."""
+    from sqlalchemy import update
+    from src.memory.db import Entry, SessionLocal
+
+    session, user_id = session_and_user
+    upsert_item(session, user_id, kind='goal', key='shared', content='v1')
+
+    with SessionLocal() as first:
+        first.add(Entry(user_id=user_id, kind='goal', key='first', content='Open transaction.', status='active'))
+        first.flush()
+
+        def write_second() -> None:
+            with SessionLocal() as other:
+                archive_items(other, user_id, kind='goal', key='shared')
+
+        second = threading.Thread(target=write_second)
+        second.start()
+        second.join(0.5)
+        assert second.is_alive()
+        # Had the second writer locked the row before the user, this would deadlock
+        first.execute(update(Entry).where(Entry.user_id == user_id, Entry.key == 'shared').values(content='v2'))
+        first.commit()
+    second.join(10)
+    assert not second.is_alive()
+    shared = get_item(session, user_id, kind='goal', key='shared')
+    assert (shared['content'], shared['status']) == ('v2', 'archived')
+
+
+@pytest.mark.database
+def test_list_changes_resets_tokens_older_than_pruned_tombstones(session_and_user: Tuple[Session, str]):
+    """Test pruning tombstones sends earlier tokens a fresh snapshot, and only those."""
+    session, user_id = session_and_user
+    for key in ('a', 'b', 'c'):
+        upsert_item(session, user_id, kind='goal', key=key, content=key)
+    old_token = list_changes(session, user_id)['next_token']
+    delete_item(session, user_id, kind='goal', key='b')
+    upsert_item(session, user_id, kind='goal', key='d', content='d')
+
+    assert prune_tombstones(session, datetime.now(timezone.utc) + timedelta(minutes=1), user_id) == 1
+
+    reset = list_changes(session, user_id, since=old_token)
+    assert reset['reset'] is True
+    assert [row['key'] for row in reset['changed']] == ['a', 'c', 'd'] and reset['deleted'] == []
+    assert list_changes(session, user_id, since=reset['next_token'])['reset'] is False
+
+    # Tokens handed out after the prune page through a snapshot below the horizon
+    token, seen = None, []
+    while True:
+        page = list_changes(session, user_id, since=token, limit=1)
+        assert page['reset'] is False
+        seen += [row['key'] for row in page['changed']]
+        token = page['next_token']
+        if not page['has_more']:
+            break
+    assert seen == ['a', 'c', 'd']
+    assert prune_tombstones(session, datetime.now(timezone.utc) + timedelta(minutes=1), user_id) == 0
+
+
+
 def test_search_entries(session_and_user: Tuple[Session, str]):
     """Test full-text search across entries."""
     session, user_id = session_and_user
@@ -375,7 +680,7 @@ def test_search_entries_no_results(session_and_user: Tuple[Session, str]):
     assert len(results) == 0
 
 
-def test_upsert_different_users_isolated(session_and_user: Tuple[Session, str]):
+def test_upsert_different_users_isolated(session_and_user: Tuple[Session, str], cleanup_entries: Callable[[str], None]):
     """Test that different users' data is isolated."""
     session, user_id = session_and_user
 
@@ -394,7 +699,190 @@ def test_upsert_different_users_isolated(session_and_user: Tuple[Session, str]):
     assert 'User 2' in result2['content']
 
     # Clean up other user
-    from sqlalchemy import delete
-    from src.memory.db import Entry
-    session.execute(delete(Entry).where(Entry.user_id == other_user_id))
-    session.commit()
+    cleanup_entries(other_user_id)
+
+
+@pytest.mark.database
+def test_bulk_upsert_items(session_and_user: Tuple[Session, str]):
+    """Test bulk upsert creates, updates and logs events in one statement."""
+    session, user_id = session_and_user
+
+    existing = upsert_item(session, user_id, kind='plan', key='2025-10-27-upper', content='Draft.')
+
+    with count_statements(session) as statements:
+        results = bulk_upsert_items(
+            session, user_id,
+            items=[
+                {'kind': 'plan', 'key': '2025-10-27-upper', 'content': 'Bench 4x8.'},
+                {'kind': 'plan', 'key': '2025-10-28-run', 'content': 'Easy 5k.'},
+                {'kind': 'metric', 'key': '', 'content': 'Weight: 71kg'},
+                {'kind': 'plan', 'key': '2025-10-29-lower', 'content': 'Squat 5x5.', 'status': 'archived'},
+            ]
+        )
+    # One upsert for every record, one insert of the parsed weight reading, and the
+    # read + upsert refreshing the metric's history rollups
+    assert len(statements) == 4
+
+    assert [r['outcome'] for r in results] == ['updated', 'created', 'created', 'created']
+    assert results[0]['id'] == existing['id']
+    assert results[0]['content'] == 'Bench 4x8.'
+    assert results[2]['key'] is None
+    assert results[2]['occurred_at'] is not None
+    assert results[3]['status'] == 'archived'
+
+    assert get_item(session, user_id, kind='plan', key='2025-10-28-run')['content'] == 'Easy 5k.'
+    assert len(list_events(session, user_id, kind='metric')) == 1
+
+
+def test_bulk_upsert_items_duplicate_keys(session_and_user: Tuple[Session, str]):
+    """Test repeated keys in one batch collapse into the last record."""
+    session, user_id = session_and_user
+
+    results = bulk_upsert_items(
+        session, user_id,
+        items=[
+            {'kind': 'goal', 'key': 'bench-225', 'content': 'First.'},
+            {'kind': 'goal', 'key': 'bench-225', 'content': 'Second.'},
+        ]
+    )
+
+    assert results[0]['id'] == results[1]['id']
+    assert get_item(session, user_id, kind='goal', key='bench-225')['content'] == 'Second.'
+
+
+def test_bulk_upsert_items_validates_before_writing(session_and_user: Tuple[Session, str]):
+    """Test an invalid record rejects the whole batch."""
+    session, user_id = session_and_user
+
+    with pytest.raises(ValueError):
+        bulk_upsert_items(
+            session, user_id,
+            items=[
+                {'kind': 'goal', 'key': 'bench-225', 'content': 'Bench.'},
+                {'key': 'no-kind', 'content': 'Missing kind.'},
+            ]
+        )
+
+    assert get_item(session, user_id, kind='goal', key='bench-225') is None
+
+
+def test_archive_items_single(session_and_user: Tuple[Session, str]):
+    """Test archiving one item keeps its content."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5.')
+
+    assert archive_items(session, user_id, kind='goal', key='bench-225') == ['bench-225']
+    item = get_item(session, user_id, kind='goal', key='bench-225')
+    assert item['status'] == 'archived'
+    assert item['content'] == 'Bench 225x5.'
+
+    # Already archived or missing items are not counted
+    assert archive_items(session, user_id, kind='goal', key='bench-225') == []
+    assert archive_items(session, user_id, kind='goal', key='missing') == []
+    assert get_item(session, user_id, kind='goal', key='missing') is None
+
+
+@pytest.mark.database
+def test_archive_items_bulk_single_statement(session_and_user: Tuple[Session, str]):
+    """Test bulk archive of every active item of a kind is one statement."""
+    session, user_id = session_and_user
+
+    for i in range(5):
+        upsert_item(session, user_id, kind='preference', key=f'pref-{i}', content=f'Pref {i}')
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench.')
+
+    with count_statements(session) as statements:
+        archived = archive_items(session, user_id, kind='preference', status='active')
+    assert len(statements) == 1
+
+    assert sorted(archived) == [f'pref-{i}' for i in range(5)]
+    assert list_items(session, user_id, kind='preference', status='active') == []
+    assert get_item(session, user_id, kind='goal', key='bench-225')['status'] == 'active'
+
+
+def test_archive_items_by_predicate(session_and_user: Tuple[Session, str]):
+    """Test archiving by key prefix and by age."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='plan', key='2025-09-01-upper', content='Sept.')
+    upsert_item(session, user_id, kind='plan', key='2025-09-03-lower', content='Sept.')
+    upsert_item(session, user_id, kind='plan', key='2025-10-01-upper', content='Oct.')
+    upsert_item(session, user_id, kind='plan', key='2025_09_odd', content='Underscore is literal.')
+
+    archived = archive_items(session, user_id, kind='plan', key_prefix='2025-09-')
+    assert sorted(archived) == ['2025-09-01-upper', '2025-09-03-lower']
+
+    assert archive_items(session, user_id, kind='plan', before=datetime.now() - timedelta(days=1)) == []
+    archived = archive_items(session, user_id, kind='plan', before=datetime.now() + timedelta(days=1))
+    assert sorted(archived) == ['2025-10-01-upper', '2025_09_odd']
+
+
+def test_search_entries_ranked_by_relevance(session_and_user: Tuple[Session, str]):
+    """Test best matches come first rather than most recently touched."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='knowledge', key='knee-health', content='Knee pain: knee tracking, knee valgus, knee sleeves.')
+    upsert_item(session, user_id, kind='knowledge', key='squat-cues', content='Brace, then sit back. Mind the knee.')
+
+    results = search_entries(session, user_id, query='knee')
+
+    assert [r['key'] for r in results] == ['knee-health', 'squat-cues']
+
+
+def test_search_entries_page_cursor(session_and_user: Tuple[Session, str]):
+    """Test cursor pagination walks every match exactly once."""
+    session, user_id = session_and_user
+
+    for i in range(7):
+        upsert_item(session, user_id, kind='knowledge', key=f'note-{i}', content=f'Bench press detail {i}. ' + 'bench ' * (i % 3))
+    upsert_item(session, user_id, kind='knowledge', key='unrelated', content='Running cadence.')
+
+    seen: list[str] = []
+    cursor = None
+    pages = 0
+    while True:
+        page = search_entries_page(session, user_id, query='bench', limit=3, cursor=cursor)
+        seen.extend(r['key'] for r in page['items'])
+        pages += 1
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert pages == 3
+    assert sorted(seen) == sorted(f'note-{i}' for i in range(7))
+
+    with pytest.raises(ValueError):
+        search_entries_page(session, user_id, query='bench', cursor='not-a-cursor')
+
+
+def test_search_entries_page_rejects_malformed_cursor(session_and_user: Tuple[Session, str]):
+    """Test a tampered cursor fails as 'Invalid cursor', like the other paginated tools."""
+    session, user_id = session_and_user
+    upsert_item(session, user_id, kind='knowledge', key='note', content='Bench press detail.')
+
+    now = datetime.now().isoformat()
+    entry_id = '00000000-0000-0000-0000-000000000000'
+    for values in (
+        [0.5, 'yesterday', entry_id, now],
+        [0.5, now, 'not-a-uuid', now],
+        [0.5, now, entry_id, 42],
+        ['0.5', now, entry_id, now],
+        [0.5, None, entry_id, now],
+    ):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            search_entries_page(session, user_id, query='bench', cursor=_encode_cursor(values))
+
+
+def test_search_entries_page_recency_weighting(session_and_user: Tuple[Session, str]):
+    """Test recency weighting prefers the recent of two equally relevant matches."""
+    session, user_id = session_and_user
+
+    log_event(session, user_id, kind='note', content='Deadlift felt heavy.', occurred_at=datetime.now() - timedelta(days=365))
+    log_event(session, user_id, kind='note', content='Deadlift felt heavy.', occurred_at=datetime.now() - timedelta(days=1))
+
+    page = search_entries_page(session, user_id, query='deadlift', recency_half_life_days=30)
+
+    occurred = [datetime.fromisoformat(r['occurred_at']) for r in page['items']]
+    assert len(occurred) == 2
+    assert occurred[0] > occurred[1]
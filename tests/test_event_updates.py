@@ -2,17 +2,12 @@
 import pytest
 from datetime import datetime, timezone
 from src.memory import crud
-from src.memory.db import SessionLocal
 
 
 @pytest.fixture
-def session():
-    """Create a test database session"""
-    session = SessionLocal()
-    try:
-        yield session
-    finally:
-        session.close()
+def session(session_and_user):
+    """Create a test session on the selected backend"""
+    return session_and_user[0]
 
 
 def test_update_event(session):
@@ -0,0 +1,136 @@
+"""Multi-athlete HTTP serving: each request acts for the user named by its bearer token."""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator
+
+import pytest
+from fastmcp import Client
+
+# The server process talks to the configured database
+pytestmark = pytest.mark.database
+
+ROOT = Path(__file__).resolve().parents[1]
+SECRET = "test-secret-with-at-least-32-bytes!"
+
+
+def make_token(user_id: str, secret: str = SECRET) -> str:
+    """HS256 JWT for user_id, as an identity provider sharing the secret would issue."""
+    def b64(data: bytes) -> str:
+        return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+    signing_input = b64(b'{"alg":"HS256","typ":"JWT"}') + "." + b64(json.dumps(
+        {"sub": user_id, "exp": int(time.time()) + 600}
+    ).encode())
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{b64(signature)}"
+
+
+@contextmanager
+def serve(**settings: str) -> Iterator[str]:
+    """Run the HTTP server with settings on top of the environment minus any user id or auth; yields its URL."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    env = {k: v for k, v in os.environ.items()
+           if k not in ("FITNESS_USER_ID", "DEFAULT_USER_ID") and not k.startswith("FITNESS_JWT_")}
+    env.update(LOGFIRE_IGNORE_NO_CONFIG="1", **settings)
+    process = subprocess.Popen(
+        [sys.executable, "-m", "src.mcp_server", "--transport", "http", "--port", str(port), "--workers", "2"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                assert process.poll() is None and time.monotonic() < deadline, "server did not start"
+                time.sleep(0.1)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        # The whole group: workers still starting up may outlive their parent otherwise
+        os.killpg(process.pid, signal.SIGTERM)
+        try:
+            process.wait(10)
+        except subprocess.TimeoutExpired:
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+@pytest.fixture(scope="module")
+def server_url() -> Iterator[str]:
+    with serve(FITNESS_JWT_SECRET=SECRET) as url:
+        yield url
+
+
+@pytest.fixture
+def athletes(cleanup_entries: Callable[[str], None]) -> Iterator[tuple[str, str]]:
+    users = (f"test-user-{uuid.uuid4()}", f"test-user-{uuid.uuid4()}")
+    try:
+        yield users
+    finally:
+        for user_id in users:
+            cleanup_entries(user_id)
+
+
+@pytest.mark.asyncio
+async def test_tools_act_for_the_token_user(server_url: str, athletes: tuple[str, str]):
+    """Test two athletes on one server only ever see their own entries."""
+    first, second = athletes
+    async with Client(f"{server_url}/mcp", auth=make_token(first)) as client:
+        await client.call_tool("upsert", {"kind": "goal", "key": "bench-225", "content": "Bench 225."})
+    async with Client(f"{server_url}/mcp", auth=make_token(second)) as client:
+        await client.call_tool("upsert", {"kind": "goal", "key": "run-5k", "content": "Sub-25 5k."})
+        overview = (await client.call_tool("overview", {"context": "knowledge"})).structured_content
+    assert [goal["key"] for goal in overview["goals"]["active"]] == ["run-5k"]
+
+    async with Client(f"{server_url}/mcp", auth=make_token(first)) as client:
+        overview = (await client.call_tool("overview", {"context": "knowledge"})).structured_content
+    assert [goal["key"] for goal in overview["goals"]["active"]] == ["bench-225"]
+
+
+def test_requests_without_a_valid_token_are_rejected(server_url: str, athletes: tuple[str, str]):
+    """Test the MCP endpoint and the custom routes refuse missing or forged tokens."""
+    for path, token in [("/mcp", None), ("/export", None), ("/export", make_token(athletes[0], "x" * 32)), ("/stats", None)]:
+        request = urllib.request.Request(f"{server_url}{path}", method="POST" if path == "/mcp" else "GET")
+        if token:
+            request.add_header("Authorization", f"Bearer {token}")
+        with pytest.raises(urllib.error.HTTPError) as exc:
+            urllib.request.urlopen(request, timeout=10)
+        assert exc.value.code == 401
+
+    request = urllib.request.Request(f"{server_url}/export", headers={"Authorization": f"Bearer {make_token(athletes[0])}"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        assert response.status == 200
+
+    request = urllib.request.Request(f"{server_url}/stats", headers={"Authorization": f"Bearer {make_token(athletes[0])}"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        stats = json.load(response)
+    # The SQLite backend keeps SQLAlchemy's own, uninstrumented pools
+    assert set(stats) == {"pools", "overview_cache"} and "hits" in stats["overview_cache"]
+
+
+def test_custom_routes_without_auth_or_user_id_name_the_missing_setting():
+    """Test /export and /stats answer 503 naming FITNESS_USER_ID when neither it nor auth is configured."""
+    with serve() as base:
+        for path in ("/export", "/stats"):
+            with pytest.raises(urllib.error.HTTPError) as exc:
+                urllib.request.urlopen(f"{base}{path}", timeout=10)
+            assert exc.value.code == 503
+            assert "FITNESS_USER_ID" in json.load(exc.value)["error"]
@@ -0,0 +1,121 @@
+"""Differential tests: the in-memory store as a reference model for the database backend."""
+
+from __future__ import annotations
+
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Tuple
+
+import pytest
+from sqlalchemy.orm import Session
+
+from src.memory import crud
+from src.memory.memory_store import MemoryStore
+
+# Words whose English stems don't collide, so exact-word matching agrees with stemmed search
+WORDS = ['squat', 'bench', 'deadlift', 'row', 'knee', 'tempo', 'sleep', 'heavy']
+KEYS = [f'k{i}' for i in range(6)]
+
+
+def _normalized(result: Any) -> Any:
+    """Drop ids and server-assigned timestamps, which differ between backends by design."""
+    if isinstance(result, dict):
+        return {k: _normalized(v) for k, v in result.items() if k not in ('id', 'user_id', 'created_at', 'updated_at', 'next_cursor', 'next_token')}
+    if isinstance(result, list):
+        return [_normalized(v) for v in result]
+    return result
+
+
+def _run(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    try:
+        return _normalized(fn(*args, **kwargs))
+    except ValueError as exc:
+        return ('ValueError', str(exc))
+
+
+@pytest.mark.database
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_memory_store_matches_database(session_and_user: Tuple[Session, str], seed: int):
+    """Test a random sequence of operations gives the same results on both backends."""
+    session, user_id = session_and_user
+    memory_user_id = f'{user_id}-memory'  # keeps the two backends' overview cache entries apart
+    backends = [(session, user_id, []), (MemoryStore(), memory_user_id, [])]
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1, 7, 0, tzinfo=timezone.utc)
+
+    def both(fn: Callable[..., Any], *, unordered: bool = False, **kwargs: Any) -> None:
+        results = [_run(fn, store, uid, **kwargs) for store, uid, _ in backends]
+        if unordered:
+            results = [sorted(map(str, result)) for result in results]
+        assert results[0] == results[1], (fn.__name__, kwargs)
+
+    def content() -> str:
+        return ' '.join(rng.choices(WORDS, k=rng.randint(1, 6)))
+
+    for step in range(120):
+        op = rng.random()
+        kind = rng.choice(['goal', 'plan'])
+        if op < 0.35:
+            both(crud.upsert_item, kind=kind, key=rng.choice(KEYS), content=content(),
+                 status=rng.choice([None, 'active', 'archived']))
+        elif op < 0.45:
+            both(crud.upsert_item, kind=kind, key=rng.choice(KEYS), old_key=rng.choice(KEYS), content=content())
+        elif op < 0.5:
+            both(crud.delete_item, kind=kind, key=rng.choice(KEYS))
+        elif op < 0.55:
+            both(crud.archive_items, kind=kind, key=rng.choice([None, *KEYS]), unordered=True)
+        elif op < 0.8:
+            # Distinct occurrence times keep event order fully determined
+            event_kind = rng.choice(['log', 'metric'])
+            # Metric readings feed metric_points and the history rollups
+            reading = f'Weight: {rng.randint(60, 80)}kg ' if event_kind == 'metric' else ''
+            event = dict(kind=event_kind, content=reading + content(), occurred_at=start + timedelta(hours=step * 30))
+            for store, uid, events in backends:
+                events.append(crud.log_event(store, uid, **event)['id'])
+            assert _normalized(crud.list_events(backends[0][0], user_id)) == _normalized(crud.list_events(backends[1][0], memory_user_id))
+        elif backends[0][2]:
+            index = rng.randrange(len(backends[0][2]))
+            if op < 0.9:
+                new_content = content()
+                results = [_run(crud.update_event, store, uid, event_id=events[index], content=new_content) for store, uid, events in backends]
+            else:
+                results = [_run(crud.delete_event, store, uid, event_id=events[index]) for store, uid, events in backends]
+            assert results[0] == results[1]
+
+    for kind in ('goal', 'plan'):
+        for status in (None, 'active', 'archived'):
+            pages = [crud.list_items(store, uid, kind=kind, status=status) for store, uid, _ in backends]
+            # Items written within the same microsecond may tie on time, so compare by key
+            assert sorted(_normalized(pages[0]), key=lambda r: r['key']) == sorted(_normalized(pages[1]), key=lambda r: r['key'])
+    both(crud.list_events_page, kind='log', start=start + timedelta(hours=20), end=start + timedelta(hours=90), limit=500)
+    both(crud.get_items_by_keys, keys=[('goal', key) for key in KEYS] + [('plan', key) for key in KEYS])
+    for context in (None, 'planning', 'history'):
+        both(crud.get_overview, context=context)
+    for word in WORDS:
+        # Scores differ by design (term counts vs ts_rank_cd), so compare the matches only
+        both(crud.search_entries, query=word, unordered=True)
+
+    feeds = [_normalized(crud.list_changes(store, uid, limit=1000)) for store, uid, _ in backends]
+    # Rows archived by one statement take their change_seq in no particular order
+    assert [sorted(map(str, feeds[0][part])) for part in ('changed', 'deleted')] == \
+        [sorted(map(str, feeds[1][part])) for part in ('changed', 'deleted')]
+
+
+def test_memory_store_pages_with_crud_cursors():
+    """Test list pages from the store chain through cursors like the database's."""
+    store = MemoryStore()
+    for i in range(7):
+        crud.log_event(store, 'memory-user', kind='log', content=f'Workout {i}', occurred_at=datetime(2025, 1, 1 + i, 7))
+
+    seen = []
+    cursor = None
+    while True:
+        page = crud.list_events_page(store, 'memory-user', kind='log', limit=3, cursor=cursor)
+        seen.extend(e['content'] for e in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+
+    assert seen == [f'Workout {i}' for i in reversed(range(7))]
+    with pytest.raises(ValueError):
+        crud.list_events_page(store, 'memory-user', cursor='not-a-cursor')
@@ -0,0 +1,122 @@
+"""Tests for metric parsing and the metric_points time series."""
+
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Tuple
+
+import pytest
+from sqlalchemy.orm import Session
+
+from src.memory.crud import (
+    bulk_upsert_items,
+    delete_event,
+    latest_metric,
+    log_event,
+    metric_range,
+    metric_series,
+    update_event,
+)
+from src.memory.metrics import parse_metrics
+
+
+def test_parse_metrics_shapes():
+    """Test the supported phrasings and that ambiguous text is ignored."""
+    assert parse_metrics('Weight: 71kg') == [('weight', 71.0, 'kg')]
+    assert parse_metrics('Bodyweight: 180 lbs, 15% bodyfat') == [('bodyweight', 180.0, 'lbs'), ('bodyfat', 15.0, '%')]
+    assert parse_metrics('HRV 65ms') == [('hrv', 65.0, 'ms')]
+    assert parse_metrics('Resting HR = 52 bpm (morning)') == [('resting_hr', 52.0, 'bpm')]
+    assert parse_metrics('Sleep: 7.5 hours') == [('sleep', 7.5, 'h')]
+    assert parse_metrics('Squat 5x5 @ 100kg') == []
+    assert parse_metrics('Knee felt tight') == []
+    assert parse_metrics('Weight: 71kg (after breakfast), HRV 60ms.') == [('weight', 71.0, 'kg'), ('hrv', 60.0, 'ms')]
+
+
+def test_parse_metrics_rejects_compound_values():
+    """Test values that don't end their segment are ignored, not read as their first number."""
+    assert parse_metrics('Blood pressure: 120/80') == []
+    assert parse_metrics('Weight: 1,234kg') == []
+    assert parse_metrics('Weight: 71kg felt heavy') == []
+
+
+def _at(day: int) -> datetime:
+    return datetime(2025, 9, day, 7, 0, tzinfo=timezone.utc)
+
+
+def test_metric_queries(session_and_user: Tuple[Session, str]):
+    """Test latest value, range summary and weekly series over logged metrics."""
+    session, user_id = session_and_user
+
+    for day, weight in [(1, 72.0), (3, 71.6), (8, 71.2), (10, 70.8), (15, 70.5)]:
+        log_event(session, user_id, kind='metric', content=f'Weight: {weight}kg', occurred_at=_at(day))
+    log_event(session, user_id, kind='note', content='Weight: 99kg', occurred_at=_at(2))  # notes aren't parsed
+
+    latest = latest_metric(session, user_id, metric='Weight')
+    assert latest['value'] == 70.5
+    assert latest['unit'] == 'kg'
+    assert datetime.fromisoformat(latest['occurred_at']) == _at(15)
+
+    summary = metric_range(session, user_id, metric='weight', start=_at(2), end=_at(10))
+    assert summary['count'] == 3
+    assert (summary['first'], summary['last'], summary['min'], summary['max']) == (71.6, 70.8, 70.8, 71.6)
+    assert summary['change'] == pytest.approx(-0.8)
+    assert summary['avg'] == pytest.approx(71.2)
+    assert datetime.fromisoformat(summary['start']) == _at(3)
+
+    # 2025-09-01 is a Monday
+    series = metric_series(session, user_id, metric='weight', bucket='week')
+    assert [(s['bucket'], s['count']) for s in series] == [('2025-09-01', 2), ('2025-09-08', 2), ('2025-09-15', 1)]
+    assert series[0]['avg'] == pytest.approx(71.8)
+
+    assert metric_range(session, user_id, metric='bodyfat')['count'] == 0
+    assert latest_metric(session, user_id, metric='bodyfat') is None
+    with pytest.raises(ValueError):
+        metric_series(session, user_id, metric='weight', bucket='fortnight')
+
+
+def test_metric_aggregates_convert_units(session_and_user: Tuple[Session, str]):
+    """Test readings in other units are converted to the last reading's unit; unitless ones are left out."""
+    session, user_id = session_and_user
+
+    log_event(session, user_id, kind='metric', content='Weight: 70kg', occurred_at=_at(1))
+    log_event(session, user_id, kind='metric', content='Weight: 72kg', occurred_at=_at(2))
+    log_event(session, user_id, kind='metric', content='Weight: 160', occurred_at=_at(3))
+    log_event(session, user_id, kind='metric', content='Weight: 150 lbs', occurred_at=_at(9))
+
+    summary = metric_range(session, user_id, metric='weight')
+    assert summary['unit'] == 'lbs'
+    assert (summary['count'], summary['excluded']) == (3, 1)
+    assert summary['first'] == pytest.approx(70 / 0.45359237)
+    assert summary['min'] == pytest.approx(150.0)
+    assert summary['max'] == pytest.approx(72 / 0.45359237)
+    assert summary['avg'] == pytest.approx((142 / 0.45359237 + 150) / 3)
+    assert summary['change'] == pytest.approx(150 - 70 / 0.45359237)
+
+    series = metric_series(session, user_id, metric='weight', bucket='week')
+    assert [(s['bucket'], s['count'], s['unit']) for s in series] == [('2025-09-01', 2, 'lbs'), ('2025-09-08', 1, 'lbs')]
+    assert series[0]['avg'] == pytest.approx(71 / 0.45359237)
+
+    log_event(session, user_id, kind='metric', content='Weight: 71kg', occurred_at=_at(10))
+    assert metric_range(session, user_id, metric='weight', start=_at(2))['max'] == pytest.approx(72.0)
+
+
+def test_metric_points_follow_event_writes(session_and_user: Tuple[Session, str]):
+    """Test readings track event updates, deletes and bulk writes."""
+    session, user_id = session_and_user
+
+    event = log_event(session, user_id, kind='metric', content='Weight: 72kg', occurred_at=_at(1))
+    update_event(session, user_id, event_id=event['id'], content='Weight: 71kg, 15% bodyfat', occurred_at=_at(2))
+
+    assert latest_metric(session, user_id, metric='weight')['value'] == 71.0
+    assert datetime.fromisoformat(latest_metric(session, user_id, metric='weight')['occurred_at']) == _at(2)
+    assert metric_range(session, user_id, metric='weight')['count'] == 1
+    assert latest_metric(session, user_id, metric='bodyfat')['unit'] == '%'
+
+    bulk_upsert_items(session, user_id, items=[
+        {'kind': 'metric', 'key': '', 'content': 'Resting HR: 52 bpm'},
+        {'kind': 'goal', 'key': 'hr-goal', 'content': 'Resting HR: 48 bpm'},  # items aren't parsed
+    ])
+    assert metric_range(session, user_id, metric='resting_hr')['count'] == 1
+
+    assert delete_event(session, user_id, event_id=event['id'])
+    assert latest_metric(session, user_id, metric='weight') is None
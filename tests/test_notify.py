@@ -0,0 +1,75 @@
+"""Cross-process invalidation: writes by other connections reach the local overview cache."""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+import pytest
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from src.memory.cache import overview_cache
+from src.memory.crud import get_overview, upsert_item
+from src.memory.db import DATABASE_URL, IS_SQLITE, Entry, SessionLocal
+from src.memory.notify import Change, ChangeListener
+
+pytestmark = [
+    pytest.mark.database,
+    pytest.mark.skipif(IS_SQLITE, reason="LISTEN/NOTIFY is Postgres-only"),
+]
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@pytest.fixture
+def listener() -> Iterator[ChangeListener]:
+    listener = ChangeListener(
+        DATABASE_URL.replace("postgresql+psycopg://", "postgresql://"),
+        poll_interval=0.05,
+        reconnect_delay=0.05,
+    ).start()
+    try:
+        assert listener.connected.wait(5)
+        yield listener
+    finally:
+        listener.stop()
+
+
+def test_listener_invalidates_on_other_connections_writes(session_and_user: Tuple[Session, str], listener: ChangeListener):
+    """Test a write that bypasses crud (as from another process) drops the cached overview."""
+    session, user_id = session_and_user
+    seen: list[Optional[Change]] = []
+    listener.add_handler(seen.append)
+
+    upsert_item(session, user_id, kind='knowledge', key='knee-health', content='Wider stance.')
+    assert wait_for(lambda: Change(user_id, 'knowledge', 'knee-health') in seen)
+    assert get_overview(session, user_id, context='knowledge')['knowledge'][0]['content'] == 'Wider stance.'
+
+    with SessionLocal() as other:
+        other.execute(update(Entry).where(Entry.user_id == user_id).values(content='Narrow stance.'))
+        other.commit()
+
+    assert wait_for(lambda: get_overview(session, user_id, context='knowledge')['knowledge'][0]['content'] == 'Narrow stance.')
+
+
+def test_listener_flushes_and_pauses_across_reconnects(session_and_user: Tuple[Session, str], listener: ChangeListener):
+    """Test a dropped listener connection pauses the cache, then reconnects with a flush."""
+    session, user_id = session_and_user
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225.')
+    get_overview(session, user_id)
+    assert overview_cache.stats()['size'] > 0
+
+    session.execute(text("SELECT pg_terminate_backend(:pid)"), {"pid": listener.backend_pid})
+    session.commit()
+
+    assert wait_for(lambda: listener.reconnects == 1 and listener.connected.is_set())
+    assert overview_cache.stats()['paused'] is False
+    assert overview_cache.get((user_id, None, 200)) is None
@@ -2,13 +2,27 @@
 
 from __future__ import annotations
 
+import json
 from datetime import datetime, timedelta
 from typing import Tuple
 
 import pytest
 from sqlalchemy.orm import Session
 
-from src.memory.crud import get_overview, upsert_item, log_event
+from src.memory import crud
+from src.memory.crud import (
+    get_overview,
+    upsert_item,
+    log_event,
+    update_event,
+    delete_event,
+    delete_item,
+    overview_cache_stats,
+    rebuild_history_rollups,
+    _overview_section_limits,
+    _overview_stmt,
+)
+from src.memory.db import IS_SQLITE
 
 
 @pytest.fixture
@@ -214,7 +228,7 @@ def test_overview_knowledge_context(sample_data: Tuple[Session, str]):
 
 
 def test_overview_history_context(sample_data: Tuple[Session, str]):
-    """Test history context returns all logs and metrics."""
+    """Test history context returns recent logs and metrics plus rollups of all of them."""
     session, user_id = sample_data
 
     overview = get_overview(session, user_id, context='history')
@@ -222,10 +236,14 @@ def test_overview_history_context(sample_data: Tuple[Session, str]):
     # Should include goals
     assert 'goals' in overview
 
-    # Should include all logs (no limit, up to 500)
+    # Should include recent logs (up to 20)
     assert 'recent_logs' in overview
     assert len(overview['recent_logs']) == 12  # All 12 logs
 
+    # Rollups count every log, in weeks and in months
+    assert sum(week['sessions'] for week in overview['history']['weeks']) == 12
+    assert sum(month['sessions'] for month in overview['history']['months']) == 12
+
     # Should include metrics
     assert 'recent_metrics' in overview
     assert len(overview['recent_metrics']) == 5
@@ -320,3 +338,289 @@ def test_overview_excludes_archived(session_and_user: Tuple[Session, str]):
     assert len(overview['goals']['active']) == 1
     assert overview['goals']['active'][0]['key'] == 'active-goal'
     assert 'archived' not in overview['goals']
+
+
+def test_overview_cache_hit(session_and_user: Tuple[Session, str]):
+    """Test repeat overviews are served from the cache."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5.')
+
+    before = overview_cache_stats()
+    first = get_overview(session, user_id, context='planning')
+    second = get_overview(session, user_id, context='planning')
+    after = overview_cache_stats()
+
+    assert second == first
+    assert after['misses'] - before['misses'] == 1
+    assert after['hits'] - before['hits'] == 1
+
+    # Mutating a returned overview must not leak into the cache
+    second['goals']['active'].clear()
+    third = get_overview(session, user_id, context='planning')
+    assert len(third['goals']['active']) == 1
+
+
+def test_overview_cache_invalidated_on_write(session_and_user: Tuple[Session, str]):
+    """Test writes invalidate cached overviews that render the written kind."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5.')
+    get_overview(session, user_id, context='planning')
+
+    upsert_item(session, user_id, kind='goal', key='squat-315', content='Squat 315x5.')
+    overview = get_overview(session, user_id, context='planning')
+    assert len(overview['goals']['active']) == 2
+
+    event = log_event(session, user_id, kind='log', content='Upper day.')
+    overview = get_overview(session, user_id, context='planning')
+    assert len(overview['recent_logs']) == 1
+
+    delete_event(session, user_id, event_id=event['id'])
+    overview = get_overview(session, user_id, context='planning')
+    assert 'recent_logs' not in overview
+
+
+def test_overview_cache_skips_values_built_before_a_write(session_and_user: Tuple[Session, str], monkeypatch: pytest.MonkeyPatch):
+    """Test an overview whose build raced a write is returned but not cached."""
+    session, user_id = session_and_user
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5.')
+
+    build = crud._build_overview
+
+    def build_then_write(*args, **kwargs):
+        overview = build(*args, **kwargs)
+        upsert_item(session, user_id, kind='goal', key='squat-315', content='Squat 315x5.')
+        return overview
+
+    monkeypatch.setattr(crud, '_build_overview', build_then_write)
+    assert len(get_overview(session, user_id, context='planning')['goals']['active']) == 1
+    monkeypatch.setattr(crud, '_build_overview', build)
+    assert len(get_overview(session, user_id, context='planning')['goals']['active']) == 2
+
+
+def test_overview_cache_invalidation_is_context_specific(session_and_user: Tuple[Session, str]):
+    """Test writes leave cached contexts that don't render the kind untouched."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='knowledge', key='knee-health', content='Wider stance.')
+    get_overview(session, user_id, context='knowledge')
+    get_overview(session, user_id, context='history')
+
+    # Metrics only appear in the history (and default) overview
+    log_event(session, user_id, kind='metric', content='Weight: 71kg')
+
+    before = overview_cache_stats()
+    get_overview(session, user_id, context='knowledge')
+    history = get_overview(session, user_id, context='history')
+    after = overview_cache_stats()
+
+    assert after['hits'] - before['hits'] == 1
+    assert after['misses'] - before['misses'] == 1
+    assert len(history['recent_metrics']) == 1
+
+
+def test_overview_limits_keep_most_recent(session_and_user: Tuple[Session, str]):
+    """Test limited sections return the newest rows when history exceeds the limit."""
+    session, user_id = session_and_user
+
+    base_date = datetime.now() - timedelta(days=60)
+    for i in range(30):
+        log_event(
+            session, user_id,
+            kind='log',
+            content=f'Workout {i}',
+            occurred_at=base_date + timedelta(days=i)
+        )
+    log_event(session, user_id, kind='issue', content='Should never appear.')
+
+    overview = get_overview(session, user_id, context='upcoming')
+
+    contents = [log['content'] for log in overview['recent_logs']]
+    assert contents == [f'Workout {i}' for i in range(29, 22, -1)]
+    assert all('issue' not in section for section in overview)
+
+
+def test_overview_history_rollups_follow_writes(session_and_user: Tuple[Session, str]):
+    """Test weekly and monthly rollups track logs and readings as they are written, moved and deleted."""
+    session, user_id = session_and_user
+
+    log_event(session, user_id, kind='log', content='Squats.', occurred_at=datetime(2025, 3, 3, 7))
+    moved = log_event(session, user_id, kind='log', content='Run.', occurred_at=datetime(2025, 3, 5, 7))
+    dropped = log_event(session, user_id, kind='log', content='Bench.', occurred_at=datetime(2025, 3, 6, 7))
+    log_event(session, user_id, kind='metric', content='Weight: 72kg', occurred_at=datetime(2025, 3, 4, 7))
+    log_event(session, user_id, kind='metric', content='Weight: 70.5kg, HRV 60ms', occurred_at=datetime(2025, 3, 20, 7))
+    log_event(session, user_id, kind='metric', content='Resting HR: 60 bpm, Sleep: 450 min', occurred_at=datetime(2025, 3, 4, 7))
+    log_event(session, user_id, kind='metric', content='Sleep: 7 h', occurred_at=datetime(2025, 3, 21, 7))
+    upsert_item(session, user_id, kind='log', key='2025-10-29-upper', content='Bench 5x5.')
+    upsert_item(session, user_id, kind='log', key='2025-10-30-run', content='Easy 5k.')
+    upsert_item(session, user_id, kind='log', key='2025-10-31-upper', content='OHP 5x5.')
+
+    update_event(session, user_id, event_id=moved['id'], occurred_at=datetime(2025, 4, 2, 7))
+    delete_event(session, user_id, event_id=dropped['id'])
+    delete_item(session, user_id, kind='log', key='2025-10-31-upper')
+
+    history = get_overview(session, user_id, context='history')['history']
+    months = {month['start']: month for month in history['months']}
+    assert months['2025-03-01'] == {
+        'start': '2025-03-01',
+        'sessions': 1,
+        'metrics': {
+            'hrv': {'count': 1, 'min': 60.0, 'max': 60.0, 'avg': 60.0, 'unit': 'ms'},
+            'resting_hr': {'count': 1, 'min': 60.0, 'max': 60.0, 'avg': 60.0, 'unit': 'bpm'},
+            # Aggregated in the unit of the last reading
+            'sleep': {'count': 2, 'min': 7.0, 'max': 7.5, 'avg': 7.25, 'unit': 'h'},
+            'weight': {'count': 2, 'min': 70.5, 'max': 72.0, 'avg': 71.25, 'unit': 'kg'},
+        },
+    }
+    assert months['2025-04-01'] == {'start': '2025-04-01', 'sessions': 1}
+
+    # Date-keyed logs count on their key's date, typed by its suffix
+    assert months['2025-10-01'] == {'start': '2025-10-01', 'sessions': 2, 'session_types': {'run': 1, 'upper': 1}}
+
+
+def test_overview_history_buckets_keyed_logs_by_key_date(session_and_user: Tuple[Session, str]):
+    """Test back-filled, renamed and archived date-keyed logs land in (or leave) the right periods."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='log', key='2022-06-01-lower', content='Squat 5x5.')
+    upsert_item(session, user_id, kind='log', key='2022-06-03-upper', content='Bench 5x5.')
+    upsert_item(session, user_id, kind='log', key='2022-06-05-run', content='Easy 5k.')
+    upsert_item(session, user_id, kind='log', key='2022-06-05-run', content='Easy 6k.', old_key='2022-06-05-run')
+    upsert_item(session, user_id, kind='log', key='2022-07-04-run', content='Tempo.', old_key='2022-06-05-run')
+    crud.archive_items(session, user_id, kind='log', key='2022-06-03-upper')
+    # Not a date: counts when it was written
+    upsert_item(session, user_id, kind='log', key='2022-13-45-odd', content='Typo.')
+
+    months = {month['start']: month for month in get_overview(session, user_id, context='history')['history']['months']}
+    assert months['2022-06-01'] == {'start': '2022-06-01', 'sessions': 1, 'session_types': {'lower': 1}}
+    assert months['2022-07-01'] == {'start': '2022-07-01', 'sessions': 1, 'session_types': {'run': 1}}
+    this_month = datetime.now().strftime('%Y-%m-01')
+    assert months[this_month]['sessions'] == 1
+
+
+@pytest.mark.database
+def test_rebuild_history_rollups_matches_maintained(session_and_user: Tuple[Session, str]):
+    """Test a full rebuild reproduces the rollups maintained on write."""
+    session, user_id = session_and_user
+
+    base_date = datetime.now() - timedelta(days=400)
+    for i in range(40):
+        log_event(session, user_id, kind='log', content=f'Workout {i}', occurred_at=base_date + timedelta(days=i * 10))
+        log_event(session, user_id, kind='metric', content=f'Weight: {70 + i % 5}kg', occurred_at=base_date + timedelta(days=i * 10 + 3))
+
+    maintained = get_overview(session, user_id, context='history')['history']
+    assert rebuild_history_rollups(session, user_id) > 0
+    # A different truncate_words misses the overview cache and reads the rebuilt rows
+    rebuilt = get_overview(session, user_id, truncate_words=199, context='history')['history']
+
+    assert rebuilt == maintained
+    assert len(maintained['months']) >= 13
+
+
+def test_overview_max_tokens_fills_by_priority(session_and_user: Tuple[Session, str]):
+    """Test a token budget keeps high-priority sections and reports what was elided."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5 by June.')
+    upsert_item(session, user_id, kind='week', key='2025-week-43', content='Mon: Upper. Wed: Lower. Fri: Upper.')
+    for i in range(30):
+        upsert_item(session, user_id, kind='knowledge', key=f'note-{i}', content=' '.join(['cue'] * 40))
+
+    full = get_overview(session, user_id)
+    fitted = get_overview(session, user_id, max_tokens=400)
+
+    assert fitted['goals'] == full['goals']
+    assert fitted['week'] == full['week']
+    budget = fitted['budget']
+    assert budget['estimated_tokens'] <= 400
+    assert budget['truncate_words'] == 10
+    assert 0 < budget['elided']['knowledge'] < 30
+    assert len(fitted['knowledge']) + budget['elided']['knowledge'] == 30
+    assert len(json.dumps(fitted)) < len(json.dumps(full)) / 3
+
+    # The cached full overview is untouched by fitting
+    assert get_overview(session, user_id) == full
+
+
+def test_overview_max_tokens_truncates_before_eliding(session_and_user: Tuple[Session, str]):
+    """Test content is shortened to fit before any entry is dropped."""
+    session, user_id = session_and_user
+
+    for i in range(5):
+        upsert_item(session, user_id, kind='preference', key=f'pref-{i}', content=' '.join(['word'] * 150))
+
+    roomy = get_overview(session, user_id, max_tokens=10_000)
+    assert roomy['budget'] == {'max_tokens': 10_000, 'estimated_tokens': roomy['budget']['estimated_tokens']}
+
+    fitted = get_overview(session, user_id, max_tokens=600)
+    assert 'elided' not in fitted['budget']
+    assert fitted['budget']['truncate_words'] < 200
+    assert len(fitted['preferences']) == 5
+    assert fitted['budget']['truncated'] == {'preferences': 5}
+    assert all(pref['content'].endswith('[truncated - use get() for full content]') for pref in fitted['preferences'])
+
+    with pytest.raises(ValueError):
+        get_overview(session, user_id, max_tokens=0)
+
+
+def test_overview_max_tokens_not_binding_changes_nothing(session_and_user: Tuple[Session, str]):
+    """Test a budget the overview fits returns it unchanged, full-content sections included."""
+    session, user_id = session_and_user
+
+    long_text = ' '.join(f'w{i}' for i in range(300))
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225x5 by June.')
+    upsert_item(session, user_id, kind='week', key='2025-week-43', content=long_text)
+    upsert_item(session, user_id, kind='current', key='injuries', content=long_text)
+    upsert_item(session, user_id, kind='knowledge', key='knee-health', content=long_text)
+    log_event(session, user_id, kind='log', content=long_text)
+
+    full = get_overview(session, user_id)
+    fitted = get_overview(session, user_id, max_tokens=1_000_000)
+    budget = fitted.pop('budget')
+
+    assert fitted == full
+    assert budget == {'max_tokens': 1_000_000, 'estimated_tokens': budget['estimated_tokens']}
+    assert len(fitted['week'][0]['content'].split()) == 300
+
+
+def test_overview_truncation_of_long_content(session_and_user: Tuple[Session, str]):
+    """Test long content truncates the same whether or not a stored preview covers the limit."""
+    session, user_id = session_and_user
+
+    words = [f'w{i}' for i in range(300)]
+    long_content = '\n'.join(' '.join(words[i:i + 10]) for i in range(0, 300, 10))
+    upsert_item(session, user_id, kind='knowledge', key='long', content=long_content)
+    upsert_item(session, user_id, kind='knowledge', key='short', content='Wider stance.\nKnees out.')
+    # Longer than the smaller limits, but too short to have a stored preview
+    upsert_item(session, user_id, kind='knowledge', key='medium', content=' '.join(words[:120]))
+    log_event(session, user_id, kind='log', content=' '.join(words[:120]))
+
+    for truncate_words in (50, 200, 250, 300):
+        overview = get_overview(session, user_id, truncate_words=truncate_words)
+        knowledge = {k['key']: k['content'] for k in overview['knowledge']}
+        expected = long_content if truncate_words == 300 else (
+            ' '.join(words[:truncate_words]) + '... [truncated - use get() for full content]')
+        assert knowledge['long'] == expected, truncate_words
+        assert knowledge['short'] == 'Wider stance.\nKnees out.'
+        medium = ' '.join(words[:min(truncate_words, 120)]) + (
+            '... [truncated - use get() for full content]' if truncate_words < 120 else '')
+        assert knowledge['medium'] == medium, truncate_words
+        assert overview['recent_logs'][0]['content'] == medium, truncate_words
+
+
+@pytest.mark.database
+@pytest.mark.skipif(IS_SQLITE, reason="previews are generated columns on Postgres only")
+def test_overview_selects_previews_not_content(session_and_user: Tuple[Session, str]):
+    """Test the overview query returns the stored preview for long truncated entries."""
+    session, user_id = session_and_user
+
+    upsert_item(session, user_id, kind='knowledge', key='long', content=' '.join(['cue'] * 5000))
+    upsert_item(session, user_id, kind='goal', key='bench', content=' '.join(['goal'] * 500))
+
+    rows = {row.key: row for row in session.execute(
+        _overview_stmt(user_id, None, _overview_section_limits(None), 100))}
+    assert rows['long'].word_count == 5000
+    assert len(rows['long'].content.split()) == 200
+    # Goals render in full, so they still carry their content
+    assert len(rows['bench'].content.split()) == 500
@@ -0,0 +1,64 @@
+"""Instrumented connection pools: checkout waits, timeouts and occupancy per pool."""
+
+from __future__ import annotations
+
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from src.memory import async_db, db, pool
+
+pytestmark = [
+    pytest.mark.database,
+    pytest.mark.skipif(db.IS_SQLITE, reason="the SQLite backend keeps SQLAlchemy's default pool"),
+]
+
+
+@pytest.fixture
+def tiny_engine(monkeypatch: pytest.MonkeyPatch):
+    """One connection, no overflow, short timeout: the second caller has to queue."""
+    engine = create_engine(db.DATABASE_URL, **dict(
+        db.engine_options(db.DATABASE_URL), pool_size=1, max_overflow=0, pool_timeout=0.3,
+    ))
+    monkeypatch.setattr(pool, "_engines", {})
+    pool.register("tiny", engine)
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def test_queued_checkouts_are_timed_and_counted(tiny_engine):
+    """Test waiting for a busy connection shows up as wait time, and giving up as a timeout."""
+    held = tiny_engine.connect()
+    try:
+        assert pool.pool_stats()["tiny"]["in_use"] == 1
+        with pytest.raises(PoolTimeoutError):
+            tiny_engine.connect()
+
+        threading.Timer(0.15, held.close).start()
+        with tiny_engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    finally:
+        held.close()
+
+    stats = pool.pool_stats()["tiny"]
+    assert stats["size"] == 1 and stats["max_overflow"] == 0 and stats["in_use"] == 0
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 1
+    assert stats["wait_max_ms"] >= 100
+
+
+@pytest.mark.asyncio
+async def test_app_engines_report_their_pools():
+    """Test the server's sync and async engines are instrumented and registered by name."""
+    before = pool.pool_stats()["async-primary"]["checkouts"]
+    async with async_db.async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+        assert pool.pool_stats()["async-primary"]["in_use"] >= 1
+    stats = pool.pool_stats()
+    assert stats["async-primary"]["checkouts"] == before + 1
+    assert stats["primary"]["size"] == db.ENGINE_OPTIONS["pool_size"]
+    assert stats["primary"]["timeout"] == db.ENGINE_OPTIONS["pool_timeout"]
@@ -0,0 +1,44 @@
+"""Server-side prepared statements: on by default, off through transaction-mode poolers."""
+
+from __future__ import annotations
+
+from typing import Tuple
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from src.memory import db
+from src.memory.crud import get_items_by_keys, list_items_page, upsert_item
+
+pytestmark = [
+    pytest.mark.database,
+    pytest.mark.skipif(db.IS_SQLITE, reason="prepared statements are a psycopg/Postgres feature"),
+]
+
+
+def test_transaction_poolers_disable_prepared_statements(monkeypatch: pytest.MonkeyPatch):
+    """Test the pool mode is guessed from the URL unless DATABASE_POOL_MODE says otherwise."""
+    monkeypatch.delenv("DATABASE_POOL_MODE", raising=False)
+    pooled = "postgresql+psycopg://u:p@aws-0-eu.pooler.supabase.com:6543/postgres"
+    session_pooled = "postgresql+psycopg://u:p@aws-0-eu.pooler.supabase.com:5432/postgres"
+    assert db.engine_options(pooled)["connect_args"]["prepare_threshold"] is None
+    assert db.engine_options(session_pooled)["connect_args"]["prepare_threshold"] == db.PREPARE_THRESHOLD
+
+    monkeypatch.setenv("DATABASE_POOL_MODE", "transaction")
+    assert db.engine_options(session_pooled)["connect_args"]["prepare_threshold"] is None
+
+
+@pytest.mark.skipif(db.pool_mode(db.DATABASE_URL) == "transaction", reason="preparing is off through transaction poolers")
+def test_hot_statements_are_prepared(session_and_user: Tuple[Session, str]):
+    """Test repeated crud calls reuse one SQL text, which psycopg then prepares server-side."""
+    _, user_id = session_and_user
+    # Prepared statements live per connection: keep every call on one
+    with db.engine.connect() as connection, db.SessionLocal(bind=connection) as session:
+        for n in range(db.PREPARE_THRESHOLD + 1):
+            upsert_item(session, user_id, kind='plan', key=f'day-{n}', content=f'Session {n}.')
+            list_items_page(session, user_id, kind='plan', limit=2)
+            get_items_by_keys(session, user_id, keys=[('plan', f'day-{n}')])
+        prepared = session.execute(text("SELECT statement FROM pg_prepared_statements")).scalars().all()
+    for fragment in ('INSERT INTO entries', 'unnest', 'LIMIT'):
+        assert any(fragment in statement for statement in prepared), fragment
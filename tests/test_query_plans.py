@@ -0,0 +1,95 @@
+"""EXPLAIN checks that list queries use the partial item/event indexes."""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, Tuple
+
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from src.memory.crud import list_events_page, list_items_page, log_event, upsert_item
+from src.memory.db import IS_SQLITE
+
+pytestmark = [
+    pytest.mark.database,
+    pytest.mark.skipif(IS_SQLITE, reason="plans and partial-index INCLUDEs are Postgres-specific"),
+]
+
+
+@contextmanager
+def captured_selects(session: Session) -> Iterator[list[tuple[str, dict]]]:
+    """Record the SELECT statements (with parameters) crud sends to the database."""
+    statements: list[tuple[str, dict]] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def plan_nodes(session: Session, statement: str, parameters: dict) -> list[dict]:
+    """EXPLAIN a captured statement and flatten the plan tree.
+
+    Shared test tables are tiny and their statistics drift with whatever else ran, so
+    every access path except index-only scans (and sorting) is disabled: the page
+    subquery must then be answered, in order, from an index holding every column it
+    needs, which is what the partial indexes are for.
+    """
+    with session.begin_nested():
+        for setting in ('enable_seqscan', 'enable_bitmapscan', 'enable_indexscan', 'enable_sort'):
+            session.execute(text(f'SET LOCAL {setting} = off'))
+        connection = session.connection()
+        plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + statement, parameters).scalar()
+    nodes, stack = [], [plan[0]['Plan']]
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(node.get('Plans', []))
+    return nodes
+
+
+def index_scans(nodes: list[dict]) -> set[tuple[str, str]]:
+    return {(n['Node Type'], n['Index Name']) for n in nodes if 'Index Name' in n}
+
+
+def test_list_items_page_uses_items_index(session_and_user: Tuple[Session, str]):
+    """Test item pages come from an index-only scan on idx_entries_items_recent."""
+    session, user_id = session_and_user
+
+    for i in range(5):
+        upsert_item(session, user_id, kind='goal', key=f'goal-{i}', content=f'Goal {i}')
+
+    with captured_selects(session) as statements:
+        first = list_items_page(session, user_id, kind='goal', status='active', limit=2)
+        list_items_page(session, user_id, kind='goal', status='active', limit=2, cursor=first['next_cursor'])
+
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        assert ('Index Only Scan', 'idx_entries_items_recent') in index_scans(plan_nodes(session, statement, parameters))
+
+
+def test_list_events_page_uses_events_index(session_and_user: Tuple[Session, str]):
+    """Test event pages come from an index-only scan on idx_entries_events_recent."""
+    session, user_id = session_and_user
+
+    base_date = datetime.now() - timedelta(days=10)
+    for i in range(5):
+        log_event(session, user_id, kind='log', content=f'Workout {i}', occurred_at=base_date + timedelta(days=i))
+
+    with captured_selects(session) as statements:
+        first = list_events_page(session, user_id, kind='log', start=base_date, limit=2)
+        list_events_page(session, user_id, kind='log', start=base_date, limit=2, cursor=first['next_cursor'])
+
+    assert len(statements) == 2
+    for statement, parameters in statements:
+        assert ('Index Only Scan', 'idx_entries_events_recent') in index_scans(plan_nodes(session, statement, parameters))
+
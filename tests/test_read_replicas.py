@@ -0,0 +1,61 @@
+"""Read-replica routing: reads leave the primary except right after the user's own writes."""
+
+from __future__ import annotations
+
+import time
+from typing import Iterator, Tuple
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import Session
+
+from src.memory import async_db, db
+from src.memory.cache import recent_writes
+from src.memory.crud import get_overview, upsert_item
+
+pytestmark = [
+    pytest.mark.database,
+    pytest.mark.skipif(db.IS_SQLITE, reason="read replicas are Postgres-only"),
+]
+
+
+@pytest.fixture
+def replica(monkeypatch: pytest.MonkeyPatch) -> Iterator[object]:
+    """A read-only engine over the primary's database standing in for a replica."""
+    replica = create_engine(db.DATABASE_URL, **db.engine_options(db.DATABASE_URL, read_only=True))
+    monkeypatch.setattr(db, "read_engines", [replica])
+    monkeypatch.setattr(recent_writes, "window", 0.5)
+    monkeypatch.setattr(recent_writes, "_all_until", 0.0)
+    try:
+        yield replica
+    finally:
+        replica.dispose()
+
+
+def test_reads_use_replica_outside_read_your_writes_window(session_and_user: Tuple[Session, str], replica, monkeypatch: pytest.MonkeyPatch):
+    """Test a user's reads stay on the primary for the window after their write, others' don't."""
+    session, user_id = session_and_user
+    async_replica = create_async_engine(db.DATABASE_URL, **async_db.async_engine_options(db.DATABASE_URL, read_only=True))
+    monkeypatch.setattr(async_db, "async_read_engines", [async_replica])
+    assert db.read_session(user_id).get_bind() is replica
+    assert async_db.async_read_session(user_id).bind is async_replica
+
+    upsert_item(session, user_id, kind='goal', key='bench-225', content='Bench 225.')
+    assert db.read_session(user_id).get_bind() is db.engine
+    assert async_db.async_read_session(user_id).bind is async_db.async_engine
+    assert db.read_session(f"{user_id}-other").get_bind() is replica
+
+    time.sleep(0.6)
+    with db.read_session(user_id) as read:
+        assert read.get_bind() is replica
+        assert get_overview(read, user_id, context='knowledge')['goals']['active'][0]['key'] == 'bench-225'
+
+
+def test_replica_sessions_refuse_writes(session_and_user: Tuple[Session, str], replica):
+    """Test a write misrouted to a read session fails instead of landing anywhere."""
+    _, user_id = session_and_user
+    with db.read_session(user_id) as read:
+        with pytest.raises(DBAPIError, match="read-only transaction"):
+            upsert_item(read, user_id, kind='goal', key='bench-225', content='Bench 225.')